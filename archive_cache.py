@@ -0,0 +1,198 @@
+"""
+On-disk cache of downloaded DXVK release archives.
+
+Archives live at <cache_dir>/<source_key>/<tag_name>/<filename> and an
+index.json next to them tracks sizes, SHA-256 digests and last-use times,
+so the cache can be capped in size with least-recently-used eviction and
+cached archives can be checked without re-reading them.
+"""
+import os
+import shutil
+import threading
+import time
+from constants import APP_DATA_DIR
+from json_store import read_json, write_json
+from settings import get_settings
+
+INDEX_FILE = "index.json"
+
+
+def _safe_component(value):
+    """Make a tag or filename usable as a single path component."""
+    return str(value).replace("/", "_").replace("\\", "_").strip(". ") or "_"
+
+
+class ArchiveCache:
+    def __init__(self, cache_dir=None, max_bytes=None):
+        if cache_dir is None:
+            cache_dir = os.path.join(APP_DATA_DIR, "cache", "archives")
+        if max_bytes is None:
+            max_bytes = int(get_settings().get("archive_cache_max_mb")) * 1024 * 1024
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def _key(source_key, tag_name, filename):
+        return "/".join(_safe_component(p) for p in (source_key, tag_name, filename))
+
+    def path_for(self, source_key, tag_name, filename):
+        """Returns where the archive for this release is (or would be) stored."""
+        return os.path.join(
+            self.cache_dir,
+            _safe_component(source_key),
+            _safe_component(tag_name),
+            _safe_component(filename),
+        )
+
+    def partial_path(self, source_key, tag_name, filename):
+        """Returns the path used while the archive is still being downloaded."""
+        return self.path_for(source_key, tag_name, filename) + ".part"
+
+    def _read_index(self):
+        return read_json(os.path.join(self.cache_dir, INDEX_FILE))
+
+    def _write_index(self, index):
+        write_json(os.path.join(self.cache_dir, INDEX_FILE), index, indent=4)
+
+    def get(self, source_key, tag_name, filename):
+        """
+        Returns the path of a cached archive and marks it as recently used,
+        or None if this release is not in the cache.
+        """
+        key = self._key(source_key, tag_name, filename)
+        path = self.path_for(source_key, tag_name, filename)
+        with self._lock:
+            index = self._read_index()
+            entry = index.get(key)
+            if entry is None:
+                return None
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = None
+            if size != entry.get("size"):
+                # File was deleted or modified behind our back
+                del index[key]
+                self._write_index(index)
+                return None
+            entry["last_used"] = time.time()
+            self._write_index(index)
+            return path
+
+    def put(self, source_key, tag_name, filename, src_path, sha256=None, verified=False):
+        """
+        Moves a fully downloaded archive into the cache, evicting the least
+        recently used archives if the size cap is exceeded. Returns the new path.
+        sha256 is the digest computed while downloading; verified records
+        whether it was checked against a published or pinned digest.
+        """
+        key = self._key(source_key, tag_name, filename)
+        path = self.path_for(source_key, tag_name, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock:
+            os.replace(src_path, path)
+            index = self._read_index()
+            index[key] = {
+                "source_key": source_key,
+                "tag_name": tag_name,
+                "filename": filename,
+                "size": os.path.getsize(path),
+                "sha256": sha256,
+                "verified": bool(verified),
+                "last_used": time.time(),
+            }
+            self._evict(index, protect=key)
+            self._write_index(index)
+        return path
+
+    def recorded_digest(self, source_key, tag_name, filename):
+        """Returns the SHA-256 recorded for a cached archive, or None."""
+        with self._lock:
+            entry = self._read_index().get(self._key(source_key, tag_name, filename))
+        return entry.get("sha256") if entry else None
+
+    def record_digest(self, source_key, tag_name, filename, sha256, verified=False):
+        """Stores the digest of an archive cached before digests were recorded."""
+        key = self._key(source_key, tag_name, filename)
+        with self._lock:
+            index = self._read_index()
+            if key in index:
+                index[key]["sha256"] = sha256
+                index[key]["verified"] = bool(verified)
+                self._write_index(index)
+
+    def _evict(self, index, protect=None):
+        total = sum(e.get("size", 0) for e in index.values())
+        for key in sorted(index, key=lambda k: index[k].get("last_used", 0)):
+            if total <= self.max_bytes:
+                break
+            if key == protect:
+                continue
+            size = index[key].get("size", 0)
+            if self._remove_entry(index, key):
+                total -= size
+
+    def _remove_entry(self, index, key):
+        """
+        Deletes a cached archive and drops it from the index. If the file
+        can't be deleted (e.g. it is open in another process on Windows) the
+        entry is kept, so it is still tracked and retried next time; returns
+        whether it was removed.
+        """
+        entry = index[key]
+        path = self.path_for(entry["source_key"], entry["tag_name"], entry["filename"])
+        try:
+            os.remove(path)
+            print(f"Evicted cached archive: {entry['filename']}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Could not remove cached archive {entry['filename']}: {e}")
+            return False
+        del index[key]
+        # Drop the now-empty tag folder
+        try:
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
+        return True
+
+    def remove(self, source_key, tag_name, filename):
+        """Drops a single archive from the cache."""
+        key = self._key(source_key, tag_name, filename)
+        with self._lock:
+            index = self._read_index()
+            if key in index:
+                self._remove_entry(index, key)
+                self._write_index(index)
+
+    def entries(self):
+        """Returns the index entries, most recently used first."""
+        with self._lock:
+            index = self._read_index()
+        return sorted(index.values(), key=lambda e: e.get("last_used", 0), reverse=True)
+
+    def total_size(self):
+        """Total size of all cached archives in bytes."""
+        return sum(e.get("size", 0) for e in self.entries())
+
+    def clear(self):
+        """Deletes every cached archive."""
+        with self._lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+
+_archive_cache = None
+_archive_cache_lock = threading.Lock()
+
+
+def get_archive_cache():
+    """Returns the process-wide ArchiveCache instance."""
+    global _archive_cache
+    with _archive_cache_lock:
+        if _archive_cache is None:
+            _archive_cache = ArchiveCache()
+        return _archive_cache
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: archive member matching and early exit during extraction.
+
+Builds a tar.gz shaped like a real DXVK 2.x release (x32 and x64 folders,
+five DLLs each, a few MB per DLL) and compares the CPU time per install of
+the previous extractor (tf.getmembers() plus a rebuilt lower-case list for
+every member) against the current one (precompiled "subfolder/dll" lookup,
+sequential read, stop once every wanted DLL is written).
+
+Usage: python benchmarks/bench_extract_matcher.py [--dll-mb 3] [--repeat 5]
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import DLL_MAP
+from github_downloader import GithubDownloader
+
+DXVK_DLLS = ["d3d8.dll", "d3d9.dll", "d3d10core.dll", "d3d11.dll", "dxgi.dll"]
+
+
+def build_archive(dll_mb):
+    """DLL-like content: half random, half zeros, so it compresses roughly like real PE files."""
+    buf = io.BytesIO()
+    size = int(dll_mb * 1024 * 1024)
+    with tarfile.open(fileobj=buf, mode="w:gz") as tf:
+        for subfolder in ("x32", "x64"):
+            for dll in DXVK_DLLS:
+                data = os.urandom(size // 2) + bytes(size - size // 2)
+                info = tarfile.TarInfo(f"dxvk-2.3/{subfolder}/{dll}")
+                info.size = len(data)
+                tf.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def legacy_extract(archive, extract_path, subfolder, dlls_to_extract):
+    """The extractor as it was before the precompiled matcher."""
+    with tarfile.open(fileobj=io.BytesIO(archive), mode="r:gz") as tf:
+        for member in tf.getmembers():
+            if not member.isfile():
+                continue
+            member_lower = member.name.replace("\\\\", "/").lower()
+            if f"/{subfolder.lower()}/" in member_lower:
+                dll_name = os.path.basename(member.name)
+                if dll_name.lower() in [d.lower() for d in dlls_to_extract]:
+                    source = tf.extractfile(member)
+                    with open(os.path.join(extract_path, dll_name), "wb") as target:
+                        target.write(source.read())
+
+
+def current_extract(archive, extract_path, subfolder, dlls_to_extract):
+    GithubDownloader()._extract_from_targz(io.BytesIO(archive), {subfolder: (extract_path, dlls_to_extract)})
+
+
+def measure(fn, archive, subfolder, dlls, repeat):
+    best = None
+    for _ in range(repeat):
+        target = tempfile.mkdtemp()
+        try:
+            start = time.process_time()
+            fn(archive, target, subfolder, dlls)
+            elapsed = time.process_time() - start
+        finally:
+            shutil.rmtree(target)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dll-mb", type=float, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    archive = build_archive(args.dll_mb)
+    print(f"Archive: {len(archive) / 1024 / 1024:.1f} MB compressed, best of {args.repeat} runs (CPU time)")
+    print(f"{'install':<22} {'legacy':>9} {'current':>9} {'speedup':>8}")
+    cases = [
+        ("x32 / Direct3D 9", "x32", DLL_MAP["Direct3D 9"]),
+        ("x32 / Unknown", "x32", DLL_MAP["Unknown"]),
+        ("x64 / Direct3D 11", "x64", DLL_MAP["Direct3D 11"]),
+    ]
+    # The extractors print one line per DLL; keep the table readable
+    stdout = sys.stdout
+    for label, subfolder, dlls in cases:
+        sys.stdout = io.StringIO()
+        try:
+            legacy = measure(legacy_extract, archive, subfolder, dlls, args.repeat)
+            current = measure(current_extract, archive, subfolder, dlls, args.repeat)
+        finally:
+            sys.stdout = stdout
+        print(f"{label:<22} {legacy * 1000:7.1f}ms {current * 1000:7.1f}ms {legacy / current:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
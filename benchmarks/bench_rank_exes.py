@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: in-process vs process-pool parsing of uncached executables.
+
+Ranks N executables with an empty detection cache, once with every file
+parsed in-process and once through the process pool. Workers are started
+with "spawn" by default, as they are on Windows, so each one pays for a
+fresh interpreter importing the analyser. The crossover is what
+PARALLEL_PARSE_MIN_FILES in exe_analyzer is based on.
+
+By default N small PE files are written to a temporary folder; they stay
+in the OS file cache, which shows the pool's fixed start-up cost. With
+--folder, real executables below that folder (e.g. a game library on a
+spinning disk or SMB share) are used instead. The OS caches what it
+reads, so for cold numbers run one --mode per fresh boot (or after
+dropping the file cache).
+
+Usage: python benchmarks/bench_rank_exes.py [--counts 2 16 64 256] [--workers 8]
+       [--start-method spawn] [--folder D:\\Games] [--mode both|serial|pool]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+
+import exe_analyzer
+from detection_cache import DetectionCache
+from folder_scanner import iter_exe_files
+from test_exe_analyzer import import_section, make_pe
+
+
+def write_exes(folder, count):
+    data, directories = import_section(dlls=["kernel32.dll", "user32.dll", "d3d11.dll"])
+    image = make_pe(0x8664, section_data=data, data_directories=directories)
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f"game{i}.exe")
+        with open(path, "wb") as f:
+            f.write(image)
+        paths.append(path)
+    return paths
+
+
+def find_exes(folder, count):
+    paths = []
+    for entry in iter_exe_files(folder, max_depth=6, patterns=[]):
+        paths.append(entry.path)
+        if len(paths) == count:
+            break
+    return paths
+
+
+def timed_rank(paths, cache_dir, parallel_min, workers):
+    exe_analyzer.PARALLEL_PARSE_MIN_FILES = parallel_min
+    cache = DetectionCache(os.path.join(cache_dir, f"detection-{time.perf_counter_ns()}.json"))
+    start = time.perf_counter()
+    exe_analyzer.rank_exes(paths, os.path.dirname(paths[0]), cache, max_workers=workers)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[2, 16, 64, 256])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--start-method", default="spawn", choices=multiprocessing.get_all_start_methods())
+    parser.add_argument("--folder", help="rank real executables found below this folder")
+    parser.add_argument("--mode", default="both", choices=["both", "serial", "pool"])
+    args = parser.parse_args()
+    multiprocessing.set_start_method(args.start_method)
+
+    print(f"{os.cpu_count()} CPUs, {args.workers} workers started with {args.start_method}")
+    print(f"{'files':>6} {'in-process':>12} {'pool':>12}")
+    for count in args.counts:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = find_exes(args.folder, count) if args.folder else write_exes(temp_dir, count)
+            if not paths:
+                sys.exit(f"No executables found below {args.folder}")
+            serial = pooled = None
+            if args.mode in ("both", "serial"):
+                serial = timed_rank(paths, temp_dir, len(paths) + 1, args.workers)
+            if args.mode in ("both", "pool"):
+                pooled = timed_rank(paths, temp_dir, 0, args.workers)
+        columns = [f"{t * 1000:>10.1f}ms" if t is not None else f"{'-':>12}" for t in (serial, pooled)]
+        print(f"{len(paths):>6} {columns[0]} {columns[1]}")
+
+
+if __name__ == "__main__":
+    main()
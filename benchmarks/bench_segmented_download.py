@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: single-stream vs segmented download of a DXVK-sized asset.
+
+Serves a random payload from a local HTTP server that throttles each
+connection (like a CDN with per-connection limits) and compares the
+throughput of one stream against N parallel range requests.
+
+Usage: python benchmarks/bench_segmented_download.py [--size-mb 12] [--segments 4] [--per-conn-mbps 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_session import create_session
+from segmented_download import download_segmented
+
+SEND_CHUNK = 16 * 1024
+
+
+class ThrottledRangeHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def _respond(self, send_body):
+        data = self.server.payload
+        start, end = 0, len(data) - 1
+        range_header = self.headers.get("Range")
+        if range_header and range_header.startswith("bytes="):
+            first, _, last = range_header[len("bytes="):].partition("-")
+            start = int(first)
+            end = int(last) if last else end
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if not send_body:
+            return
+        # Pace this connection to the configured bandwidth
+        delay = SEND_CHUNK / self.server.bytes_per_second
+        for offset in range(start, end + 1, SEND_CHUNK):
+            self.wfile.write(data[offset:min(offset + SEND_CHUNK, end + 1)])
+            time.sleep(delay)
+
+
+def single_stream(session, url, target):
+    with session.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        with open(target, "wb") as f:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                f.write(chunk)
+
+
+def timed(label, fn, size):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed:6.2f} s   {size / elapsed / 1024 / 1024:7.2f} MB/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=12)
+    parser.add_argument("--segments", type=int, default=4)
+    parser.add_argument("--per-conn-mbps", type=float, default=8, help="per-connection bandwidth in MB/s")
+    args = parser.parse_args()
+
+    payload = os.urandom(int(args.size_mb * 1024 * 1024))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottledRangeHandler)
+    server.payload = payload
+    server.bytes_per_second = args.per_conn_mbps * 1024 * 1024
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/dxvk.tar.gz"
+
+    session = create_session()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        target = os.path.join(temp_dir, "dxvk.tar.gz")
+        print(f"Asset: {len(payload) / 1024 / 1024:.1f} MB, {args.per_conn_mbps} MB/s per connection")
+        single = timed("single stream", lambda: single_stream(session, url, target), len(payload))
+        segmented = timed(
+            f"segmented x{args.segments}",
+            lambda: download_segmented(session, url, target, args.segments, 1024 * 1024),
+            len(payload),
+        )
+        with open(target, "rb") as f:
+            assert f.read() == payload, "segmented download produced a different file"
+        print(f"speedup: {single / segmented:.2f}x")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -54,9 +54,26 @@ def build_executable():
         # Local modules - must be explicitly included for PyInstaller
         "--hidden-import", "gui",
         "--hidden-import", "exe_analyzer",
+        "--hidden-import", "detection_cache",
+        "--hidden-import", "folder_scanner",
+        "--hidden-import", "library_index",
         "--hidden-import", "file_manager",
+        "--hidden-import", "io_scheduler",
         "--hidden-import", "logger",
         "--hidden-import", "github_downloader",
+        "--hidden-import", "archive_cache",
+        "--hidden-import", "release_cache",
+        "--hidden-import", "http_session",
+        "--hidden-import", "segmented_download",
+        "--hidden-import", "dll_store",
+        "--hidden-import", "singleflight",
+        "--hidden-import", "mirror_server",
+        "--hidden-import", "release_index",
+        "--hidden-import", "rate_limit",
+        "--hidden-import", "sqlite3",
+        "--hidden-import", "settings",
+        "--hidden-import", "json_store",
+        "--hidden-import", "constants",
         # Standard library modules
         "--hidden-import", "zipfile",
         "--hidden-import", "io",
@@ -1,6 +1,13 @@
 """
 Shared constants for DXVK Manager.
 """
+import os
+
+# Per-user data directory for logs, settings and caches.
+APP_DATA_DIR = os.path.join(
+    os.environ.get("LOCALAPPDATA", os.path.expanduser("~")),
+    "DXVK Manager",
+)
 
 # Maps DirectX version → list of DLLs to install/extract.
 # DXVK does not ship d3d10.dll — it uses d3d10core.dll for D3D10 support.
@@ -0,0 +1,123 @@
+"""
+Persistent cache of executable analysis results.
+
+Entries are keyed by the exe's absolute path and remembered together with
+its size and mtime_ns; if either has changed the entry is treated as
+missing, so an updated game is always re-analysed. A format version is
+stored too, so results from an older analyser are not reused.
+"""
+import os
+import threading
+import time
+from constants import APP_DATA_DIR
+from json_store import read_json, write_json
+
+# Bump whenever the shape or meaning of stored results changes
+ANALYSIS_VERSION = 4
+
+# Oldest entries are dropped beyond this many cached executables
+MAX_ENTRIES = 2000
+
+
+def _stat_signature(path):
+    """Returns (size, mtime_ns) for a file, or None if it can't be read."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class DetectionCache:
+    def __init__(self, cache_file=None):
+        if cache_file is None:
+            cache_dir = os.path.join(APP_DATA_DIR, "cache")
+            os.makedirs(cache_dir, exist_ok=True)
+            cache_file = os.path.join(cache_dir, "detection.json")
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(exe_path):
+        return os.path.normcase(os.path.abspath(exe_path))
+
+    def _read(self):
+        return read_json(self.cache_file)
+
+    def _write(self, entries):
+        if len(entries) > MAX_ENTRIES:
+            newest = sorted(entries, key=lambda k: entries[k].get("analyzed_at", 0), reverse=True)
+            entries = {key: entries[key] for key in newest[:MAX_ENTRIES]}
+        write_json(self.cache_file, entries)
+
+    def get(self, exe_path, signature=None):
+        """
+        Returns the stored analysis result for an exe, or None if there is
+        none or the file's size or modification time no longer match.
+        signature is the exe's (size, mtime_ns) if the caller already has it.
+        """
+        if signature is None:
+            signature = _stat_signature(exe_path)
+        if signature is None:
+            return None
+        return self.get_many({exe_path: signature})[exe_path]
+
+    def get_many(self, signatures):
+        """Like get() for {exe_path: (size, mtime_ns)}, reading the file once; returns {exe_path: result or None}."""
+        with self._lock:
+            entries = self._read()
+        results = {}
+        for exe_path, signature in signatures.items():
+            entry = entries.get(self._key(exe_path))
+            if (
+                entry is None
+                or entry.get("version") != ANALYSIS_VERSION
+                or (entry.get("size"), entry.get("mtime_ns")) != tuple(signature)
+            ):
+                results[exe_path] = None
+            else:
+                results[exe_path] = entry.get("result")
+        return results
+
+    def put(self, exe_path, result, signature=None):
+        """Stores an analysis result (a JSON-serialisable dict) for the exe as it is now."""
+        self.put_many([(exe_path, result, signature)])
+
+    def put_many(self, items):
+        """Like put() for several (exe_path, result, signature) items, writing the file once."""
+        now = time.time()
+        updates = {}
+        for exe_path, result, signature in items:
+            if signature is None:
+                signature = _stat_signature(exe_path)
+            if signature is not None:
+                updates[self._key(exe_path)] = {
+                    "size": signature[0],
+                    "mtime_ns": signature[1],
+                    "version": ANALYSIS_VERSION,
+                    "result": result,
+                    "analyzed_at": now,
+                }
+        if not updates:
+            return
+        with self._lock:
+            entries = self._read()
+            entries.update(updates)
+            self._write(entries)
+
+    def clear(self):
+        with self._lock:
+            self._write({})
+
+
+_detection_cache = None
+_detection_cache_lock = threading.Lock()
+
+
+def get_detection_cache():
+    """Returns the process-wide DetectionCache instance."""
+    global _detection_cache
+    with _detection_cache_lock:
+        if _detection_cache is None:
+            _detection_cache = DetectionCache()
+        return _detection_cache
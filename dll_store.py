@@ -0,0 +1,189 @@
+"""
+Content-addressed store of extracted DXVK DLL sets.
+
+Each (source, tag, x32/x64) set of DLLs is extracted once and kept under
+objects/<sha256>/, where the digest covers every DLL name and content in
+the set. refs.json maps "<source>/<tag>/<subfolder>" to that digest plus
+the per-file hashes, which are re-checked before a set is used.
+"""
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+from constants import APP_DATA_DIR
+from json_store import read_json, write_json
+
+REFS_FILE = "refs.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(path):
+    """Returns the hex SHA-256 of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _set_digest(file_hashes):
+    """Digest of a whole DLL set, independent of file order."""
+    digest = hashlib.sha256()
+    for name in sorted(file_hashes):
+        digest.update(f"{name.lower()}:{file_hashes[name]}\n".encode())
+    return digest.hexdigest()
+
+
+class DLLStore:
+    def __init__(self, store_dir=None):
+        if store_dir is None:
+            store_dir = os.path.join(APP_DATA_DIR, "dll_store")
+        self.store_dir = store_dir
+        self.objects_dir = os.path.join(store_dir, "objects")
+        self._lock = threading.Lock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    @staticmethod
+    def _ref_key(source_key, tag_name, subfolder):
+        return f"{source_key}/{tag_name}/{subfolder}"
+
+    def _read_refs(self):
+        return read_json(os.path.join(self.store_dir, REFS_FILE))
+
+    def _write_refs(self, refs):
+        write_json(os.path.join(self.store_dir, REFS_FILE), refs, indent=4)
+
+    def object_dir(self, digest):
+        return os.path.join(self.objects_dir, digest)
+
+    def lookup(self, source_key, tag_name, subfolder, dll_names=None):
+        """
+        Returns the directory holding this release's DLLs for the given
+        subfolder ('x32' or 'x64'), or None if it isn't stored. The requested
+        DLLs (all of them if dll_names is None) are verified against their
+        recorded SHA-256 first; a damaged set is dropped and None returned.
+        """
+        key = self._ref_key(source_key, tag_name, subfolder)
+        with self._lock:
+            ref = self._read_refs().get(key)
+        if ref is None:
+            return None
+
+        set_dir = self.object_dir(ref["digest"])
+        files = ref.get("files", {})
+        wanted = [d for d in files if dll_names is None or d.lower() in {n.lower() for n in dll_names}]
+        for dll in wanted:
+            path = os.path.join(set_dir, dll)
+            try:
+                ok = sha256_file(path) == files[dll]
+            except OSError:
+                ok = False
+            if not ok:
+                print(f"Stored {dll} for {tag_name} ({subfolder}) failed verification. Discarding it.")
+                self._discard(key)
+                return None
+        return set_dir
+
+    def add(self, source_key, tag_name, subfolder, src_dir):
+        """
+        Hashes the DLLs in src_dir, stores them under their set digest and
+        records the reference. Returns the stored set's directory.
+        """
+        file_hashes = {
+            name: sha256_file(os.path.join(src_dir, name))
+            for name in os.listdir(src_dir)
+            if name.lower().endswith(".dll") and os.path.isfile(os.path.join(src_dir, name))
+        }
+        if not file_hashes:
+            raise ValueError(f"No DLLs to store in {src_dir}")
+
+        digest = _set_digest(file_hashes)
+        set_dir = self.object_dir(digest)
+        # Held throughout so prune() can't collect a set before its reference is written
+        with self._lock:
+            if not os.path.isdir(set_dir):
+                # Copy next to the final location and rename, so readers never see a half-written set
+                tmp_dir = os.path.join(self.objects_dir, f".{digest}.{uuid.uuid4().hex}.tmp")
+                os.makedirs(tmp_dir)
+                try:
+                    for name in file_hashes:
+                        shutil.copy2(os.path.join(src_dir, name), os.path.join(tmp_dir, name))
+                    os.replace(tmp_dir, set_dir)
+                except OSError:
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    raise
+
+            refs = self._read_refs()
+            refs[self._ref_key(source_key, tag_name, subfolder)] = {
+                "source_key": source_key,
+                "tag_name": tag_name,
+                "subfolder": subfolder,
+                "digest": digest,
+                "files": file_hashes,
+                "stored_at": time.time(),
+            }
+            self._write_refs(refs)
+        print(f"Stored {len(file_hashes)} DLL(s) for {tag_name} ({subfolder}) in the DLL store.")
+        return set_dir
+
+    def versions(self, source_key=None):
+        """Returns the stored references, optionally limited to one source."""
+        with self._lock:
+            refs = self._read_refs()
+        return [r for r in refs.values() if source_key is None or r["source_key"] == source_key]
+
+    def prune(self, source_key=None, tag_name=None, keep_tags=None):
+        """
+        Removes stored sets matching source_key/tag_name (None matches
+        anything), except tags listed in keep_tags. Returns the number of
+        references removed.
+        """
+        keep_tags = set(keep_tags or [])
+        with self._lock:
+            refs = self._read_refs()
+            doomed = [
+                key for key, ref in refs.items()
+                if (source_key is None or ref["source_key"] == source_key)
+                and (tag_name is None or ref["tag_name"] == tag_name)
+                and ref["tag_name"] not in keep_tags
+            ]
+            for key in doomed:
+                del refs[key]
+            self._write_refs(refs)
+            self._collect_garbage(refs)
+        return len(doomed)
+
+    def _discard(self, key):
+        """Drops a damaged set, and every reference sharing it, so it gets re-extracted."""
+        with self._lock:
+            refs = self._read_refs()
+            ref = refs.get(key)
+            if ref is None:
+                return
+            refs = {k: r for k, r in refs.items() if r["digest"] != ref["digest"]}
+            self._write_refs(refs)
+            shutil.rmtree(self.object_dir(ref["digest"]), ignore_errors=True)
+
+    def _collect_garbage(self, refs):
+        """Deletes object directories no reference points at any more."""
+        live = {ref["digest"] for ref in refs.values()}
+        for name in os.listdir(self.objects_dir):
+            if name.startswith("."):
+                continue
+            if name not in live:
+                shutil.rmtree(os.path.join(self.objects_dir, name), ignore_errors=True)
+
+
+_dll_store = None
+_dll_store_lock = threading.Lock()
+
+
+def get_dll_store():
+    """Returns the process-wide DLLStore instance."""
+    global _dll_store
+    with _dll_store_lock:
+        if _dll_store is None:
+            _dll_store = DLLStore()
+        return _dll_store
@@ -1,9 +1,18 @@
+import argparse
+import multiprocessing
 import os
 import tempfile
-from github_downloader import GithubDownloader, get_downloader
+import time
+from concurrent.futures import ThreadPoolExecutor
+from github_downloader import ARCH_SUBFOLDERS, DownloadCancelled, get_downloader
+from dll_store import get_dll_store
+from singleflight import SingleFlight, WaitCancelled
 from constants import DLL_MAP
 from file_manager import FileManager
+from io_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE
 from logger import Logger
+from mirror_server import DEFAULT_PORT as DEFAULT_MIRROR_PORT, serve_mirror
+from library_index import SOURCE_USER, default_library_roots, get_library_index
 
 # Import GUI at module level for PyInstaller compatibility
 # This ensures PyInstaller includes the gui module in the executable
@@ -13,12 +22,194 @@ except ImportError:
     # Fallback if gui module not available (shouldn't happen in normal use)
     DXVKManagerGUI = None
 
+# Shared by every DXVKManager in the process, so the GUI and batch jobs dedupe too
+_release_flights = SingleFlight()
+
+# Games installed into side by side by install_many
+INSTALL_WORKERS = 8
+
+
 class DXVKManager:
     def __init__(self):
-        self.downloader = GithubDownloader()  # kept for backward compatibility
+        # Kept for backward compatibility; installs pick their own downloader per call
+        self.downloader = get_downloader('official')
         self.file_manager = FileManager()
+        self.dll_store = get_dll_store()
+        self.flights = _release_flights
         self.logger = Logger()
 
+    def _extract_release_to_store(self, downloader, release_info, download_url, file_format, cancel_check=None):
+        """
+        Downloads a release and adds every DLL for both architectures to the
+        DLL store, so any later arch/DirectX combination is served from it.
+        """
+        tag_name = release_info['tag_name']
+        with tempfile.TemporaryDirectory() as temp_dir:
+            print(f"Extracting DXVK to temporary directory: {temp_dir}")
+            extracted = downloader.download_and_extract_all(
+                download_url, temp_dir, file_format,
+                tag_name=tag_name,
+                download_filename=release_info.get('download_filename'),
+                expected_digest=release_info.get('download_digest'),
+                cancel_check=cancel_check,
+            )
+            for subfolder, names in extracted.items():
+                if names:
+                    self.dll_store.add(downloader.source_key, tag_name, subfolder,
+                                       os.path.join(temp_dir, subfolder))
+
+    def _ensure_release_stored(self, downloader, release_info, download_url, file_format, subfolder,
+                               cancel_check=None):
+        """
+        Makes sure the release's DLLs are in the DLL store. Concurrent callers
+        for the same release share one download; the others wait for it,
+        still polling their own cancel_check.
+        """
+        tag_name = release_info['tag_name']
+
+        def extract_once():
+            # A flight that finished just before ours may already have stored it
+            if not self.dll_store.lookup(downloader.source_key, tag_name, subfolder):
+                self._extract_release_to_store(downloader, release_info, download_url, file_format, cancel_check)
+
+        while True:
+            try:
+                return self.flights.do((downloader.source_key, tag_name), extract_once, cancel_check)
+            except WaitCancelled:
+                raise DownloadCancelled("Download cancelled.")
+            except DownloadCancelled:
+                # The flight we joined was a prefetch that got cancelled; run our own
+                if cancel_check is not None and cancel_check():
+                    raise
+
+    def prefetch(self, source='official', version=None, cancel_check=None):
+        """
+        Downloads a release into the archive cache and DLL store ahead of an
+        install, so the install itself needs no network. Returns the resolved
+        tag. cancel_check is polled while downloading; see DownloadCancelled.
+        """
+        downloader = get_downloader(source)
+        release_info = downloader.get_release_info(version)
+        tag_name = release_info['tag_name']
+        if any(self.dll_store.lookup(downloader.source_key, tag_name, sub) for sub in ARCH_SUBFOLDERS):
+            return tag_name
+        download_url = release_info.get('download_url') or release_info.get('zipball_url')
+        if not download_url:
+            raise ValueError(f"No downloadable asset for DXVK {tag_name}.")
+        file_format = release_info.get('download_format', 'tar.gz')
+        self._ensure_release_stored(downloader, release_info, download_url, file_format,
+                                    ARCH_SUBFOLDERS[-1], cancel_check)
+        return tag_name
+
+    @staticmethod
+    def _validate_target(game_folder, architecture):
+        if not game_folder or not os.path.exists(game_folder):
+            raise ValueError(f"Game folder does not exist: {game_folder}")
+
+        if architecture not in ["32-bit", "64-bit"]:
+            if architecture in ["Not detected", "Unknown", "Error"]:
+                raise ValueError(
+                    "Could not detect game architecture (32-bit or 64-bit).\n\n"
+                    "Please ensure:\n"
+                    "• You selected the folder containing the game's main .exe file\n"
+                    "• The .exe file is a valid Windows executable\n"
+                    "• The game folder is accessible"
+                )
+            else:
+                raise ValueError(f"Invalid architecture: {architecture}")
+
+    def _resolve_release(self, source, version):
+        """Returns (downloader, release_info, download_url, file_format) for a source and version."""
+        downloader = get_downloader(source)
+        if version:
+            print(f"Fetching DXVK release {version} from {downloader.source_name}...")
+        else:
+            print(f"Fetching latest DXVK release from {downloader.source_name}...")
+        release_info = downloader.get_release_info(version)
+        download_url = release_info.get('download_url') or release_info.get('zipball_url')
+        file_format = release_info.get('download_format', 'tar.gz')
+
+        if not download_url:
+            raise ValueError("Could not find download URL in release information. The DXVK release may not have a downloadable asset.")
+
+        print(f"DXVK version: {release_info['tag_name']}")
+        print(f"Download URL: {download_url}")
+        print(f"File format: {file_format}")
+        return downloader, release_info, download_url, file_format
+
+    def _stored_dll_dir(self, downloader, release_info, download_url, file_format, subfolder, dlls_to_install):
+        """Finds the release's DLLs in the local store, extracting them on first use."""
+        resolved_version = release_info['tag_name']
+        dll_dir = self.dll_store.lookup(downloader.source_key, resolved_version, subfolder, dlls_to_install)
+        if dll_dir:
+            print(f"Using stored DXVK {resolved_version} DLLs ({subfolder}).")
+            return dll_dir
+        # Download and extract DXVK, or wait for a download of it already
+        # in progress (another install or a background prefetch).
+        self._ensure_release_stored(downloader, release_info, download_url, file_format, subfolder)
+        dll_dir = self.dll_store.lookup(downloader.source_key, resolved_version, subfolder)
+        if not dll_dir:
+            raise ValueError(
+                f"Failed to extract any required DLLs. Missing: {', '.join(dlls_to_install)}. "
+                f"The DXVK release may have a different structure."
+            )
+        return dll_dir
+
+    def _install_into_game(self, game_folder, architecture, directx_version, backup_enabled,
+                           resolved_version, dll_dir, dlls_to_install, priority=PRIORITY_INTERACTIVE):
+        """Backs up and copies the DLLs into one game folder. Returns the installed DLL names."""
+        # Verify the DLLs are available - only check for DLLs that actually exist
+        missing_dlls = []
+        extracted_dlls = []
+        for dll in dlls_to_install:
+            dll_path = os.path.join(dll_dir, dll)
+            if os.path.exists(dll_path):
+                extracted_dlls.append(dll)
+            else:
+                missing_dlls.append(dll)
+
+        # If we have at least some DLLs extracted, proceed (especially for Unknown case)
+        if not extracted_dlls:
+            raise ValueError(f"Failed to extract any required DLLs. Missing: {', '.join(missing_dlls)}. The DXVK release may have a different structure.")
+
+        # Warn about missing DLLs but don't fail if we have some
+        if missing_dlls:
+            print(f"Warning: Some DLLs were not found: {', '.join(missing_dlls)}. Continuing with available DLLs: {', '.join(extracted_dlls)}")
+            # Update dlls_to_install to only include what we actually have
+            dlls_to_install = extracted_dlls
+
+        # Backup existing DLLs if requested
+        if backup_enabled:
+            print("Creating backup of existing DLLs...")
+            self.file_manager.backup_dlls(game_folder, dlls_to_install, priority)
+
+        # Copy DXVK DLLs to game folder
+        print("Installing DXVK DLLs...")
+        self.file_manager.copy_dlls(dll_dir, game_folder, dlls_to_install, priority)
+
+        # Verify installation
+        installed_dlls = []
+        for dll in dlls_to_install:
+            dll_path = os.path.join(game_folder, dll)
+            if os.path.exists(dll_path):
+                installed_dlls.append(dll)
+            else:
+                print(f"Warning: {dll} was not installed successfully.")
+
+        if not installed_dlls:
+            raise ValueError(
+                "No DLLs were installed.\n\n"
+                "Possible causes:\n"
+                "• Game folder requires administrator privileges (try running as Admin)\n"
+                "• Game is currently running (close it first)\n"
+                "• Antivirus is blocking file operations\n"
+                "• Folder is read-only or protected"
+            )
+
+        # Log the installation
+        self.logger.log_installation(game_folder, architecture, directx_version, resolved_version)
+        return installed_dlls
+
     def install_dxvk(self, game_folder, architecture, directx_version, backup_enabled,
                       source='official', version=None):
         """
@@ -28,111 +219,132 @@ class DXVKManager:
         version: a specific release tag_name to install, or None to use the latest.
         """
         try:
-            # Validate inputs
-            if not game_folder or not os.path.exists(game_folder):
-                raise ValueError(f"Game folder does not exist: {game_folder}")
-            
-            if architecture not in ["32-bit", "64-bit"]:
-                if architecture in ["Not detected", "Unknown", "Error"]:
-                    raise ValueError(
-                        "Could not detect game architecture (32-bit or 64-bit).\n\n"
-                        "Please ensure:\n"
-                        "• You selected the folder containing the game's main .exe file\n"
-                        "• The .exe file is a valid Windows executable\n"
-                        "• The game folder is accessible"
-                    )
-                else:
-                    raise ValueError(f"Invalid architecture: {architecture}")
-            
-            # Step 1: Get DXVK release info for the chosen source/version
-            downloader = get_downloader(source)
-            self.downloader = downloader  # keep in sync for any external callers
-            if version:
-                print(f"Fetching DXVK release {version} from {downloader.source_name}...")
-            else:
-                print(f"Fetching latest DXVK release from {downloader.source_name}...")
-            release_info = downloader.get_release_info(version)
-            resolved_version = release_info['tag_name']
-            download_url = release_info.get('download_url') or release_info.get('zipball_url')
-            file_format = release_info.get('download_format', 'tar.gz')
-            
-            if not download_url:
-                raise ValueError("Could not find download URL in release information. The DXVK release may not have a downloadable asset.")
-            
-            print(f"DXVK version: {resolved_version}")
-            print(f"Download URL: {download_url}")
-            print(f"File format: {file_format}")
+            self._validate_target(game_folder, architecture)
+            downloader, release_info, download_url, file_format = self._resolve_release(source, version)
+
+            subfolder = 'x64' if architecture == '64-bit' else 'x32'
+            dlls_to_install = DLL_MAP.get(directx_version, DLL_MAP['Unknown'])
+            dll_dir = self._stored_dll_dir(downloader, release_info, download_url, file_format,
+                                           subfolder, dlls_to_install)
+            installed_dlls = self._install_into_game(
+                game_folder, architecture, directx_version, backup_enabled,
+                release_info['tag_name'], dll_dir, dlls_to_install,
+            )
+
+            print(f"DXVK installation completed successfully! Installed: {', '.join(installed_dlls)}")
+            return True
             
-            # Step 2: Create temporary directory for extraction
-            with tempfile.TemporaryDirectory() as temp_dir:
-                print(f"Extracting DXVK to temporary directory: {temp_dir}")
-                
-                # Step 3: Download and extract DXVK
-                downloader.download_and_extract_dxvk(download_url, temp_dir, architecture, directx_version, file_format)
-                
-                # Step 4: Determine which DLLs to install
-                dlls_to_install = DLL_MAP.get(directx_version, DLL_MAP['Unknown'])
-                
-                # Verify DLLs were extracted - only check for DLLs that actually exist
-                missing_dlls = []
-                extracted_dlls = []
-                for dll in dlls_to_install:
-                    dll_path = os.path.join(temp_dir, dll)
-                    if os.path.exists(dll_path):
-                        extracted_dlls.append(dll)
-                    else:
-                        missing_dlls.append(dll)
-                
-                # If we have at least some DLLs extracted, proceed (especially for Unknown case)
-                if not extracted_dlls:
-                    raise ValueError(f"Failed to extract any required DLLs. Missing: {', '.join(missing_dlls)}. The DXVK release may have a different structure.")
-                
-                # Warn about missing DLLs but don't fail if we have some
-                if missing_dlls:
-                    print(f"Warning: Some DLLs were not found: {', '.join(missing_dlls)}. Continuing with available DLLs: {', '.join(extracted_dlls)}")
-                    # Update dlls_to_install to only include what we actually have
-                    dlls_to_install = extracted_dlls
-                
-                # Step 5: Backup existing DLLs if requested
-                if backup_enabled:
-                    print("Creating backup of existing DLLs...")
-                    self.file_manager.backup_dlls(game_folder, dlls_to_install)
-                
-                # Step 6: Copy DXVK DLLs to game folder
-                print("Installing DXVK DLLs...")
-                self.file_manager.copy_dlls(temp_dir, game_folder, dlls_to_install)
-                
-                # Verify installation
-                installed_dlls = []
-                for dll in dlls_to_install:
-                    dll_path = os.path.join(game_folder, dll)
-                    if os.path.exists(dll_path):
-                        installed_dlls.append(dll)
-                    else:
-                        print(f"Warning: {dll} was not installed successfully.")
-                
-                if not installed_dlls:
-                    raise ValueError(
-                        "No DLLs were installed.\n\n"
-                        "Possible causes:\n"
-                        "• Game folder requires administrator privileges (try running as Admin)\n"
-                        "• Game is currently running (close it first)\n"
-                        "• Antivirus is blocking file operations\n"
-                        "• Folder is read-only or protected"
-                    )
-                
-                # Step 7: Log the installation
-                self.logger.log_installation(game_folder, architecture, directx_version, resolved_version)
-                
-                print(f"DXVK installation completed successfully! Installed: {', '.join(installed_dlls)}")
-                return True
-                
         except Exception as e:
             print(f"Installation failed: {str(e)}")
             import traceback
             print(f"Error details: {traceback.format_exc()}")
             return False
 
+    def _prepare_release(self, source, version, subfolders):
+        """
+        Resolves a source/version and makes sure its DLLs are stored for
+        every subfolder (architecture) in subfolders.
+        Returns (downloader, release_info, download_url, file_format).
+        """
+        downloader, release_info, download_url, file_format = self._resolve_release(source, version)
+        for subfolder in sorted(subfolders):
+            if not self.dll_store.lookup(downloader.source_key, release_info['tag_name'], subfolder):
+                # One pass over the archive stores every architecture
+                self._ensure_release_stored(downloader, release_info, download_url, file_format, subfolder)
+                break
+        return downloader, release_info, download_url, file_format
+
+    def install_many(self, targets, max_workers=INSTALL_WORKERS):
+        """
+        Installs DXVK into many games at once. Each target is a dict with
+        game_folder, architecture and directx_version, and optionally
+        backup_enabled (default True), source ('official') and version
+        (None for the latest). Targets are validated first, so invalid ones
+        never cause a download. Every distinct source/version is then
+        resolved and extracted once; the per-game backup and copy run on a
+        pool of max_workers threads, at batch priority so that interactive
+        installs on the same volume go first.
+
+        Returns one result per target, in order: {game_folder, success,
+        error, source, version, installed, resolve_seconds, install_seconds}.
+        """
+        targets = [dict({"backup_enabled": True, "source": "official", "version": None}, **t) for t in targets]
+        if not targets:
+            return []
+        workers = max(1, min(max_workers or INSTALL_WORKERS, len(targets)))
+
+        invalid = {}
+        for i, target in enumerate(targets):
+            try:
+                self._validate_target(target.get("game_folder"), target.get("architecture"))
+            except ValueError as e:
+                print(f"Skipping {target.get('game_folder')}: {e}")
+                invalid[i] = e
+
+        def prepare(key):
+            source, version = key
+            started = time.perf_counter()
+            try:
+                return self._prepare_release(source, version, subfolders[key]), None, time.perf_counter() - started
+            except Exception as e:
+                print(f"Could not prepare DXVK {version or 'latest'} from {source}: {e}")
+                return None, e, time.perf_counter() - started
+
+        # One resolve (and at most one download) per source/version, run side by side
+        subfolders = {}
+        for i, target in enumerate(targets):
+            if i not in invalid:
+                subfolder = 'x64' if target["architecture"] == '64-bit' else 'x32'
+                subfolders.setdefault((target["source"], target["version"]), set()).add(subfolder)
+        releases = {}
+        if subfolders:
+            with ThreadPoolExecutor(max_workers=min(workers, len(subfolders))) as pool:
+                releases = dict(zip(subfolders, pool.map(prepare, subfolders)))
+
+        def install_one(item):
+            i, target = item
+            if i in invalid:
+                release, release_error, resolve_seconds = None, invalid[i], 0.0
+            else:
+                release, release_error, resolve_seconds = releases[(target["source"], target["version"])]
+            result = {
+                "game_folder": target.get("game_folder"),
+                "success": False,
+                "error": None,
+                "source": target["source"],
+                "version": release[1]['tag_name'] if release else target["version"],
+                "installed": [],
+                "resolve_seconds": round(resolve_seconds, 3),
+                "install_seconds": 0.0,
+            }
+            started = time.perf_counter()
+            try:
+                if release is None:
+                    raise release_error
+                downloader, release_info, download_url, file_format = release
+                subfolder = 'x64' if target["architecture"] == '64-bit' else 'x32'
+                dlls_to_install = DLL_MAP.get(target.get("directx_version"), DLL_MAP['Unknown'])
+                dll_dir = self._stored_dll_dir(downloader, release_info, download_url, file_format,
+                                               subfolder, dlls_to_install)
+                result["installed"] = self._install_into_game(
+                    target["game_folder"], target["architecture"], target.get("directx_version", "Unknown"),
+                    target["backup_enabled"], release_info['tag_name'], dll_dir, dlls_to_install,
+                    PRIORITY_BATCH,
+                )
+                result["success"] = True
+            except Exception as e:
+                if i not in invalid:
+                    print(f"Installation into {target.get('game_folder')} failed: {e}")
+                result["error"] = str(e)
+            result["install_seconds"] = round(time.perf_counter() - started, 3)
+            return result
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(install_one, enumerate(targets)))
+        succeeded = sum(1 for r in results if r["success"])
+        print(f"Installed DXVK into {succeeded} of {len(results)} games.")
+        return results
+
     def uninstall_dxvk(self, game_folder):
         """Uninstalls DXVK by restoring backups."""
         try:
@@ -141,8 +353,51 @@ class DXVKManager:
             print(f"Uninstallation failed: {str(e)}")
             return False
 
-def main():
-    """Main entry point for the application."""
+def scan_library(extra_roots=(), max_workers=None):
+    """Refreshes the library index and prints every game found."""
+    roots = default_library_roots()
+    roots[SOURCE_USER] = roots[SOURCE_USER] + list(extra_roots)
+    index = get_library_index()
+    started = time.time()
+    counts = index.refresh(roots, max_workers=max_workers)
+    for game in index.games():
+        directx = ", ".join(game.get("directx") or ["Unknown"])
+        exe = os.path.basename(game["exe"]) if game.get("exe") else "no .exe found"
+        if game.get("error"):
+            exe = f"analysis failed ({game['error']})"
+        print(f"[{game['source']}] {game['name']}: {exe}, {game.get('architecture', 'Unknown')}, {directx}")
+    print(
+        f"{len(index.games())} games ({counts['added']} new, {counts['updated']} changed, "
+        f"{counts['removed']} removed) in {time.time() - started:.1f}s"
+    )
+
+def main(argv=None):
+    """
+    Main entry point for the application. With no arguments the GUI starts;
+    "serve-mirror" shares this machine's archive cache with the LAN instead,
+    and "scan-library" indexes the installed Steam/GOG/Epic games.
+    """
+    # Needed for the exe ranking process pool in the frozen Windows build
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(prog="dxvk_manager", description="DXVK Manager")
+    commands = parser.add_subparsers(dest="command")
+    mirror = commands.add_parser("serve-mirror", help="Serve the local DXVK archive cache to other machines")
+    mirror.add_argument("--host", default="0.0.0.0", help="Address to listen on (default: all interfaces)")
+    mirror.add_argument("--port", type=int, default=DEFAULT_MIRROR_PORT, help="Port to listen on")
+    mirror.add_argument("--cache-dir", help="Archive cache to serve (default: this user's cache)")
+    library = commands.add_parser("scan-library", help="Find installed games and detect their DXVK settings")
+    library.add_argument("--root", action="append", default=[], help="Extra folder of game folders (repeatable)")
+    library.add_argument("--workers", type=int, help="Analysis processes (default: one per CPU)")
+    # Unknown arguments are left for Qt (e.g. -style)
+    args, _ = parser.parse_known_args(argv)
+
+    if args.command == "serve-mirror":
+        serve_mirror(args.host, args.port, args.cache_dir)
+        return
+    if args.command == "scan-library":
+        scan_library(args.root, args.workers)
+        return
+
     if DXVKManagerGUI is None:
         print("Error: GUI module not found!")
         print("Please ensure gui.py is in the same directory as dxvk_manager.py")
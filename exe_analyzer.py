@@ -1,9 +1,228 @@
 """
 Windows-only executable analyzer for PE files.
 """
+import mmap
 import os
+import re
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import pefile
 
+IMAGE_FILE_MACHINE_I386 = 0x14c
+IMAGE_FILE_MACHINE_AMD64 = 0x8664
+
+# Optional header magic values (PE32 and PE32+)
+PE32_MAGIC = 0x10b
+PE32_PLUS_MAGIC = 0x20b
+
+# Offsets into the DOS and COFF headers
+_E_LFANEW_OFFSET = 0x3c
+_COFF_HEADER_SIZE = 20
+
+IMAGE_DIRECTORY_ENTRY_IMPORT = 1
+IMAGE_DIRECTORY_ENTRY_DELAY_IMPORT = 13
+
+# Sanity limits for malformed or hostile files
+_MAX_SECTIONS = 96
+_MAX_IMPORT_DESCRIPTORS = 4096
+_MAX_NAME_LENGTH = 256
+
+# Imported DLLs that give away a game's Direct3D version
+DIRECTX_IMPORTS = {
+    "d3d9.dll": "Direct3D 9",
+    "d3d10.dll": "Direct3D 10",
+    "d3d10_1.dll": "Direct3D 10",
+    "d3d10core.dll": "Direct3D 10",
+    "d3d11.dll": "Direct3D 11",
+}
+# dxgi.dll alone is left out: D3D12 games import it too
+DIRECTX_VERSIONS = ["Direct3D 9", "Direct3D 10", "Direct3D 11"]
+
+# Sibling DLLs checked for imports when the exe itself doesn't tell
+MAX_SIBLING_DLLS = 64
+
+IMAGE_SUBSYSTEM_WINDOWS_GUI = 2
+IMAGE_SUBSYSTEM_WINDOWS_CUI = 3
+
+# Executables that ship next to games but are never the game itself. "crash"
+# and "setup" only count as whole words (CrashHandler, crash_reporter,
+# Setup.exe, GameSetup), so games such as "Crash Bandicoot" aren't caught.
+HELPER_EXE_PATTERN = re.compile(
+    r"crash[\s_-]?(?:handler|report|reporter|sender|pad|dump|uploader)|bugsplat|bugreport|"
+    r"errorreport|redist|vcredist|vc_redist|dxsetup|dxwebsetup|dotnet|physx|prereq|unins\d*|"
+    r"uninstall|^setup|setup$|installer|easyanticheat|eac_|battleye|be_service|updater|"
+    r"cefprocess|webhelper|ue4prereq",
+    re.IGNORECASE,
+)
+# Often a real, but secondary, executable
+SECONDARY_EXE_PATTERN = re.compile(r"launcher|config|settings|editor|server|benchmark", re.IGNORECASE)
+
+# The top candidate is picked without asking when it leads by at least this much
+CLEAR_WIN_MARGIN = 3
+
+# Fewer uncached executables than this are parsed in-process. A header parse
+# takes ~0.1 ms once the file is in the OS cache, while starting the pool
+# (spawned interpreters on Windows) takes around half a second, so the pool
+# only pays off for many cold files on a slow disk or share. See
+# benchmarks/bench_rank_exes.py.
+PARALLEL_PARSE_MIN_FILES = 64
+
+
+class MalformedPEError(ValueError):
+    """The file's headers can't be read by the fast path."""
+
+
+def _parse_headers(mm):
+    """
+    Returns the header fields used here from a mapped PE file:
+    machine, magic, image_base, subsystem, directories [(rva, size), ...] and
+    sections [(virtual_address, virtual_size, raw_offset, raw_size), ...].
+    """
+    if len(mm) < 0x40 or mm[:2] != b"MZ":
+        raise MalformedPEError("No DOS header")
+    nt_offset = struct.unpack_from("<I", mm, _E_LFANEW_OFFSET)[0]
+    optional_offset = nt_offset + 4 + _COFF_HEADER_SIZE
+    if optional_offset + 2 > len(mm) or mm[nt_offset:nt_offset + 4] != b"PE\0\0":
+        raise MalformedPEError("No PE signature")
+    machine, section_count = struct.unpack_from("<HH", mm, nt_offset + 4)
+    optional_size = struct.unpack_from("<H", mm, nt_offset + 20)[0]
+    magic = struct.unpack_from("<H", mm, optional_offset)[0]
+    if magic == PE32_MAGIC:
+        image_base = struct.unpack_from("<I", mm, optional_offset + 28)[0]
+        directory_offset = optional_offset + 96
+    elif magic == PE32_PLUS_MAGIC:
+        image_base = struct.unpack_from("<Q", mm, optional_offset + 24)[0]
+        directory_offset = optional_offset + 112
+    else:
+        raise MalformedPEError(f"Unknown optional header magic 0x{magic:x}")
+    subsystem = struct.unpack_from("<H", mm, optional_offset + 68)[0]
+    directory_count = struct.unpack_from("<I", mm, directory_offset - 4)[0]
+    directory_count = min(directory_count, 16, max(0, (optional_offset + optional_size - directory_offset) // 8))
+    directories = [struct.unpack_from("<II", mm, directory_offset + 8 * i) for i in range(directory_count)]
+
+    sections = []
+    section_offset = optional_offset + optional_size
+    for i in range(min(section_count, _MAX_SECTIONS)):
+        _, virtual_size, virtual_address, raw_size, raw_offset = struct.unpack_from(
+            "<8sIIII", mm, section_offset + 40 * i
+        )
+        # The loader rounds raw offsets down to 512 bytes, whatever FileAlignment says
+        sections.append((virtual_address, virtual_size, raw_offset & ~0x1ff, raw_size))
+    return {
+        "machine": machine,
+        "magic": magic,
+        "image_base": image_base,
+        "subsystem": subsystem,
+        "directories": directories,
+        "sections": sections,
+    }
+
+
+def _read_pe_header(exe_path):
+    """
+    Reads (machine, optional header magic) straight from the headers of a
+    memory-mapped PE file, touching only its first pages. Raises
+    MalformedPEError for anything unexpected.
+    """
+    with _map_file(exe_path) as mm:
+        headers = _parse_headers(mm)
+        return headers["machine"], headers["magic"]
+
+
+def _map_file(path):
+    with open(path, "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise MalformedPEError("Empty file")
+
+
+def _rva_to_offset(sections, rva):
+    for virtual_address, virtual_size, raw_offset, raw_size in sections:
+        if virtual_address <= rva < virtual_address + max(virtual_size, raw_size):
+            offset = rva - virtual_address
+            return raw_offset + offset if offset < raw_size else None
+    if sections and rva < min(s[0] for s in sections):
+        # Still inside the headers
+        return rva
+    return None
+
+
+def _read_name(mm, sections, rva):
+    offset = _rva_to_offset(sections, rva)
+    if offset is None or offset >= len(mm):
+        return None
+    end = mm.find(b"\0", offset, offset + _MAX_NAME_LENGTH)
+    if end <= offset:
+        return None
+    return mm[offset:end].decode("ascii", "replace").lower()
+
+
+def _imported_dll_names(mm, headers):
+    """Walks the import and delay-import descriptor tables, and nothing else."""
+    directories = headers["directories"]
+    sections = headers["sections"]
+    names = []
+
+    def descriptors(index, size, name_field):
+        if index >= len(directories) or not directories[index][0]:
+            return
+        offset = _rva_to_offset(sections, directories[index][0])
+        if offset is None:
+            return
+        for i in range(_MAX_IMPORT_DESCRIPTORS):
+            start = offset + i * size
+            entry = mm[start:start + size]
+            if len(entry) < size or not entry.strip(b"\0"):
+                return
+            yield struct.unpack_from("<I", entry, 0)[0], struct.unpack_from("<I", entry, name_field)[0]
+
+    for _, name_rva in descriptors(IMAGE_DIRECTORY_ENTRY_IMPORT, 20, 12):
+        names.append(_read_name(mm, sections, name_rva))
+    for attributes, name_rva in descriptors(IMAGE_DIRECTORY_ENTRY_DELAY_IMPORT, 32, 4):
+        if not attributes & 1:
+            # Old-style (pre-VC7) delay imports hold virtual addresses
+            name_rva = (name_rva - headers["image_base"]) & 0xffffffff
+        names.append(_read_name(mm, sections, name_rva))
+    return [name for name in names if name]
+
+
+def get_exe_imports(exe_path):
+    """
+    Returns the lowercased names of the DLLs a PE file imports, directly
+    or delay-loaded. Only the headers and the two descriptor tables are
+    read. Returns an empty list if the file can't be parsed.
+    """
+    try:
+        with _map_file(exe_path) as mm:
+            return _imported_dll_names(mm, _parse_headers(mm))
+    except (MalformedPEError, OSError, struct.error):
+        return []
+
+
+def _machine_architecture(machine):
+    if machine == IMAGE_FILE_MACHINE_AMD64:
+        return "64-bit"
+    elif machine == IMAGE_FILE_MACHINE_I386:
+        return "32-bit"
+    return "Unknown"
+
+
+def get_exe_subsystem(exe_path):
+    """Returns "gui", "console", "other" or None (unreadable) for a PE file."""
+    try:
+        with _map_file(exe_path) as mm:
+            subsystem = _parse_headers(mm)["subsystem"]
+    except (MalformedPEError, OSError, struct.error):
+        return None
+    if subsystem == IMAGE_SUBSYSTEM_WINDOWS_GUI:
+        return "gui"
+    elif subsystem == IMAGE_SUBSYSTEM_WINDOWS_CUI:
+        return "console"
+    return "other"
+
+
 def get_exe_files(game_folder):
     """
     Returns a list of all .exe files found in the given folder.
@@ -14,54 +233,308 @@ def get_exe_files(game_folder):
     return [f for f in os.listdir(game_folder) if f.lower().endswith(".exe")]
 
 
-def get_best_exe(game_folder):
+def get_best_exe(game_folder, cache=None):
     """
-    Attempts to auto-select the best .exe by picking the largest file.
-    Falls back to the first .exe if sizes are equal.
-    Returns the full path or None if no .exe found.
+    Attempts to auto-select the best .exe in the folder itself by ranking
+    every candidate (see rank_exes, which also explains cache). Returns the
+    full path or None if no .exe found.
     """
-    exe_files = get_exe_files(game_folder)
-    if not exe_files:
+    from folder_scanner import scan_exe_files
+    if not os.path.isdir(game_folder):
         return None
-    best = max(exe_files, key=lambda f: os.path.getsize(os.path.join(game_folder, f)))
-    return os.path.join(game_folder, best)
+    found = scan_exe_files(game_folder, max_depth=0)
+    if not found:
+        return None
+    signatures = {e.path: (e.size, e.mtime_ns) for e in found}
+    return rank_exes(list(signatures), game_folder, cache, signatures=signatures)[0]["path"]
 
 
 def get_exe_architecture(exe_path):
     """
     Analyzes the PE (Portable Executable) header to determine architecture.
     Windows-only: Only supports PE files (.exe, .dll).
+
+    Only the headers are read, from a memory map; pefile is only used for
+    files the fast reader can't make sense of.
     """
     if not os.path.exists(exe_path):
         return "File not found"
-    
+
     try:
-        pe = pefile.PE(exe_path)
-        if pe.FILE_HEADER.Machine == 0x8664:  # IMAGE_FILE_MACHINE_AMD64
-            return "64-bit"
-        elif pe.FILE_HEADER.Machine == 0x14c:  # IMAGE_FILE_MACHINE_I386
-            return "32-bit"
-        else:
-            return "Unknown"
+        machine, _ = _read_pe_header(exe_path)
+        return _machine_architecture(machine)
+    except (MalformedPEError, OSError, struct.error):
+        pass
+
+    try:
+        pe = pefile.PE(exe_path, fast_load=True)
+        return _machine_architecture(pe.FILE_HEADER.Machine)
     except pefile.PEFormatError:
         return "Not a valid PE file"
     except Exception as e:
         return f"Error: {str(e)}"
 
-def detect_directx_version(game_folder):
+def _directx_from_imports(imports):
+    return {DIRECTX_IMPORTS[name] for name in imports if name in DIRECTX_IMPORTS}
+
+
+def _ordered_versions(found):
+    return [version for version in DIRECTX_VERSIONS if version in found]
+
+
+def directx_for_install(versions):
+    """
+    Picks the DLL_MAP key to install for detected Direct3D versions: the
+    version itself if exactly one was found, otherwise "Unknown" (every
+    DLL), since a game that loads several must get all of them.
+    """
+    versions = [v for v in versions if v in DIRECTX_VERSIONS]
+    return versions[0] if len(versions) == 1 else "Unknown"
+
+
+def _sibling_directx(exe_path):
+    """Direct3D versions imported by the DLLs next to an exe (e.g. UnityPlayer.dll)."""
+    exe_dir = os.path.dirname(exe_path)
+    try:
+        siblings = sorted(
+            f for f in os.listdir(exe_dir or ".")
+            if f.lower().endswith(".dll") and f.lower() not in DIRECTX_IMPORTS
+        )
+    except OSError:
+        return set()
+    found = set()
+    for dll in siblings[:MAX_SIBLING_DLLS]:
+        found |= _directx_from_imports(get_exe_imports(os.path.join(exe_dir, dll)))
+    return found
+
+
+def detect_imported_directx(exe_path, scan_siblings=True):
     """
-    Scans a Windows game folder for DirectX-related DLLs to infer the DirectX version.
+    Returns the Direct3D versions named in the exe's import and
+    delay-import tables. If there are none and scan_siblings is set, the
+    imports of the DLLs next to it are checked (engine DLLs such as
+    UnityPlayer.dll often do the rendering).
     """
-    dlls = {
-        "d3d9.dll": "Direct3D 9",
-        "d3d10.dll": "Direct3D 10",
-        "d3d10core.dll": "Direct3D 10",
-        "d3d11.dll": "Direct3D 11",
+    found = _directx_from_imports(get_exe_imports(exe_path))
+    if not found and scan_siblings:
+        found = _sibling_directx(exe_path)
+    return _ordered_versions(found)
+
+
+def _shipped_directx(game_folder):
+    """Direct3D versions whose DLLs sit in the game folder."""
+    return {
+        version for dll, version in DIRECTX_IMPORTS.items()
+        if os.path.exists(os.path.join(game_folder, dll))
     }
-    found_versions = []
-    for dll, version in dlls.items():
-        dll_path = os.path.join(game_folder, dll)
-        if os.path.exists(dll_path):
-            if version not in found_versions:
-                found_versions.append(version)
+
+
+def detect_directx_version(game_folder, exe_path=None, scan_siblings=True):
+    """
+    Infers the Direct3D versions a Windows game uses, from the exe's
+    imports (see detect_imported_directx) and any Direct3D DLLs shipped in
+    the game folder.
+    """
+    found = _shipped_directx(game_folder)
+    if exe_path:
+        found |= set(detect_imported_directx(exe_path, scan_siblings))
+    found_versions = _ordered_versions(found)
     return found_versions if found_versions else ["Unknown"]
+
+
+def _score_analysis(exe_path, analysis):
+    """
+    Scores how likely an exe is to be the game itself, from its own
+    properties only. Returns (score, reasons).
+    """
+    score = 0
+    reasons = []
+    name = os.path.splitext(os.path.basename(exe_path))[0]
+    if analysis["architecture"] in ("32-bit", "64-bit"):
+        score += 2
+    else:
+        score -= 5
+        reasons.append("not a Windows x86/x64 program")
+    if analysis["subsystem"] == "gui":
+        score += 2
+    elif analysis["subsystem"] == "console":
+        score -= 2
+        reasons.append("console program")
+    if analysis["imported_directx"]:
+        score += 3
+        reasons.append("uses " + ", ".join(analysis["imported_directx"]))
+    if HELPER_EXE_PATTERN.search(name):
+        score -= 6
+        reasons.append("helper program")
+    elif SECONDARY_EXE_PATTERN.search(name):
+        score -= 2
+        reasons.append("launcher or tool")
+    # Bigger binaries are more likely the game, up to +2 at 64 MB
+    score += min(2.0, analysis["size"] / (32 * 1024 * 1024))
+    return round(score, 2), reasons
+
+
+def parse_exe(exe_path, size=None):
+    """
+    Parses an exe without consulting the detection cache and returns the
+    raw analysis that gets cached. Runs in worker processes too. Only the
+    exe's own imports are read: sibling DLLs are shared by every candidate
+    in the folder and can change without the exe changing, so they are
+    checked for the chosen exe only (see with_sibling_directx).
+    """
+    if size is None:
+        try:
+            size = os.path.getsize(exe_path)
+        except OSError:
+            size = 0
+    analysis = {
+        "architecture": get_exe_architecture(exe_path),
+        "imported_directx": detect_imported_directx(exe_path, scan_siblings=False),
+        "subsystem": get_exe_subsystem(exe_path),
+        "size": size,
+    }
+    analysis["score"], analysis["reasons"] = _score_analysis(exe_path, analysis)
+    return analysis
+
+
+def is_cacheable(analysis):
+    """False for analyses that hit a read error, which may be transient and so isn't remembered."""
+    return not analysis["architecture"].startswith("Error")
+
+
+def _store_analysis(cache, exe_path, analysis, signature=None):
+    if is_cacheable(analysis):
+        cache.put(exe_path, analysis, signature)
+
+
+def _analysis_result(analysis, game_folder, cached):
+    directx = _ordered_versions(set(analysis["imported_directx"]) | _shipped_directx(game_folder))
+    return {
+        "architecture": analysis["architecture"],
+        "directx": directx if directx else ["Unknown"],
+        "subsystem": analysis["subsystem"],
+        "size": analysis["size"],
+        "score": analysis["score"],
+        "reasons": analysis["reasons"],
+        "cached": cached,
+    }
+
+
+def with_sibling_directx(result, exe_path):
+    """
+    Fills in the Direct3D versions of an analysis result from the DLLs next
+    to the exe when neither its imports nor shipped DLLs gave any. Meant
+    for the exe that was picked as the game; never cached.
+    """
+    if result["directx"] == ["Unknown"]:
+        found = _ordered_versions(_sibling_directx(exe_path))
+        if found:
+            result = dict(result, directx=found)
+    return result
+
+
+def analyze_exe(exe_path, game_folder=None, cache=None):
+    """
+    Returns {"architecture", "directx", "subsystem", "size", "score",
+    "reasons", "cached"} for a game's exe. The parsed results are kept in the
+    detection cache (the process-wide one unless another is given) until
+    the exe changes; the cheap check for DLLs shipped in game_folder
+    (default: the exe's folder) and, if that finds nothing, the sibling
+    DLL scan run every time.
+    """
+    from detection_cache import get_detection_cache
+    if cache is None:
+        cache = get_detection_cache()
+    if game_folder is None:
+        game_folder = os.path.dirname(exe_path)
+
+    analysis = cache.get(exe_path)
+    cached = analysis is not None
+    if not cached:
+        analysis = parse_exe(exe_path)
+        _store_analysis(cache, exe_path, analysis)
+    return with_sibling_directx(_analysis_result(analysis, game_folder, cached), exe_path)
+
+
+def _name_matches_folder(exe_path, game_folder):
+    """True if the exe is named after the game folder (e.g. Hades/Hades.exe)."""
+    def simplify(text):
+        return re.sub(r"[^a-z0-9]", "", text.lower())
+
+    name = simplify(os.path.splitext(os.path.basename(exe_path))[0])
+    name = re.sub(r"(win64|win32|x64|x86|shipping|dx11|dx12|dx9)", "", name)
+    folder = simplify(os.path.basename(os.path.normpath(game_folder)))
+    return len(name) >= 3 and (name in folder or folder in name)
+
+
+def rank_exes(exe_paths, game_folder=None, cache=None, max_workers=None, signatures=None):
+    """
+    Analyses every candidate exe and returns them best first, as
+    analyze_exe results with an added "path". Executables missing from
+    the detection cache are parsed concurrently in a process pool when
+    there are at least PARALLEL_PARSE_MIN_FILES of them.
+    signatures optionally maps paths to (size, mtime_ns) already known
+    from a folder scan, saving a stat() per file.
+    """
+    from detection_cache import get_detection_cache
+    if cache is None:
+        cache = get_detection_cache()
+    signatures = dict(signatures or {})
+    exe_paths = list(exe_paths)
+    if game_folder is None and exe_paths:
+        game_folder = os.path.commonpath([os.path.dirname(p) for p in exe_paths])
+
+    for path in exe_paths:
+        if path not in signatures:
+            try:
+                st = os.stat(path)
+                signatures[path] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                pass
+    analyses = {path: None for path in exe_paths}
+    analyses.update(cache.get_many({path: signatures[path] for path in exe_paths if path in signatures}))
+    misses = [path for path, analysis in analyses.items() if analysis is None]
+    sizes = [signatures[path][0] if path in signatures else None for path in misses]
+    parsed = {}
+    workers = min(len(misses), max_workers or os.cpu_count() or 1)
+    if workers > 1 and len(misses) >= PARALLEL_PARSE_MIN_FILES:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parsed = dict(zip(misses, pool.map(parse_exe, misses, sizes)))
+        except (BrokenProcessPool, OSError) as e:
+            print(f"Could not analyse executables in parallel, falling back to one at a time: {e}")
+    for path, size in zip(misses, sizes):
+        if path not in parsed:
+            parsed[path] = parse_exe(path, size)
+        analyses[path] = parsed[path]
+    cache.put_many(
+        (path, analysis, signatures.get(path)) for path, analysis in parsed.items() if is_cacheable(analysis)
+    )
+
+    return rank_analyses(analyses, game_folder, cached_paths=set(exe_paths) - set(parsed))
+
+
+def rank_analyses(analyses, game_folder=None, cached_paths=()):
+    """
+    Turns {exe_path: analysis} (as produced by the analysis workers) into
+    rank_exes results, best first.
+    """
+    ranked = []
+    for path, analysis in analyses.items():
+        result = _analysis_result(analysis, os.path.dirname(path), path in cached_paths)
+        result["path"] = path
+        if game_folder and _name_matches_folder(path, game_folder):
+            result["score"] = round(result["score"] + 2, 2)
+            result["reasons"] = result["reasons"] + ["named after the game folder"]
+        ranked.append(result)
+    ranked.sort(key=lambda r: r["score"], reverse=True)
+    return ranked
+
+
+def pick_clear_winner(ranked, margin=CLEAR_WIN_MARGIN):
+    """Returns the top path of a rank_exes() list if it clearly beats the rest, else None."""
+    if not ranked:
+        return None
+    if len(ranked) == 1 or ranked[0]["score"] - ranked[1]["score"] >= margin:
+        return ranked[0]["path"]
+    return None
@@ -5,9 +5,27 @@ import os
 import shutil
 import ctypes
 import sys
+import uuid
+from io_scheduler import PRIORITY_INTERACTIVE, get_io_scheduler
+from settings import get_settings
 
 MANIFEST_FILE = "installed_dlls.txt"
 
+# First line of a manifest recorded for an install made without a backup
+NO_BACKUP_HEADER = "# no backup"
+
+# How a DLL was put into the game folder (recorded in the manifest)
+MODE_COPY = "copy"
+MODE_HARDLINK = "hardlink"
+MODE_REFLINK = "reflink"
+
+# install_link_mode setting values: always copy, or reflink/hardlink where possible
+LINK_MODE_COPY = "copy"
+LINK_MODE_LINK = "link"
+
+# Linux ioctl cloning a whole file (copy-on-write filesystems: Btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+
 def is_admin():
     """Check if running with administrator privileges."""
     try:
@@ -24,26 +42,135 @@ def check_long_path_support():
         long_paths = winreg.QueryValueEx(key, "LongPathsEnabled")[0]
         winreg.CloseKey(key)
         return long_paths == 1
-    except (FileNotFoundError, OSError, ValueError):
+    except (ImportError, FileNotFoundError, OSError, ValueError):
         return False
 
 def _clear_readonly(path):
     """Clear the FILE_ATTRIBUTE_READONLY flag on a Windows file using the Win32 API."""
     FILE_ATTRIBUTE_READONLY = 0x1
+    if not hasattr(ctypes, "windll"):
+        return
     attrs = ctypes.windll.kernel32.GetFileAttributesW(str(path))
     if attrs != -1 and (attrs & FILE_ATTRIBUTE_READONLY):
         ctypes.windll.kernel32.SetFileAttributesW(str(path), attrs & ~FILE_ATTRIBUTE_READONLY)
 
+def _reflink(source_path, target_path):
+    """Clones source into a new target_path sharing its blocks. Raises OSError if unsupported."""
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("Reflinks are not supported on this platform")
+    with open(source_path, "rb") as src:
+        with open(target_path, "xb") as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            except OSError:
+                dst.close()
+                os.remove(target_path)
+                raise
+    shutil.copystat(source_path, target_path)
+
+
+def _is_shared(path):
+    """True if path is one of several hardlinks to a file (e.g. a DLL store object)."""
+    try:
+        return os.stat(path).st_nlink > 1
+    except OSError:
+        return False
+
+
+def _create_file(source_path, target_path, link_mode):
+    if link_mode == LINK_MODE_LINK:
+        try:
+            _reflink(source_path, target_path)
+            return MODE_REFLINK
+        except OSError:
+            pass
+        try:
+            if os.stat(source_path).st_dev == os.stat(os.path.dirname(target_path) or ".").st_dev:
+                os.link(source_path, target_path)
+                return MODE_HARDLINK
+        except OSError:
+            pass
+    shutil.copy2(source_path, target_path)
+    return MODE_COPY
+
+
+def place_file(source_path, target_path, link_mode=LINK_MODE_COPY):
+    """
+    Puts a copy of source_path at target_path, replacing any file there,
+    and returns the mode used. With LINK_MODE_LINK a reflink is tried
+    first, then a hardlink (same volume only), then a plain copy. The file
+    is created under a temporary name next to the target and renamed over
+    it, so a failure leaves the old file in place, and an old target that
+    is itself a link into the DLL store is replaced, never written through.
+    """
+    tmp_path = os.path.join(
+        os.path.dirname(target_path), f".{os.path.basename(target_path)}.{uuid.uuid4().hex[:8]}.tmp"
+    )
+    try:
+        mode = _create_file(source_path, tmp_path, link_mode)
+        os.replace(tmp_path, target_path)
+    except BaseException:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return mode
+
+
+def read_manifest(manifest_path):
+    """
+    Returns [(dll, mode), ...] from an install manifest. Lines are
+    "<dll>" (older installs, copied) or "<dll>\t<mode>"; "#" lines are
+    comments (see NO_BACKUP_HEADER).
+    """
+    entries = []
+    with open(manifest_path, "r") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            fields = line.rstrip("\r\n").split("\t")
+            if fields[0].strip():
+                entries.append((fields[0].strip(), fields[1].strip() if len(fields) > 1 and fields[1].strip() else MODE_COPY))
+    return entries
+
+
+def manifest_has_backup(manifest_path):
+    """False if the manifest was written for an install made without a backup."""
+    with open(manifest_path, "r") as f:
+        return f.readline().rstrip("\r\n") != NO_BACKUP_HEADER
+
+
+def write_manifest(manifest_path, entries, backed_up=True):
+    with open(manifest_path, "w") as f:
+        if not backed_up:
+            f.write(NO_BACKUP_HEADER + "\n")
+        for dll, mode in entries:
+            # Plain copies keep the original one-name-per-line format
+            f.write(dll + "\n" if mode == MODE_COPY else f"{dll}\t{mode}\n")
+
+
 class FileManager:
     def __init__(self):
         self.long_path_support = check_long_path_support()
         self.is_admin = is_admin()
+        self.io_scheduler = get_io_scheduler()
+        self.link_mode = get_settings().get("install_link_mode")
 
-    def copy_dlls(self, source_dir, target_dir, dll_names):
+    def copy_dlls(self, source_dir, target_dir, dll_names, priority=PRIORITY_INTERACTIVE, link_mode=None):
         """
         Copies specified DLLs from source to target directory.
         Windows-specific: Handles permissions, UAC, and long paths.
+        Waits for a slot on the target's volume (see io_scheduler).
+        link_mode (default: the install_link_mode setting) may allow
+        reflinks or hardlinks instead of copies; see place_file. The mode
+        used for each DLL is always recorded in the install manifest.
         """
+        link_mode = self.link_mode if link_mode is None else link_mode
+        with self.io_scheduler.slot(target_dir, priority):
+            return self._copy_dlls(source_dir, target_dir, dll_names, link_mode)
+
+    def _copy_dlls(self, source_dir, target_dir, dll_names, link_mode=LINK_MODE_COPY):
         program_files_paths = [
             os.path.expandvars("%ProgramFiles%"),
             os.path.expandvars("%ProgramFiles(x86)%"),
@@ -61,6 +188,7 @@ class FileManager:
             )
 
         copied_files = []
+        modes = {}
         for dll in dll_names:
             source_path = os.path.join(source_dir, dll)
             target_path = os.path.join(target_dir, dll)
@@ -70,8 +198,10 @@ class FileManager:
                     print(f"Warning: {dll} not found in {source_dir}")
                     continue
 
-                # Clear read-only attribute if set (Windows ACL-aware)
-                if os.path.exists(target_path):
+                # Clear read-only attribute if set (Windows ACL-aware). A link into
+                # the DLL store shares its attributes with every game's copy, so
+                # it is left alone; the file is replaced, not written.
+                if os.path.exists(target_path) and not _is_shared(target_path):
                     _clear_readonly(target_path)
 
                     if not os.access(target_path, os.W_OK):
@@ -90,13 +220,16 @@ class FileManager:
                         f"Try running DXVK Manager as Administrator."
                     )
 
-                shutil.copy2(source_path, target_path)
+                modes[dll] = place_file(source_path, target_path, link_mode)
 
                 if not os.path.exists(target_path):
                     raise IOError(f"Failed to copy {dll}. File was not created.")
 
                 copied_files.append(dll)
-                print(f"Copied {dll} to {target_dir}")
+                if modes[dll] == MODE_COPY:
+                    print(f"Copied {dll} to {target_dir}")
+                else:
+                    print(f"Linked {dll} into {target_dir} ({modes[dll]})")
 
             except PermissionError:
                 raise
@@ -107,13 +240,44 @@ class FileManager:
         if not copied_files:
             raise ValueError("No DLLs were copied. Check file permissions and ensure the game is not running.")
 
+        self._record_install_modes(target_dir, modes)
         return copied_files
 
-    def backup_dlls(self, target_dir, dll_names):
+    def _record_install_modes(self, target_dir, modes):
+        """
+        Notes in the install manifest how each DLL was placed; DLLs the
+        manifest doesn't list yet are added. Without a manifest from
+        backup_dlls (backups disabled), one marked as having no backup is
+        written only if something was linked, since plain copies need no
+        record and leave the game folder as it would be without DXVK Manager.
+        """
+        backup_dir = os.path.join(target_dir, "dxvk_backup")
+        manifest_path = os.path.join(backup_dir, MANIFEST_FILE)
+        try:
+            if not os.path.exists(manifest_path):
+                if all(mode == MODE_COPY for mode in modes.values()):
+                    return
+                os.makedirs(backup_dir, exist_ok=True)
+                write_manifest(manifest_path, list(modes.items()), backed_up=False)
+                return
+            entries = read_manifest(manifest_path)
+            listed = {dll for dll, _ in entries}
+            updated = [(dll, modes.get(dll, mode)) for dll, mode in entries]
+            updated += [(dll, mode) for dll, mode in modes.items() if dll not in listed]
+            if updated != entries:
+                write_manifest(manifest_path, updated, manifest_has_backup(manifest_path))
+        except OSError as e:
+            print(f"Warning: Could not record install modes in manifest: {e}")
+
+    def backup_dlls(self, target_dir, dll_names, priority=PRIORITY_INTERACTIVE):
         """
         Creates a backup of existing DLLs in a subfolder and saves a manifest
         of all DLLs being installed so uninstall knows what to remove.
         """
+        with self.io_scheduler.slot(target_dir, priority):
+            return self._backup_dlls(target_dir, dll_names)
+
+    def _backup_dlls(self, target_dir, dll_names):
         backup_dir = os.path.join(target_dir, "dxvk_backup")
 
         try:
@@ -129,9 +293,7 @@ class FileManager:
         # so uninstall knows exactly what to remove even if no originals existed
         manifest_path = os.path.join(backup_dir, MANIFEST_FILE)
         try:
-            with open(manifest_path, "w") as f:
-                for dll in dll_names:
-                    f.write(dll + "\n")
+            write_manifest(manifest_path, [(dll, MODE_COPY) for dll in dll_names])
             print(f"Saved install manifest: {dll_names}")
         except Exception as e:
             raise IOError(f"Failed to write install manifest: {str(e)}")
@@ -156,7 +318,7 @@ class FileManager:
 
         return backed_up_files
 
-    def restore_dlls(self, game_folder):
+    def restore_dlls(self, game_folder, priority=PRIORITY_INTERACTIVE):
         """
         Uninstalls DXVK by:
         1. Reading the manifest to find which DLLs were installed
@@ -164,6 +326,10 @@ class FileManager:
         3. Restoring any original DLLs from backup
         4. Removing the backup folder
         """
+        with self.io_scheduler.slot(game_folder, priority):
+            return self._restore_dlls(game_folder)
+
+    def _restore_dlls(self, game_folder):
         backup_dir = os.path.join(game_folder, "dxvk_backup")
         if not os.path.exists(backup_dir):
             print("No backup folder found.")
@@ -175,12 +341,15 @@ class FileManager:
 
         # Read the manifest to know which DLLs were installed
         manifest_path = os.path.join(backup_dir, MANIFEST_FILE)
-        installed_dlls = []
+        installed = []
         if os.path.exists(manifest_path):
             try:
-                with open(manifest_path, "r") as f:
-                    installed_dlls = [line.strip() for line in f if line.strip()]
-                print(f"Manifest found. DLLs to remove: {installed_dlls}")
+                if not manifest_has_backup(manifest_path):
+                    # Removing DLLs that replaced unsaved originals would break the game
+                    print("DXVK was installed without a backup; nothing to restore.")
+                    return False
+                installed = read_manifest(manifest_path)
+                print(f"Manifest found. DLLs to remove: {[dll for dll, _ in installed]}")
             except Exception as e:
                 print(f"Warning: Could not read manifest: {e}")
         else:
@@ -189,11 +358,13 @@ class FileManager:
         try:
             # Step 1: Delete installed DXVK DLLs from game folder
             removed_files = []
-            for dll in installed_dlls:
+            for dll, mode in installed:
                 game_path = os.path.join(game_folder, dll)
-                if os.path.exists(game_path):
+                if os.path.lexists(game_path):
                     try:
-                        _clear_readonly(game_path)
+                        # Attributes of a hardlink are shared with the DLL store's file
+                        if mode != MODE_HARDLINK and not _is_shared(game_path):
+                            _clear_readonly(game_path)
                         os.remove(game_path)
                         removed_files.append(dll)
                         print(f"Removed installed DXVK file: {dll}")
@@ -209,11 +380,12 @@ class FileManager:
                 game_path = os.path.join(game_folder, item)
                 if os.path.isfile(backup_path):
                     try:
-                        if os.path.exists(game_path):
+                        if os.path.lexists(game_path) and not _is_shared(game_path):
                             _clear_readonly(game_path)
                             if not os.access(game_path, os.W_OK):
                                 raise PermissionError(f"Cannot write to {game_path}.")
-                        shutil.copy2(backup_path, game_path)
+                        # Replaced rather than overwritten: it may still be a link into the DLL store
+                        place_file(backup_path, game_path)
                         restored_files.append(item)
                         print(f"Restored original {item} from backup.")
                     except Exception as e:
@@ -0,0 +1,85 @@
+"""
+Bounded-depth game folder scanner built on os.scandir.
+
+Directories are read once each, breadth first, so executables in the
+game's root folder come out first. The size and modification time from
+each DirEntry are passed along, letting callers rank and cache
+candidates without another stat() per file (on Windows they come free
+with the directory listing).
+"""
+import fnmatch
+import os
+from collections import deque, namedtuple
+from settings import get_settings
+
+# Subfolders below the selected one whose files are still listed
+MAX_SCAN_DEPTH = 2
+
+# Redistributables, installers and helpers shipped with games; matched
+# case-insensitively against file and folder names. Users can add more
+# with the scan_ignore_patterns setting.
+DEFAULT_IGNORE_PATTERNS = [
+    "_CommonRedist",
+    "__Installer",
+    "Redist",
+    "DirectX",
+    "vcredist*",
+    "vc_redist*",
+    "dxsetup*",
+    "UnityCrashHandler*",
+    "CrashReportClient*",
+    "unins*.exe",
+]
+
+ScanEntry = namedtuple("ScanEntry", "path name size mtime_ns depth")
+
+
+def ignore_patterns():
+    """Built-in ignore patterns plus the user's scan_ignore_patterns setting."""
+    return DEFAULT_IGNORE_PATTERNS + list(get_settings().get("scan_ignore_patterns") or [])
+
+
+def _is_ignored(name, patterns):
+    name = name.lower()
+    return any(fnmatch.fnmatchcase(name, pattern.lower()) for pattern in patterns)
+
+
+def iter_exe_files(folder, max_depth=MAX_SCAN_DEPTH, patterns=None, cancel_check=None):
+    """
+    Yields a ScanEntry for every .exe under folder, down to max_depth
+    subfolder levels, as soon as it is found. Ignored names are skipped,
+    and so are their subfolders. Errors listing the folder itself are
+    raised; unreadable subfolders are skipped. Directory symlinks aren't
+    followed.
+    """
+    if patterns is None:
+        patterns = ignore_patterns()
+    pending = deque([(folder, 0)])
+    while pending:
+        directory, depth = pending.popleft()
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            if depth == 0:
+                raise
+            continue
+        with entries:
+            for entry in entries:
+                if cancel_check is not None and cancel_check():
+                    return
+                if _is_ignored(entry.name, patterns):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if depth < max_depth:
+                            pending.append((entry.path, depth + 1))
+                    elif entry.name.lower().endswith(".exe") and entry.is_file():
+                        st = entry.stat()
+                        yield ScanEntry(entry.path, entry.name, st.st_size, st.st_mtime_ns, depth)
+                except OSError:
+                    continue
+
+
+def scan_exe_files(folder, max_depth=MAX_SCAN_DEPTH, patterns=None, cancel_check=None):
+    """Like iter_exe_files, but returns a list."""
+    return list(iter_exe_files(folder, max_depth, patterns, cancel_check))
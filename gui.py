@@ -10,9 +10,15 @@ from PyQt6.QtWidgets import (
     QFileDialog, QMessageBox, QFrame, QScrollArea, QDialog,
     QTabWidget, QSpinBox, QListWidget
 )
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSize
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal, QSize
 from PyQt6.QtGui import QFont, QPalette, QColor, QIcon
 
+# Source combo entry that lists the releases of every source together
+ALL_SOURCES = "all"
+
+# Number of versions shown in the version combo, newest first
+VERSION_LIST_SIZE = 50
+
 class InstallationThread(QThread):
     """Thread for running DXVK installation without blocking UI."""
     log_signal = pyqtSignal(str)
@@ -119,11 +125,14 @@ class InstallationThread(QThread):
             self.finished_signal.emit(False, f"Critical error: {error_msg}")
 
 class ReleaseFetchThread(QThread):
-    """Fetches the recent release list for a DXVK source without blocking the UI."""
+    """
+    Syncs the local release index for a DXVK source without blocking the UI,
+    then emits the newest releases from it.
+    """
     releases_signal = pyqtSignal(list)
     error_signal = pyqtSignal(str)
 
-    def __init__(self, source_key, limit=10):
+    def __init__(self, source_key, limit=VERSION_LIST_SIZE):
         super().__init__()
         self.source_key = source_key
         self.limit = limit
@@ -131,8 +140,18 @@ class ReleaseFetchThread(QThread):
     def run(self):
         try:
             from github_downloader import get_downloader
-            downloader = get_downloader(self.source_key)
-            releases = downloader.get_releases(limit=self.limit)
+            from release_index import get_release_index, sync_sources
+            index = get_release_index()
+            if self.source_key == ALL_SOURCES:
+                # Every source is synced concurrently
+                results = sync_sources(index)
+                errors = [r for r in results.values() if isinstance(r, Exception)]
+                if errors and len(errors) == len(results):
+                    raise errors[0]
+                releases = index.releases(None, limit=self.limit)
+            else:
+                index.sync(get_downloader(self.source_key))
+                releases = index.releases(self.source_key, limit=self.limit)
             if self.isInterruptionRequested():
                 return
             self.releases_signal.emit(releases)
@@ -141,11 +160,40 @@ class ReleaseFetchThread(QThread):
                 self.error_signal.emit(str(e))
 
 
+class PrefetchThread(QThread):
+    """
+    Downloads the selected DXVK release into the local cache ahead of an
+    install. Runs at the lowest thread priority and stops as soon as an
+    interruption is requested (e.g. the user picked another version).
+    """
+    prefetched_signal = pyqtSignal(str)  # resolved tag
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, manager, source_key, version=None):
+        super().__init__()
+        self.manager = manager
+        self.source_key = source_key
+        self.version = version
+
+    def run(self):
+        from github_downloader import DownloadCancelled
+        try:
+            tag_name = self.manager.prefetch(self.source_key, self.version,
+                                             cancel_check=self.isInterruptionRequested)
+            if not self.isInterruptionRequested():
+                self.prefetched_signal.emit(tag_name)
+        except DownloadCancelled:
+            pass
+        except Exception as e:
+            if not self.isInterruptionRequested():
+                self.error_signal.emit(str(e))
+
+
 class DetectionThread(QThread):
     """Thread for analyzing game folder without blocking UI."""
     detected_signal = pyqtSignal(str, str)  # architecture, directx
     log_signal = pyqtSignal(str)
-    exe_picker_signal = pyqtSignal(list)  # emitted when multiple .exe files found
+    exe_picker_signal = pyqtSignal(list)  # [(path, size), ...] when multiple .exe files found
     
     def __init__(self, folder):
         super().__init__()
@@ -164,56 +212,53 @@ class DetectionThread(QThread):
             if self.isInterruptionRequested():
                 return
 
-            # Find .exe files (Windows only)
-            exe_files = []
-
-            # Search recursively (limited depth)
-            for root, dirs, files in os.walk(self.folder):
-                if self.isInterruptionRequested():
-                    return
-                depth = root[len(self.folder):].count(os.sep)
-                if depth > 1:  # Only go 1 level deep
-                    dirs[:] = []
-
-                for f in files:
-                    if f.lower().endswith('.exe'):
-                        exe_files.append(os.path.join(root, f))
+            # Find .exe files (Windows only), a couple of folder levels deep
+            from folder_scanner import iter_exe_files
+            try:
+                found = list(iter_exe_files(self.folder, cancel_check=self.isInterruptionRequested))
+            except PermissionError:
+                self.log_signal.emit("Error: Cannot access folder. You may need administrator privileges.")
+                self.detected_signal.emit("Error", "Error")
+                return
+            if self.isInterruptionRequested():
+                return
+            exe_files = [entry.path for entry in found]
+            signatures = {entry.path: (entry.size, entry.mtime_ns) for entry in found}
 
-            # Also check root folder
-            if not exe_files:
-                try:
-                    exe_files = [os.path.join(self.folder, f) 
-                                for f in os.listdir(self.folder) 
-                                if f.lower().endswith('.exe')]
-                except PermissionError:
-                    self.log_signal.emit("Error: Cannot access folder. You may need administrator privileges.")
-                    self.detected_signal.emit("Error", "Error")
-                    return
-            
             if not exe_files:
                 self.log_signal.emit("No .exe files found in the selected folder.")
                 self.log_signal.emit("Tip: Make sure you selected the folder containing the game's main executable.")
                 self.detected_signal.emit("Not found", "Not found")
                 return
             
+            exe_path = exe_files[0]
             if len(exe_files) > 1:
                 self.log_signal.emit(f"Multiple .exe files found: {len(exe_files)} files")
-                self.log_signal.emit("Please select the main game executable from the list.")
-                self.exe_picker_signal.emit(exe_files)
-                return  # GUI will handle the rest after user picks
+                from exe_analyzer import rank_exes, pick_clear_winner
+                ranked = rank_exes(exe_files, self.folder, signatures=signatures)
+                if self.isInterruptionRequested():
+                    return
+                exe_path = pick_clear_winner(ranked)
+                if exe_path is None:
+                    self.log_signal.emit("Please select the main game executable from the list.")
+                    self.exe_picker_signal.emit([(r["path"], r["size"]) for r in ranked])
+                    return  # GUI will handle the rest after user picks
+                reasons = ", ".join(ranked[0]["reasons"])
+                self.log_signal.emit(
+                    f"Picked {os.path.basename(exe_path)}" + (f" ({reasons})" if reasons else "")
+                )
 
             if self.isInterruptionRequested():
                 return
 
-            exe_path = exe_files[0]
-
             # Analyze architecture and DirectX
             try:
-                from exe_analyzer import get_exe_architecture, detect_directx_version
-                arch = get_exe_architecture(exe_path)
+                from exe_analyzer import analyze_exe
+                analysis = analyze_exe(exe_path, self.folder)
+                arch = analysis["architecture"]
                 self.log_signal.emit(f"Architecture detected: {arch}")
                 
-                dx_versions = detect_directx_version(self.folder)
+                dx_versions = analysis["directx"]
                 if dx_versions and dx_versions[0] != "Unknown":
                     dx_text = ", ".join(dx_versions)
                 else:
@@ -498,6 +543,7 @@ class DXVKManagerGUI:
         self.install_thread = None
         self.detect_thread = None
         self.current_folder = None
+        self.app.aboutToQuit.connect(self._stop_prefetch)
     
     def apply_windows11_theme(self):
         """Apply Windows 11 native theme with system colors."""
@@ -731,9 +777,11 @@ class DXVKManagerGUI:
         # ── DXVK Source card ────────────────────────────────────
         card_source, g_source = make_group("DXVK SOURCE")
 
+        from github_downloader import available_sources
         self.source_combo = QComboBox()
-        self.source_combo.addItem("Official (doitsujin/dxvk)", "official")
-        self.source_combo.addItem("GPLAsync (Ph42oN)", "gplasync")
+        for source_key, source_name in available_sources():
+            self.source_combo.addItem(source_name, source_key)
+        self.source_combo.addItem("All sources", ALL_SOURCES)
         self.source_combo.setToolTip("Choose which DXVK build to install")
         self.source_combo.setStyleSheet(COMBO_STYLE)
         self.source_combo.currentIndexChanged.connect(self._on_source_changed)
@@ -744,10 +792,30 @@ class DXVKManagerGUI:
         self.version_combo.setToolTip("Choose a specific version, or Latest for the newest release")
         self.version_combo.setStyleSheet(COMBO_STYLE)
         row(g_source, "Version", self.version_combo, "Loading available versions...")
+
+        from settings import get_settings
+        self.prefetch_checkbox = QCheckBox("Download selected version in the background")
+        self.prefetch_checkbox.setToolTip(
+            "Fetches the selected DXVK release while you pick a game folder, so Install starts immediately"
+        )
+        self.prefetch_checkbox.setChecked(bool(get_settings().get("prefetch_enabled")))
+        self.prefetch_checkbox.setStyleSheet(CHECK_STYLE)
+        self.prefetch_checkbox.toggled.connect(self._on_prefetch_toggled)
+        g_source.addWidget(self.prefetch_checkbox)
         layout.addWidget(card_source)
 
+        # Prefetch starts shortly after the selection settles, not on every change
+        self._prefetch_thread = None
+        self._retired_prefetch_threads = []
+        self._prefetch_timer = QTimer()
+        self._prefetch_timer.setSingleShot(True)
+        self._prefetch_timer.setInterval(1500)
+        self._prefetch_timer.timeout.connect(self._start_prefetch)
+        self.version_combo.currentIndexChanged.connect(self._schedule_prefetch)
+
         self._release_fetch_thread = None
         self._fetch_releases_for_source("official")
+        self._schedule_prefetch()
 
         # ── Safety card ───────────────────────────────────────
         card_safety, g_safety = make_group("SAFETY")
@@ -1178,45 +1246,142 @@ class DXVKManagerGUI:
         """Re-fetch the version list when the DXVK source is switched."""
         source_key = self.source_combo.currentData()
         self._fetch_releases_for_source(source_key)
+        self._schedule_prefetch()
 
     def _fetch_releases_for_source(self, source_key):
-        """Kick off a background fetch of recent releases for the given source."""
-        self.version_combo.blockSignals(True)
-        self.version_combo.clear()
-        self.version_combo.addItem("Latest", None)
-        self.version_combo.addItem("Loading versions...", None)
-        loading_item = self.version_combo.model().item(1)
-        if loading_item is not None:
-            loading_item.setEnabled(False)
-        self.version_combo.blockSignals(False)
+        """
+        Show the versions already in the local release index right away, and
+        refresh the index from the network in the background.
+        """
+        from release_index import get_release_index
+        try:
+            known = get_release_index().releases(
+                None if source_key == ALL_SOURCES else source_key, limit=VERSION_LIST_SIZE
+            )
+        except Exception:
+            known = []
+        if known:
+            self._populate_versions(known)
+        else:
+            self.version_combo.blockSignals(True)
+            self.version_combo.clear()
+            self.version_combo.addItem("Latest", None)
+            self.version_combo.addItem("Loading versions...", None)
+            loading_item = self.version_combo.model().item(1)
+            if loading_item is not None:
+                loading_item.setEnabled(False)
+            self.version_combo.blockSignals(False)
 
         if self._release_fetch_thread and self._release_fetch_thread.isRunning():
             self._release_fetch_thread.requestInterruption()
             self._release_fetch_thread.wait()
 
-        self._release_fetch_thread = ReleaseFetchThread(source_key, limit=10)
+        self._release_fetch_thread = ReleaseFetchThread(source_key)
         self._release_fetch_thread.releases_signal.connect(self._on_releases_fetched)
         self._release_fetch_thread.error_signal.connect(self._on_releases_fetch_error)
         self._release_fetch_thread.start()
 
-    def _on_releases_fetched(self, releases):
-        """Populate the version dropdown once the release list arrives."""
+    def _populate_versions(self, releases):
+        """Fill the version dropdown, keeping the current choice if it is still listed."""
+        from github_downloader import available_sources
+        source_names = dict(available_sources())
+        selected = self.version_combo.currentData()
         self.version_combo.blockSignals(True)
         self.version_combo.clear()
         self.version_combo.addItem("Latest", None)
+        all_sources = self.source_combo.currentData() == ALL_SOURCES
         for r in releases:
-            self.version_combo.addItem(r["name"], r["tag_name"])
+            name = r.get("name") or r["tag_name"]
+            if all_sources:
+                source_name = source_names.get(r["source_key"], r["source_key"])
+                self.version_combo.addItem(f"{name} ({source_name})", [r["source_key"], r["tag_name"]])
+            else:
+                self.version_combo.addItem(name, r["tag_name"])
+        index = self.version_combo.findData(selected) if selected is not None else -1
+        self.version_combo.setCurrentIndex(max(index, 0))
         self.version_combo.blockSignals(False)
+
+    def _on_releases_fetched(self, releases):
+        """Refresh the version dropdown once the release index has been synced."""
+        self._populate_versions(releases)
         self.log_message(f"Loaded {len(releases)} available DXVK version(s).")
 
+    def _selected_source_and_version(self):
+        """
+        Returns (source_key, tag_name or None) for the current selection.
+        In the "All sources" view each version carries its own source, and
+        Latest means the default source's latest release.
+        """
+        from github_downloader import DEFAULT_SOURCE
+        source_key = self.source_combo.currentData()
+        version = self.version_combo.currentData()
+        if source_key != ALL_SOURCES:
+            return source_key, version
+        if version is None:
+            return DEFAULT_SOURCE, None
+        return version[0], version[1]
+
     def _on_releases_fetch_error(self, error_message):
-        """Fall back to just 'Latest' if the version list couldn't be fetched."""
+        """Keep whatever the local index had; fall back to just 'Latest' if it had nothing."""
+        if self.version_combo.findText("Loading versions...") < 0:
+            self.log_message(f"Could not refresh version list ({error_message}). Showing saved versions.")
+            return
         self.version_combo.blockSignals(True)
         self.version_combo.clear()
         self.version_combo.addItem("Latest", None)
         self.version_combo.blockSignals(False)
         self.log_message(f"Could not load version list ({error_message}). You can still install the latest version.")
 
+    def _on_prefetch_toggled(self, checked):
+        from settings import get_settings
+        get_settings().set("prefetch_enabled", checked)
+        if checked:
+            self._schedule_prefetch()
+        else:
+            self._stop_prefetch()
+
+    def _schedule_prefetch(self, *_):
+        """(Re)start the prefetch countdown for the current source/version selection."""
+        if self.prefetch_checkbox.isChecked():
+            self._prefetch_timer.start()
+
+    def _start_prefetch(self):
+        """Point the background download at the current selection, cancelling any other one."""
+        source_key, version = self._selected_source_and_version()
+        current = self._prefetch_thread
+        if current is not None and current.isRunning() and (current.source_key, current.version) == (source_key, version):
+            return
+        self._cancel_prefetch_thread()
+
+        thread = PrefetchThread(self.manager, source_key, version)
+        thread.prefetched_signal.connect(self._on_prefetched)
+        thread.error_signal.connect(self._on_prefetch_error)
+        self._prefetch_thread = thread
+        thread.start(QThread.Priority.LowestPriority)
+
+    def _cancel_prefetch_thread(self):
+        """Ask the running prefetch to stop without blocking the UI on it."""
+        thread = self._prefetch_thread
+        self._prefetch_thread = None
+        if thread is None or not thread.isRunning():
+            return
+        thread.requestInterruption()
+        # Keep a reference until it exits; a QThread must not be destroyed while running
+        self._retired_prefetch_threads.append(thread)
+        thread.finished.connect(lambda t=thread: self._retired_prefetch_threads.remove(t))
+
+    def _stop_prefetch(self):
+        self._prefetch_timer.stop()
+        self._cancel_prefetch_thread()
+        for thread in list(self._retired_prefetch_threads):
+            thread.wait()
+
+    def _on_prefetched(self, tag_name):
+        self.log_message(f"DXVK {tag_name} is downloaded and ready to install.")
+
+    def _on_prefetch_error(self, error_message):
+        self.log_message(f"Background download failed ({error_message}). It will be retried on install.")
+
     def create_right_panel(self):
         """Create the right log panel."""
         panel = ModernCard()
@@ -1307,7 +1472,10 @@ class DXVKManagerGUI:
         self.directx_label.setText(directx)
 
     def show_exe_picker(self, exe_files):
-        """Show a dialog to let the user pick the correct .exe when multiple are found."""
+        """
+        Show a dialog to let the user pick the correct .exe when multiple are found.
+        exe_files is [(path, size), ...], most likely candidate first.
+        """
         from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLabel, QListWidget, QPushButton, QHBoxLayout
 
         dialog = QDialog(self.window)
@@ -1344,13 +1512,13 @@ class DXVKManagerGUI:
         layout.setSpacing(12)
         layout.setContentsMargins(20, 20, 20, 20)
 
-        info_label = QLabel("Multiple .exe files found.\nSelect the main game executable:")
+        info_label = QLabel("Multiple .exe files found (most likely first).\nSelect the main game executable:")
         info_label.setStyleSheet("font-size: 10pt; color: #E0E0E0;")
         layout.addWidget(info_label)
 
         list_widget = QListWidget()
-        for exe_path in exe_files:
-            size_kb = os.path.getsize(exe_path) // 1024
+        for exe_path, size in exe_files:
+            size_kb = size // 1024
             list_widget.addItem(f"{os.path.basename(exe_path)}  ({size_kb:,} KB)")
         list_widget.setCurrentRow(0)
         layout.addWidget(list_widget)
@@ -1368,7 +1536,7 @@ class DXVKManagerGUI:
 
         if dialog.exec() == QDialog.DialogCode.Accepted:
             selected_index = list_widget.currentRow()
-            chosen_exe = exe_files[selected_index]
+            chosen_exe = exe_files[selected_index][0]
             self.log_message(f"Selected: {os.path.basename(chosen_exe)}")
             self.run_detection_with_exe(chosen_exe)
         else:
@@ -1379,12 +1547,13 @@ class DXVKManagerGUI:
     def run_detection_with_exe(self, exe_path):
         """Run architecture detection on a specific exe the user picked."""
         try:
-            from exe_analyzer import get_exe_architecture, detect_directx_version
-            arch = get_exe_architecture(exe_path)
+            from exe_analyzer import analyze_exe
+            # Same game folder as DetectionThread, so both report the same shipped DLLs
+            analysis = analyze_exe(exe_path, self.current_folder)
+            arch = analysis["architecture"]
             self.log_message(f"Architecture detected: {arch}")
 
-            folder = os.path.dirname(exe_path)
-            dx_versions = detect_directx_version(folder)
+            dx_versions = analysis["directx"]
             if dx_versions and dx_versions[0] != "Unknown":
                 dx_text = ", ".join(dx_versions)
             else:
@@ -1426,14 +1595,16 @@ class DXVKManagerGUI:
         else:
             directx_text = self.directx_label.text()
             if directx_text != "Not detected" and directx_text != "Analyzing...":
-                directx_version = directx_text.split(", ")[0]
+                # Several detected versions install every DLL
+                from exe_analyzer import directx_for_install
+                directx_version = directx_for_install(directx_text.split(", "))
             else:
                 directx_version = "Unknown"
         
         # Determine DXVK source and version
-        source_key = self.source_combo.currentData()
-        source_label = self.source_combo.currentText()
-        version_tag = self.version_combo.currentData()
+        from github_downloader import available_sources
+        source_key, version_tag = self._selected_source_and_version()
+        source_label = dict(available_sources()).get(source_key, source_key)
         version_label = self.version_combo.currentText()
 
         # Show confirmation dialog with details
@@ -0,0 +1,46 @@
+"""
+Process-wide pooled HTTP session shared by all DXVK downloaders.
+
+Reusing one requests.Session keeps TCP/TLS connections to the GitHub and
+GitLab hosts alive between metadata calls, archive downloads and threads.
+"""
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Number of distinct hosts to keep pools for (API hosts plus asset CDNs)
+POOL_CONNECTIONS = 8
+# Connections kept alive per host; covers concurrent installs and segmented downloads
+POOL_MAXSIZE = 16
+
+USER_AGENT = "DXVK-Manager"
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session():
+    """Builds a requests.Session with a tuned connection pool and retry policy."""
+    session = requests.Session()
+    retries = Retry(
+        total=3,
+        connect=3,
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def get_session():
+    """Returns the process-wide pooled session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
@@ -0,0 +1,125 @@
+"""
+Per-volume I/O scheduler for install, backup and restore work.
+
+Jobs are grouped by the device id (st_dev) of the folder they write to.
+Each volume allows a limited number of jobs at once - one spinning disk or
+SMB share only gets slower with more parallel copies - and waiting jobs
+are let in by priority, so an install started from the GUI goes ahead of
+queued batch work.
+"""
+import heapq
+import itertools
+import os
+import threading
+from contextlib import contextmanager
+from settings import get_settings
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+
+def volume_id(path):
+    """Returns the device id of the volume holding path (or its nearest existing parent)."""
+    path = os.path.abspath(path)
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+
+
+class _Volume:
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self.waiters = []
+
+
+class IOScheduler:
+    def __init__(self, default_limit=None, volume_limits=None):
+        """
+        default_limit applies to every volume without its own entry in
+        volume_limits ({path on the volume: limit}). Both default to the
+        io_volume_concurrency and io_volume_limits settings.
+        """
+        settings = get_settings()
+        if default_limit is None:
+            default_limit = settings.get("io_volume_concurrency")
+        if volume_limits is None:
+            volume_limits = settings.get("io_volume_limits") or {}
+        self.default_limit = max(1, int(default_limit))
+        self._limits = {}
+        for path, limit in volume_limits.items():
+            device = volume_id(path)
+            if device is not None:
+                self._limits[device] = max(1, int(limit))
+        self._volumes = {}
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def limit_for(self, path):
+        """The concurrency limit of the volume holding path."""
+        return self._limits.get(volume_id(path), self.default_limit)
+
+    def _volume(self, device):
+        volume = self._volumes.get(device)
+        if volume is None:
+            volume = self._volumes[device] = _Volume(self._limits.get(device, self.default_limit))
+        return volume
+
+    def acquire(self, path, priority=PRIORITY_INTERACTIVE):
+        """
+        Blocks until a job may run on path's volume and returns a token for
+        release(). Lower priority values go first; equal ones in arrival order.
+        """
+        device = volume_id(path)
+        with self._lock:
+            volume = self._volume(device)
+            if volume.active < volume.limit and not volume.waiters:
+                volume.active += 1
+                return device
+            ready = threading.Event()
+            heapq.heappush(volume.waiters, (priority, next(self._order), ready))
+        # The releasing job hands its slot straight to us
+        ready.wait()
+        return device
+
+    def release(self, token):
+        with self._lock:
+            volume = self._volumes[token]
+            if volume.waiters:
+                _, _, ready = heapq.heappop(volume.waiters)
+                ready.set()
+            else:
+                volume.active -= 1
+
+    @contextmanager
+    def slot(self, path, priority=PRIORITY_INTERACTIVE):
+        """Holds one of the slots of path's volume for the duration of the block."""
+        token = self.acquire(path, priority)
+        try:
+            yield
+        finally:
+            self.release(token)
+
+    def queued(self, path):
+        """(running, waiting) job counts for path's volume."""
+        with self._lock:
+            volume = self._volumes.get(volume_id(path))
+            return (volume.active, len(volume.waiters)) if volume else (0, 0)
+
+
+_io_scheduler = None
+_io_scheduler_lock = threading.Lock()
+
+
+def get_io_scheduler():
+    """Returns the process-wide IOScheduler instance."""
+    global _io_scheduler
+    with _io_scheduler_lock:
+        if _io_scheduler is None:
+            _io_scheduler = IOScheduler()
+        return _io_scheduler
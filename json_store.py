@@ -0,0 +1,38 @@
+"""
+Small JSON files that are read whole and replaced atomically.
+
+Every cache and state file the app keeps (settings, archive/detection/
+release caches, the library index, the DLL store refs, the rate-limit
+state) goes through these two helpers. Writes land in a uniquely named
+temp file next to the target and are then moved over it, so a crash never
+leaves a half-written file and two processes saving at once never write
+into each other's temp file.
+"""
+import json
+import os
+import uuid
+
+
+def read_json(path):
+    """Returns the dict stored at path, or {} if it is missing, corrupted or not a dict."""
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (FileNotFoundError, json.JSONDecodeError, ValueError):
+        return {}
+
+
+def write_json(path, data, indent=None):
+    """Atomically replaces the file at path with data serialised as JSON."""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=indent)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,481 @@
+"""
+Whole-library game discovery and a persistent index of analysed games.
+
+Games are found through launcher manifests:
+
+    Steam  <library>/steamapps/appmanifest_*.acf, libraries from libraryfolders.vdf
+    GOG    goggame-*.info next to each game
+    Epic   *.item files in the launcher's Manifests folder
+    User   every subfolder of the library_roots setting
+
+Each game's exe is then analysed (see exe_analyzer) through the shared
+detection cache, on a process pool when many executables need parsing.
+Results are kept in library.json together with the modification times of
+the game's manifest, install folder and exe, so a refresh only analyses
+games where one of those changed.
+"""
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from constants import APP_DATA_DIR
+from json_store import read_json, write_json
+from settings import get_settings
+
+SOURCE_STEAM = "steam"
+SOURCE_GOG = "gog"
+SOURCE_EPIC = "epic"
+SOURCE_USER = "user"
+
+# Where the same install folder is found twice, the earlier source wins
+SOURCE_ORDER = [SOURCE_STEAM, SOURCE_GOG, SOURCE_EPIC, SOURCE_USER]
+
+
+# --- Valve KeyValues (.vdf / .acf) ---
+
+def _vdf_tokens(text):
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c.isspace():
+            i += 1
+        elif c == "/" and text.startswith("//", i):
+            end = text.find("\n", i)
+            i = n if end < 0 else end + 1
+        elif c in "{}":
+            yield c
+            i += 1
+        elif c == '"':
+            i += 1
+            chars = []
+            while i < n and text[i] != '"':
+                if text[i] == "\\" and i + 1 < n:
+                    i += 1
+                    chars.append({"n": "\n", "t": "\t"}.get(text[i], text[i]))
+                else:
+                    chars.append(text[i])
+                i += 1
+            i += 1
+            yield "".join(chars)
+        else:
+            start = i
+            while i < n and not text[i].isspace() and text[i] not in '{}"':
+                i += 1
+            yield text[start:i]
+
+
+def parse_vdf(text):
+    """
+    Parses text-format Valve KeyValues into nested dicts. Keys are
+    lowercased, since Steam treats them case-insensitively.
+    """
+    root = {}
+    stack = [root]
+    key = None
+    for token in _vdf_tokens(text):
+        if token == "{":
+            child = {}
+            stack[-1][(key or "").lower()] = child
+            stack.append(child)
+            key = None
+        elif token == "}":
+            if len(stack) > 1:
+                stack.pop()
+            key = None
+        elif key is None:
+            key = token
+        else:
+            stack[-1][key.lower()] = token
+            key = None
+    return root
+
+
+def _read_vdf(path):
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return parse_vdf(f.read())
+    except OSError:
+        return {}
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+# --- Discovery ---
+
+def _game(source, key, name, install_dir, manifest=None, exe_hint=None):
+    return {
+        "key": f"{source}:{key}",
+        "source": source,
+        "name": name or os.path.basename(os.path.normpath(install_dir)),
+        "install_dir": install_dir,
+        "manifest": manifest,
+        "exe_hint": exe_hint,
+    }
+
+
+def steam_library_folders(steam_root):
+    """Returns the Steam library folders listed in a Steam install's libraryfolders.vdf."""
+    folders = [steam_root]
+    for vdf_path in (
+        os.path.join(steam_root, "steamapps", "libraryfolders.vdf"),
+        os.path.join(steam_root, "config", "libraryfolders.vdf"),
+    ):
+        data = _read_vdf(vdf_path).get("libraryfolders", {})
+        for key, value in data.items():
+            if isinstance(value, dict) and value.get("path"):
+                folders.append(value["path"])
+            elif isinstance(value, str) and key.isdigit():
+                # Pre-2021 format: "1" "D:\\SteamLibrary"
+                folders.append(value)
+    unique = {}
+    for folder in folders:
+        unique.setdefault(os.path.normcase(os.path.normpath(folder)), folder)
+    return list(unique.values())
+
+
+def discover_steam_games(steam_roots):
+    """Yields games from the appmanifest_*.acf files of every Steam library."""
+    for steam_root in steam_roots:
+        for library in steam_library_folders(steam_root):
+            steamapps = os.path.join(library, "steamapps")
+            for manifest in sorted(glob.glob(os.path.join(glob.escape(steamapps), "appmanifest_*.acf"))):
+                app = _read_vdf(manifest).get("appstate", {})
+                if not app.get("appid") or not app.get("installdir"):
+                    continue
+                install_dir = os.path.join(steamapps, "common", app["installdir"])
+                if os.path.isdir(install_dir):
+                    yield _game(SOURCE_STEAM, app["appid"], app.get("name"), install_dir, manifest)
+
+
+def _gog_exe_hint(info, install_dir):
+    tasks = info.get("playTasks") or []
+    primary = [t for t in tasks if isinstance(t, dict) and t.get("isPrimary")] or tasks
+    for task in primary:
+        if isinstance(task, dict) and task.get("path", "").lower().endswith(".exe"):
+            return os.path.join(install_dir, task["path"].replace("\\", os.sep))
+    return None
+
+
+def discover_gog_games(gog_roots):
+    """
+    Yields games identified by goggame-<id>.info files. Each root may be
+    a game folder itself or a folder of game folders.
+    """
+    for root in gog_roots:
+        try:
+            candidates = [root] + [e.path for e in os.scandir(root) if e.is_dir()]
+        except OSError:
+            continue
+        for install_dir in candidates:
+            for manifest in sorted(glob.glob(os.path.join(glob.escape(install_dir), "goggame-*.info"))):
+                info = _read_json(manifest)
+                game_id = str(info.get("gameId") or os.path.basename(manifest)[len("goggame-"):-len(".info")])
+                # DLCs ship their own .info naming the base game as rootGameId
+                if str(info.get("rootGameId") or game_id) != game_id:
+                    continue
+                yield _game(SOURCE_GOG, game_id, info.get("name"), install_dir, manifest,
+                            _gog_exe_hint(info, install_dir))
+
+
+def discover_epic_games(manifest_dirs):
+    """Yields games from the Epic Games Launcher's *.item manifests."""
+    for manifest_dir in manifest_dirs:
+        for manifest in sorted(glob.glob(os.path.join(glob.escape(manifest_dir), "*.item"))):
+            item = _read_json(manifest)
+            install_dir = item.get("InstallLocation")
+            if not install_dir or not os.path.isdir(install_dir):
+                continue
+            launch = item.get("LaunchExecutable")
+            exe_hint = os.path.join(install_dir, launch.replace("\\", os.sep)) if launch else None
+            yield _game(SOURCE_EPIC, item.get("AppName") or item.get("CatalogItemId") or os.path.basename(manifest),
+                        item.get("DisplayName"), install_dir, manifest, exe_hint)
+
+
+def discover_user_games(user_roots):
+    """Yields every subfolder of the user's library roots as a game."""
+    for root in user_roots:
+        try:
+            entries = sorted(e.path for e in os.scandir(root) if e.is_dir())
+        except OSError:
+            continue
+        for install_dir in entries:
+            yield _game(SOURCE_USER, os.path.normcase(os.path.abspath(install_dir)), None, install_dir)
+
+
+def _registry_value(key_path, value_name):
+    try:
+        import winreg
+    except ImportError:
+        return None
+    for hive in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+        try:
+            with winreg.OpenKey(hive, key_path) as key:
+                return winreg.QueryValueEx(key, value_name)[0]
+        except OSError:
+            continue
+    return None
+
+
+def default_library_roots():
+    """
+    Returns {"steam": [...], "gog": [...], "epic": [...], "user": [...]}
+    with the usual launcher locations on this machine plus the
+    library_roots setting. Folders that don't exist are left out.
+    """
+    steam = [_registry_value(r"Software\Valve\Steam", "SteamPath")]
+    gog = []
+    epic = []
+    if sys.platform == "win32":
+        program_files_x86 = os.environ.get("ProgramFiles(x86)", r"C:\Program Files (x86)")
+        program_data = os.environ.get("ProgramData", r"C:\ProgramData")
+        steam.append(os.path.join(program_files_x86, "Steam"))
+        gog += [os.path.join(program_files_x86, "GOG Galaxy", "Games"), r"C:\GOG Games"]
+        epic.append(os.path.join(program_data, "Epic", "EpicGamesLauncher", "Data", "Manifests"))
+    else:
+        steam += [os.path.expanduser("~/.steam/steam"), os.path.expanduser("~/.local/share/Steam")]
+    user = list(get_settings().get("library_roots") or [])
+
+    def existing(paths):
+        unique = {}
+        for path in paths:
+            if path and os.path.isdir(path):
+                unique.setdefault(os.path.normcase(os.path.realpath(path)), path)
+        return list(unique.values())
+
+    return {
+        SOURCE_STEAM: existing(steam),
+        SOURCE_GOG: existing(gog),
+        SOURCE_EPIC: existing(epic),
+        SOURCE_USER: existing(user),
+    }
+
+
+def discover_games(roots):
+    """Runs every discoverer over roots (as from default_library_roots), one entry per install folder."""
+    discoverers = {
+        SOURCE_STEAM: discover_steam_games,
+        SOURCE_GOG: discover_gog_games,
+        SOURCE_EPIC: discover_epic_games,
+        SOURCE_USER: discover_user_games,
+    }
+    games = {}
+    seen_dirs = set()
+    for source in SOURCE_ORDER:
+        for game in discoverers[source](roots.get(source) or []):
+            install_key = os.path.normcase(os.path.realpath(game["install_dir"]))
+            if install_key in seen_dirs or game["key"] in games:
+                continue
+            seen_dirs.add(install_key)
+            games[game["key"]] = game
+    return games
+
+
+# --- Analysis ---
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except (OSError, TypeError):
+        return None
+
+
+def _game_candidates(install_dir, exe_hint, patterns):
+    """Returns {exe path: (size, mtime_ns)} for a game: its launcher's exe, or every exe found."""
+    from folder_scanner import iter_exe_files
+    if exe_hint and os.path.isfile(exe_hint):
+        try:
+            st = os.stat(exe_hint)
+            return {exe_hint: (st.st_size, st.st_mtime_ns)}
+        except OSError:
+            pass
+    try:
+        return {e.path: (e.size, e.mtime_ns) for e in iter_exe_files(install_dir, patterns=patterns)}
+    except OSError:
+        return {}
+
+
+def _analyze_game(install_dir, candidates, cached):
+    """
+    Picks and analyses a game's exe. candidates maps the exe paths still
+    to be parsed to their sizes, and cached holds the analyses already in
+    the detection cache. Runs in worker processes, so it doesn't touch the
+    cache itself; returns (result, {path: new analysis}) for the parent
+    to store.
+    """
+    from exe_analyzer import parse_exe, pick_clear_winner, rank_analyses, with_sibling_directx
+
+    parsed = {path: parse_exe(path, size) for path, size in candidates.items()}
+    if not parsed and not cached:
+        return {"exe": None, "confident": False, "candidates": 0}, parsed
+
+    ranked = rank_analyses(dict(cached, **parsed), install_dir, cached_paths=set(cached))
+    best = with_sibling_directx(ranked[0], ranked[0]["path"])
+    return {
+        "exe": best["path"],
+        "confident": pick_clear_winner(ranked) is not None,
+        "candidates": len(ranked),
+        "architecture": best["architecture"],
+        "directx": best["directx"],
+        "score": best["score"],
+    }, parsed
+
+
+class LibraryIndex:
+    def __init__(self, index_file=None):
+        if index_file is None:
+            cache_dir = os.path.join(APP_DATA_DIR, "cache")
+            os.makedirs(cache_dir, exist_ok=True)
+            index_file = os.path.join(cache_dir, "library.json")
+        self.index_file = index_file
+        self._lock = threading.Lock()
+
+    def _read(self):
+        return read_json(self.index_file)
+
+    def _write(self, games):
+        write_json(self.index_file, games, indent=4)
+
+    def games(self):
+        """Returns every indexed game, sorted by name."""
+        with self._lock:
+            games = list(self._read().values())
+        return sorted(games, key=lambda g: (g.get("name") or "").lower())
+
+    def get(self, key):
+        """Returns the indexed game (e.g. "steam:570"), or None."""
+        with self._lock:
+            return self._read().get(key)
+
+    @staticmethod
+    def _signature(game):
+        return {
+            "manifest_mtime_ns": _mtime_ns(game.get("manifest")),
+            "dir_mtime_ns": _mtime_ns(game["install_dir"]),
+        }
+
+    @staticmethod
+    def _is_current(stored, game, signature):
+        if stored is None or stored.get("error") or stored.get("install_dir") != game["install_dir"]:
+            return False
+        if any(stored.get(field) != value for field, value in signature.items()):
+            return False
+        if stored.get("exe_hint") != game["exe_hint"]:
+            return False
+        return stored.get("exe") is None or _mtime_ns(stored["exe"]) == stored.get("exe_mtime_ns")
+
+    def refresh(self, roots=None, max_workers=None, cache=None):
+        """
+        Discovers games under roots (default_library_roots() if None) and
+        analyses the new or changed ones, through the detection cache (the
+        process-wide one unless another is given) and, for many uncached
+        executables, a process pool. Games no longer found are dropped; a
+        game that fails to analyse keeps an "error" and is retried on the
+        next refresh. Returns {"added", "updated", "removed", "unchanged"} counts.
+        """
+        from detection_cache import get_detection_cache
+        from exe_analyzer import PARALLEL_PARSE_MIN_FILES, is_cacheable
+        from folder_scanner import ignore_patterns
+        if cache is None:
+            cache = get_detection_cache()
+        if roots is None:
+            roots = default_library_roots()
+        discovered = discover_games(roots)
+        with self._lock:
+            stored = self._read()
+
+        counts = {"added": 0, "updated": 0, "removed": len(set(stored) - set(discovered)), "unchanged": 0}
+        games = {}
+        todo = []
+        for key, game in discovered.items():
+            signature = self._signature(game)
+            if self._is_current(stored.get(key), game, signature):
+                games[key] = stored[key]
+                counts["unchanged"] += 1
+            else:
+                games[key] = dict(game, **signature)
+                todo.append(key)
+                counts["updated" if key in stored else "added"] += 1
+
+        # Candidates are looked up in (and new analyses added to) the shared
+        # detection cache here; the workers only parse what it lacks
+        patterns = ignore_patterns()
+        candidates = {
+            key: _game_candidates(games[key]["install_dir"], games[key]["exe_hint"], patterns) for key in todo
+        }
+        found = cache.get_many({path: sig for signatures in candidates.values() for path, sig in signatures.items()})
+        jobs = {}
+        for key, signatures in candidates.items():
+            misses = {path: signature[0] for path, signature in signatures.items() if found[path] is None}
+            cached = {path: found[path] for path in signatures if found[path] is not None}
+            jobs[key] = (signatures, misses, cached)
+
+        results = {}
+        pending = [key for key in todo if jobs[key][1]]
+        workers = min(len(pending), max_workers or os.cpu_count() or 1)
+        if workers > 1 and sum(len(jobs[key][1]) for key in pending) >= PARALLEL_PARSE_MIN_FILES:
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = {
+                        key: pool.submit(_analyze_game, games[key]["install_dir"], jobs[key][1], jobs[key][2])
+                        for key in pending
+                    }
+                    for key, future in futures.items():
+                        try:
+                            results[key] = future.result()
+                        except BrokenProcessPool:
+                            raise
+                        except Exception as e:
+                            results[key] = e
+            except (BrokenProcessPool, OSError) as e:
+                print(f"Could not analyse games in parallel, falling back to one at a time: {e}")
+                results = {}
+        new_analyses = []
+        for key in todo:
+            signatures, misses, cached = jobs[key]
+            if key not in results:
+                try:
+                    results[key] = _analyze_game(games[key]["install_dir"], misses, cached)
+                except Exception as e:
+                    results[key] = e
+            if isinstance(results[key], Exception):
+                # One unreadable game doesn't stop the rest; it is retried next refresh
+                print(f"Could not analyse {games[key]['name']}: {results[key]}")
+                games[key].update({"exe": None, "confident": False, "candidates": len(signatures),
+                                   "error": str(results[key])})
+            else:
+                result, parsed = results[key]
+                new_analyses += [
+                    (path, analysis, signatures[path]) for path, analysis in parsed.items() if is_cacheable(analysis)
+                ]
+                games[key].update(result)
+            games[key]["exe_mtime_ns"] = _mtime_ns(games[key]["exe"])
+            games[key]["analyzed_at"] = time.time()
+        cache.put_many(new_analyses)
+
+        with self._lock:
+            self._write(games)
+        return counts
+
+
+_library_index = None
+_library_index_lock = threading.Lock()
+
+
+def get_library_index():
+    """Returns the process-wide LibraryIndex instance."""
+    global _library_index
+    with _library_index_lock:
+        if _library_index is None:
+            _library_index = LibraryIndex()
+        return _library_index
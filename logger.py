@@ -2,18 +2,15 @@ import json
 import os
 import threading
 from datetime import datetime, timezone
+from constants import APP_DATA_DIR
 
 _MAX_LOG_ENTRIES = 500
 
 class Logger:
     def __init__(self, log_file=None):
         if log_file is None:
-            app_data = os.path.join(
-                os.environ.get("LOCALAPPDATA", os.path.expanduser("~")),
-                "DXVK Manager",
-            )
-            os.makedirs(app_data, exist_ok=True)
-            log_file = os.path.join(app_data, "dxvk_manager_log.json")
+            os.makedirs(APP_DATA_DIR, exist_ok=True)
+            log_file = os.path.join(APP_DATA_DIR, "dxvk_manager_log.json")
         self.log_file = log_file
         self._lock = threading.Lock()
         self._ensure_log_file_exists()
@@ -0,0 +1,136 @@
+"""
+Minimal HTTP server that shares this machine's archive cache with the LAN.
+
+Other DXVK Manager installs point their mirror_url setting at it:
+
+    GET /index.json                       list of cached archives (archive cache index entries)
+    GET /<source_key>/<tag_name>/<file>   a cached release archive
+
+Only archives listed in the index are served. Single byte ranges are
+supported, so clients can resume and use segmented downloads.
+"""
+import json
+import os
+import re
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from archive_cache import ArchiveCache, INDEX_FILE
+
+DEFAULT_PORT = 8765
+COPY_BUFSIZE = 256 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class MirrorRequestHandler(BaseHTTPRequestHandler):
+    server_version = "DXVKManagerMirror/1.0"
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body):
+        cache = self.server.archive_cache
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path).strip("/")
+        entries = cache.entries()
+        if path == INDEX_FILE:
+            self._send_index(entries, send_body)
+            return
+
+        parts = tuple(path.split("/"))
+        entry = next((e for e in entries if (e["source_key"], e["tag_name"], e["filename"]) == parts), None)
+        if entry is None:
+            self.send_error(404)
+            return
+        file_path = cache.path_for(entry["source_key"], entry["tag_name"], entry["filename"])
+        try:
+            f = open(file_path, "rb")
+        except OSError:
+            self.send_error(404)
+            return
+        with f:
+            self._send_file(f, os.fstat(f.fileno()).st_size, entry.get("sha256"), send_body)
+
+    def _send_index(self, entries, send_body):
+        body = json.dumps(entries).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _send_file(self, f, size, sha256, send_body):
+        etag = f'"{sha256}"' if sha256 else None
+        start, end = 0, size - 1
+        partial = False
+
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if range_header and (not if_range or if_range == etag):
+            match = _RANGE_RE.match(range_header.strip())
+            if match and match.group(1):
+                start = int(match.group(1))
+                if match.group(2):
+                    end = min(int(match.group(2)), size - 1)
+                partial = True
+            elif match and match.group(2):
+                # Suffix range: the last N bytes
+                start = max(0, size - int(match.group(2)))
+                partial = True
+            if partial and start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return
+
+        self.send_response(206 if partial else 200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if partial:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        if not send_body:
+            return
+
+        f.seek(start)
+        remaining = end - start + 1
+        try:
+            while remaining > 0:
+                chunk = f.read(min(COPY_BUFSIZE, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} - {format % args}")
+
+
+def create_mirror_server(host="0.0.0.0", port=DEFAULT_PORT, archive_cache=None):
+    """Builds (but doesn't start) a server for the given archive cache."""
+    server = ThreadingHTTPServer((host, port), MirrorRequestHandler)
+    server.daemon_threads = True
+    server.archive_cache = archive_cache if archive_cache is not None else ArchiveCache()
+    return server
+
+
+def serve_mirror(host="0.0.0.0", port=DEFAULT_PORT, cache_dir=None):
+    """Serves the archive cache until interrupted."""
+    server = create_mirror_server(host, port, ArchiveCache(cache_dir) if cache_dir else None)
+    print(f"Serving {server.archive_cache.cache_dir} on http://{host}:{server.server_address[1]}/")
+    print("Set mirror_url to this address on other machines. Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,198 @@
+"""
+Shared API rate-limit budget, kept in a small JSON state file.
+
+GitHub reports the remaining request budget in X-RateLimit-* headers. The
+last reported values are stored per bucket (anonymous, or per token), and
+every process on the machine - or on every machine, if the state file is
+put on a shared drive - checks the budget before spending a request.
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from constants import APP_DATA_DIR
+from json_store import read_json, write_json
+from settings import get_settings
+
+# Requests kept back for installs once the budget gets this low
+DEFAULT_RESERVE = 5
+
+# A lock file older than this is assumed to belong to a crashed process
+LOCK_STALE_SECONDS = 10
+
+# How long to wait for a live lock holder before going ahead without the shared budget
+LOCK_TIMEOUT_SECONDS = 5
+
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+ERROR_ACCESS_DENIED = 5
+
+
+class RateLimitError(IOError):
+    """The API budget is used up and nothing cached can stand in."""
+
+    def __init__(self, message, reset_at=None):
+        super().__init__(message)
+        self.reset_at = reset_at
+
+
+def _process_alive(pid):
+    """True unless the process with this id on this machine is known to be gone."""
+    if os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            # Access denied still means the process exists
+            return ctypes.get_last_error() == ERROR_ACCESS_DENIED
+        kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+class _StateFileLock:
+    """
+    Cross-process lock: an exclusively created <state_file>.lock file
+    holding the owner's host name and process id. The lock is only broken
+    when it is stale or its owner on this machine has exited; if a live
+    owner holds it for too long, the block runs without it and `acquired`
+    is False.
+    """
+
+    def __init__(self, path):
+        self.path = path + ".lock"
+        self.acquired = False
+
+    def _is_stale(self):
+        try:
+            if time.time() - os.path.getmtime(self.path) > LOCK_STALE_SECONDS:
+                return True
+            with open(self.path, "r") as f:
+                host, pid = f.read().split()[:2]
+        except (OSError, ValueError):
+            # Vanished, or its owner is still writing it
+            return False
+        return host == socket.gethostname() and not _process_alive(int(pid))
+
+    def __enter__(self):
+        deadline = time.time() + LOCK_TIMEOUT_SECONDS
+        owner = f"{socket.gethostname()} {os.getpid()} {uuid.uuid4().hex}"
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, owner.encode())
+                os.close(fd)
+                self.acquired = True
+                return self
+            except FileExistsError:
+                if self._is_stale():
+                    try:
+                        os.remove(self.path)
+                    except OSError:
+                        pass
+                    continue
+                if time.time() > deadline:
+                    print(f"Rate-limit state {self.path} is locked by another process; "
+                          f"going ahead without the shared budget.")
+                    return self
+                time.sleep(0.01)
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.acquired:
+            return
+        self.acquired = False
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def _int_header(headers, name):
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    def __init__(self, state_file=None, reserve=DEFAULT_RESERVE):
+        if state_file is None:
+            state_file = get_settings().get("rate_limit_state_file") or os.path.join(
+                APP_DATA_DIR, "cache", "rate_limit.json"
+            )
+        os.makedirs(os.path.dirname(os.path.abspath(state_file)), exist_ok=True)
+        self.state_file = state_file
+        self.reserve = reserve
+        self._lock = threading.Lock()
+
+    def _read(self):
+        return read_json(self.state_file)
+
+    def _write(self, state):
+        write_json(self.state_file, state)
+
+    def acquire(self, bucket, reserve=None):
+        """
+        Takes one request from the bucket's budget. Returns 0 if the request
+        may go ahead, otherwise the number of seconds until the budget resets.
+        `reserve` requests are held back (pass 0 to use them).
+        """
+        reserve = self.reserve if reserve is None else reserve
+        with self._lock, _StateFileLock(self.state_file) as state_lock:
+            if not state_lock.acquired:
+                # Don't risk a lost update; the response headers will correct the budget
+                return 0
+            state = self._read()
+            entry = state.get(bucket)
+            now = time.time()
+            if entry is None or entry.get("reset", 0) <= now:
+                # Unknown or already reset; the response headers will tell us the real figure
+                return 0
+            if entry.get("remaining", 0) > reserve:
+                entry["remaining"] -= 1
+                self._write(state)
+                return 0
+            return max(1, int(entry["reset"] - now) + 1)
+
+    def update(self, bucket, headers):
+        """Records the budget reported by an API response's X-RateLimit-* headers."""
+        remaining = _int_header(headers, "X-RateLimit-Remaining")
+        reset = _int_header(headers, "X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        with self._lock, _StateFileLock(self.state_file) as state_lock:
+            if not state_lock.acquired:
+                return
+            state = self._read()
+            state[bucket] = {
+                "remaining": remaining,
+                "limit": _int_header(headers, "X-RateLimit-Limit"),
+                "reset": reset,
+                "updated_at": time.time(),
+            }
+            self._write(state)
+
+    def budget(self, bucket):
+        """Returns the last recorded {remaining, limit, reset} for a bucket, or None."""
+        with self._lock:
+            return self._read().get(bucket)
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Returns the process-wide RateLimiter instance."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
@@ -0,0 +1,118 @@
+"""
+Persistent cache of release metadata fetched from the GitHub/GitLab APIs.
+
+Responses are stored per URL together with their ETag/Last-Modified
+validators. Entries younger than the TTL are served without touching the
+network; older ones are revalidated with a conditional request, where a
+304 reply only refreshes the timestamp.
+
+The entries are kept in memory and the file is only written when they
+change. Before each use the file is stat()ed, and re-read only if another
+process has rewritten it since.
+"""
+import os
+import threading
+import time
+from constants import APP_DATA_DIR
+from json_store import read_json, write_json
+from settings import get_settings
+
+# Oldest entries are dropped beyond this many cached URLs
+MAX_ENTRIES = 200
+
+
+class ReleaseMetadataCache:
+    def __init__(self, cache_file=None, ttl=None):
+        if cache_file is None:
+            cache_dir = os.path.join(APP_DATA_DIR, "cache")
+            os.makedirs(cache_dir, exist_ok=True)
+            cache_file = os.path.join(cache_dir, "release_metadata.json")
+        if ttl is None:
+            ttl = get_settings().get("release_cache_ttl_seconds")
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = None
+        self._file_signature = None
+
+    def _signature(self):
+        try:
+            st = os.stat(self.cache_file)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _read(self):
+        signature = self._signature()
+        if self._entries is None or signature != self._file_signature:
+            self._entries = read_json(self.cache_file)
+            self._file_signature = signature
+        return self._entries
+
+    def _write(self, entries):
+        if len(entries) > MAX_ENTRIES:
+            newest = sorted(entries, key=lambda u: entries[u].get("fetched_at", 0), reverse=True)
+            entries = {url: entries[url] for url in newest[:MAX_ENTRIES]}
+        write_json(self.cache_file, entries)
+        self._entries = entries
+        self._file_signature = self._signature()
+
+    def get(self, url):
+        """Returns the cached entry for a URL ({data, etag, last_modified, fetched_at}) or None."""
+        with self._lock:
+            entry = self._read().get(url)
+        return dict(entry) if entry is not None else None
+
+    def is_fresh(self, entry, ttl=None):
+        """True if the entry is young enough to be served without revalidation."""
+        ttl = self.ttl if ttl is None else ttl
+        return time.time() - entry.get("fetched_at", 0) < ttl
+
+    def store(self, url, data, etag=None, last_modified=None):
+        with self._lock:
+            entries = self._read()
+            entries[url] = {
+                "data": data,
+                "etag": etag,
+                "last_modified": last_modified,
+                "fetched_at": time.time(),
+            }
+            self._write(entries)
+
+    def seed(self, items):
+        """Stores several {url: data} entries at once, without overwriting existing ones."""
+        with self._lock:
+            entries = self._read()
+            now = time.time()
+            added = False
+            for url, data in items.items():
+                if url not in entries:
+                    entries[url] = {"data": data, "etag": None, "last_modified": None, "fetched_at": now}
+                    added = True
+            if added:
+                self._write(entries)
+
+    def touch(self, url):
+        """Marks an entry as just revalidated (after a 304 Not Modified)."""
+        with self._lock:
+            entries = self._read()
+            if url in entries:
+                entries[url]["fetched_at"] = time.time()
+                self._write(entries)
+
+    def clear(self):
+        with self._lock:
+            self._write({})
+
+
+_metadata_cache = None
+_metadata_cache_lock = threading.Lock()
+
+
+def get_metadata_cache():
+    """Returns the process-wide ReleaseMetadataCache instance."""
+    global _metadata_cache
+    with _metadata_cache_lock:
+        if _metadata_cache is None:
+            _metadata_cache = ReleaseMetadataCache()
+        return _metadata_cache
@@ -0,0 +1,211 @@
+"""
+Local SQLite index of every known release, per source.
+
+The index keeps release names, dates and download asset details between
+runs, so the version list can be shown straight from disk and older tags
+stay selectable. sync() pulls release pages from a downloader newest
+first and stops at the first page holding a tag it already knows.
+"""
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from constants import APP_DATA_DIR
+
+SYNC_PAGE_SIZE = 50
+
+_COLUMNS = (
+    "source_key", "tag_name", "name", "published_at", "download_url",
+    "download_filename", "download_format", "download_size", "download_digest",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS releases (
+    source_key TEXT NOT NULL,
+    tag_name TEXT NOT NULL,
+    name TEXT,
+    published_at TEXT,
+    download_url TEXT,
+    download_filename TEXT,
+    download_format TEXT,
+    download_size INTEGER,
+    download_digest TEXT,
+    PRIMARY KEY (source_key, tag_name)
+);
+CREATE INDEX IF NOT EXISTS releases_by_date ON releases (source_key, published_at DESC);
+CREATE TABLE IF NOT EXISTS sync_state (
+    source_key TEXT PRIMARY KEY,
+    synced_at REAL,
+    complete INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class _Closing:
+    """Context manager committing (or rolling back) and closing a connection."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.db.commit()
+            else:
+                self.db.rollback()
+        finally:
+            self.db.close()
+
+
+class ReleaseIndex:
+    def __init__(self, db_path=None):
+        if db_path is None:
+            cache_dir = os.path.join(APP_DATA_DIR, "cache")
+            os.makedirs(cache_dir, exist_ok=True)
+            db_path = os.path.join(cache_dir, "releases.sqlite3")
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return _Closing(db)
+
+    def upsert(self, source_key, releases):
+        """
+        Adds or updates releases (dicts with tag_name and any other column)
+        for a source. Missing values keep what is stored, and an undated
+        entry never overwrites a dated one.
+        """
+        rows = [
+            tuple([source_key] + [r.get(column) for column in _COLUMNS[1:]])
+            for r in releases
+        ]
+        placeholders = ", ".join("?" * len(_COLUMNS))
+        updates = ", ".join(
+            f"{c} = COALESCE(excluded.{c}, {c})" for c in _COLUMNS[2:]
+        )
+        with self._lock, self._connect() as db:
+            db.executemany(
+                f"INSERT INTO releases ({', '.join(_COLUMNS)}) VALUES ({placeholders}) "
+                f"ON CONFLICT (source_key, tag_name) DO UPDATE SET {updates} "
+                f"WHERE excluded.published_at IS NOT NULL OR releases.published_at IS NULL",
+                rows,
+            )
+
+    def releases(self, source_key=None, limit=50, offset=0):
+        """
+        Returns one page of releases, newest first, for a source or (with
+        source_key None) for every source together.
+        """
+        query = "SELECT * FROM releases"
+        params = []
+        if source_key is not None:
+            query += " WHERE source_key = ?"
+            params.append(source_key)
+        # Releases without a date go last
+        query += " ORDER BY published_at IS NULL, published_at DESC, tag_name DESC LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        with self._lock, self._connect() as db:
+            return [dict(row) for row in db.execute(query, params)]
+
+    def get(self, source_key, tag_name):
+        """Returns the indexed release, or None."""
+        with self._lock, self._connect() as db:
+            row = db.execute(
+                "SELECT * FROM releases WHERE source_key = ? AND tag_name = ?", (source_key, tag_name)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def count(self, source_key=None):
+        with self._lock, self._connect() as db:
+            if source_key is None:
+                return db.execute("SELECT COUNT(*) FROM releases").fetchone()[0]
+            return db.execute("SELECT COUNT(*) FROM releases WHERE source_key = ?", (source_key,)).fetchone()[0]
+
+    def _known_tags(self, source_key):
+        with self._lock, self._connect() as db:
+            return {row[0] for row in db.execute("SELECT tag_name FROM releases WHERE source_key = ?", (source_key,))}
+
+    def _sync_state(self, source_key):
+        with self._lock, self._connect() as db:
+            row = db.execute("SELECT * FROM sync_state WHERE source_key = ?", (source_key,)).fetchone()
+        return dict(row) if row else {"synced_at": None, "complete": 0}
+
+    def _record_sync(self, source_key, complete):
+        with self._lock, self._connect() as db:
+            db.execute(
+                "INSERT INTO sync_state (source_key, synced_at, complete) VALUES (?, ?, ?) "
+                "ON CONFLICT (source_key) DO UPDATE SET synced_at = excluded.synced_at, "
+                "complete = MAX(complete, excluded.complete)",
+                (source_key, time.time(), int(complete)),
+            )
+
+    def last_synced(self, source_key):
+        """Unix time of the last successful sync for a source, or None."""
+        return self._sync_state(source_key)["synced_at"]
+
+    def sync(self, downloader, per_page=SYNC_PAGE_SIZE):
+        """
+        Brings the index up to date with the downloader's source and returns
+        the number of new releases. Once a full history has been stored,
+        only the pages newer than the newest known tag are requested.
+        """
+        source_key = downloader.source_key
+        known = self._known_tags(source_key)
+        complete = bool(self._sync_state(source_key)["complete"])
+        added = 0
+        page = 1
+        while True:
+            releases = downloader.get_release_page(page, per_page=per_page)
+            self.upsert(source_key, releases)
+            new_tags = {r["tag_name"] for r in releases} - known
+            added += len(new_tags)
+            known |= new_tags
+            last_page = len(releases) < per_page
+            # Reaching known tags means everything older is already stored
+            if last_page or (complete and len(new_tags) < len(releases)):
+                break
+            page += 1
+        self._record_sync(source_key, complete or last_page)
+        return added
+
+
+def sync_sources(index, source_keys=None, per_page=SYNC_PAGE_SIZE):
+    """
+    Syncs several sources (all registered ones by default) concurrently.
+    Returns {source_key: new release count or the exception it raised}.
+    """
+    from github_downloader import available_sources, get_downloader
+    source_keys = list(source_keys or [key for key, _ in available_sources()])
+    if not source_keys:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(source_keys)) as pool:
+        futures = {key: pool.submit(index.sync, get_downloader(key), per_page) for key in source_keys}
+    results = {}
+    for key, future in futures.items():
+        try:
+            results[key] = future.result()
+        except Exception as e:
+            print(f"Could not sync releases for {key}: {e}")
+            results[key] = e
+    return results
+
+
+_release_index = None
+_release_index_lock = threading.Lock()
+
+
+def get_release_index():
+    """Returns the process-wide ReleaseIndex instance."""
+    global _release_index
+    with _release_index_lock:
+        if _release_index is None:
+            _release_index = ReleaseIndex()
+        return _release_index
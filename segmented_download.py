@@ -0,0 +1,124 @@
+"""
+Parallel segmented downloads for large release assets.
+
+The asset is split into byte ranges that are fetched concurrently and
+written straight into their place in a preallocated file. Servers that
+don't support ranges are detected up front so the caller can fall back
+to a single stream. A segment that fails part-way (connection reset,
+short read, wrong Content-Range) is fetched again; if it keeps failing the
+caller falls back to a single stream as well.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+SEGMENT_CHUNK_SIZE = 64 * 1024
+
+# Upper bound on concurrent connections; matches the shared session's pool size
+MAX_SEGMENTS = 16
+
+# Tries per segment before the segmented download is given up
+SEGMENT_ATTEMPTS = 3
+
+
+class RangeNotSupportedError(IOError):
+    """The server ignored a Range request."""
+
+
+def probe_download(session, download_url, timeout=30):
+    """
+    HEADs the URL (following redirects) and returns (final_url, size), or
+    (download_url, None) if the server does not advertise byte ranges.
+    """
+    response = session.head(download_url, allow_redirects=True, timeout=timeout)
+    response.raise_for_status()
+    headers = response.headers
+    length = headers.get("Content-Length", "")
+    if (headers.get("Accept-Ranges", "").lower() != "bytes"
+            or headers.get("Content-Encoding")
+            or not length.isdigit()):
+        return download_url, None
+    return response.url or download_url, int(length)
+
+
+def plan_segments(size, segments, min_segment_size):
+    """Splits [0, size) into at most `segments` inclusive (start, end) ranges."""
+    count = max(1, min(segments, MAX_SEGMENTS, size // max(1, min_segment_size)))
+    base, extra = divmod(size, count)
+    ranges = []
+    start = 0
+    for i in range(count):
+        length = base + (1 if i < extra else 0)
+        ranges.append((start, start + length - 1))
+        start += length
+    return ranges
+
+
+def _fetch_range(session, download_url, target_path, start, end, timeout):
+    headers = {"Range": f"bytes={start}-{end}"}
+    response = session.get(download_url, headers=headers, stream=True, timeout=timeout)
+    response.raise_for_status()
+    with response:
+        if response.status_code != 206:
+            raise RangeNotSupportedError(f"Server returned {response.status_code} for a range request.")
+        content_range = response.headers.get("Content-Range", "")
+        if not content_range.startswith(f"bytes {start}-{end}/"):
+            raise IOError(f"Segment {start}-{end} answered with Content-Range {content_range!r}.")
+        written = 0
+        # Each segment gets its own handle and writes at its own offset
+        with open(target_path, "r+b") as f:
+            f.seek(start)
+            for chunk in response.iter_content(chunk_size=SEGMENT_CHUNK_SIZE):
+                if chunk:
+                    f.write(chunk)
+                    written += len(chunk)
+    if written != end - start + 1:
+        raise IOError(f"Segment {start}-{end} incomplete: got {written:,} of {end - start + 1:,} bytes.")
+    return written
+
+
+def _fetch_range_with_retries(session, download_url, target_path, start, end, timeout):
+    for attempt in range(1, SEGMENT_ATTEMPTS + 1):
+        try:
+            return _fetch_range(session, download_url, target_path, start, end, timeout)
+        except RangeNotSupportedError:
+            raise
+        except IOError as e:
+            # requests' exceptions are IOErrors too
+            if attempt == SEGMENT_ATTEMPTS:
+                raise
+            print(f"Segment {start}-{end} failed ({e}). Retrying...")
+
+
+def download_segmented(session, download_url, target_path, segments, min_segment_size, timeout=60):
+    """
+    Downloads download_url into target_path using up to `segments` parallel
+    range requests. Returns False if the asset is too small to split, the
+    server doesn't support ranges or a segment still fails after
+    SEGMENT_ATTEMPTS tries, so the caller can use a single stream instead.
+    """
+    final_url, size = probe_download(session, download_url)
+    if size is None:
+        return False
+    ranges = plan_segments(size, segments, min_segment_size)
+    if len(ranges) < 2:
+        return False
+
+    # Preallocate so every segment can write at its offset immediately
+    with open(target_path, "wb") as f:
+        f.truncate(size)
+
+    print(f"Downloading {size:,} bytes in {len(ranges)} segments...")
+    try:
+        with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+            futures = [
+                pool.submit(_fetch_range_with_retries, session, final_url, target_path, start, end, timeout)
+                for start, end in ranges
+            ]
+            for future in futures:
+                future.result()
+    except IOError as e:
+        if not isinstance(e, RangeNotSupportedError):
+            print(f"Segmented download failed ({e}). Falling back to a single stream.")
+        os.remove(target_path)
+        return False
+    return True
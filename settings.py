@@ -0,0 +1,97 @@
+"""
+Persistent user settings for DXVK Manager.
+"""
+import os
+import threading
+from constants import APP_DATA_DIR
+from json_store import read_json, write_json
+
+DEFAULT_SETTINGS = {
+    # Size cap for the on-disk release archive cache, in megabytes.
+    "archive_cache_max_mb": 512,
+    # How long release lists are served from cache before revalidating.
+    "release_cache_ttl_seconds": 15 * 60,
+    # Tagged releases practically never change, so they are kept much longer.
+    "release_tag_cache_ttl_seconds": 7 * 24 * 60 * 60,
+    # Parallel range requests per archive download; 1 disables segmented mode.
+    "download_segments": 1,
+    # Assets are never split into segments smaller than this, in megabytes.
+    "download_min_segment_mb": 4,
+    # Known-good archive digests, {"<source>/<tag>": "sha256:<hex>"}, for
+    # sources that don't publish their own (e.g. GitLab raw files).
+    "pinned_digests": {},
+    # Download the selected release in the background while a folder is being
+    # chosen, so Install doesn't wait on the network. Off by default.
+    "prefetch_enabled": False,
+    # Base URL of a LAN mirror started with "dxvk_manager serve-mirror"
+    # (e.g. "http://192.168.1.10:8765"); empty uses GitHub/GitLab directly.
+    "mirror_url": "",
+    # Personal access token for the GitHub API (raises the limit from 60 to
+    # 5000 requests/hour); the GITHUB_TOKEN environment variable also works.
+    "github_token": "",
+    # Where the shared API budget is tracked; point several machines behind
+    # one NAT at the same file on a network share. Empty uses the local cache.
+    "rate_limit_state_file": "",
+    # Longest an install waits for the API budget to reset when nothing is cached.
+    "rate_limit_max_wait_seconds": 300,
+    # Extra file/folder name patterns (e.g. "Tools", "*Benchmark*.exe") skipped
+    # when looking for a game's executables, on top of the built-in ones.
+    "scan_ignore_patterns": [],
+    # Folders whose subfolders are each a game, indexed alongside the
+    # Steam, GOG and Epic libraries found automatically.
+    "library_roots": [],
+    # Install/backup/restore jobs allowed at once per disk or network share.
+    "io_volume_concurrency": 4,
+    # Per-volume overrides, {"<any path on the volume>": limit}; e.g. 1 for a
+    # spinning disk, 2 for an SMB share.
+    "io_volume_limits": {},
+    # "copy" installs full copies of the DLLs; "link" reflinks (copy-on-write
+    # filesystems) or hardlinks them from the DLL store where the game is on
+    # the same volume, falling back to a copy.
+    "install_link_mode": "copy",
+}
+
+
+class Settings:
+    def __init__(self, settings_file=None):
+        if settings_file is None:
+            os.makedirs(APP_DATA_DIR, exist_ok=True)
+            settings_file = os.path.join(APP_DATA_DIR, "settings.json")
+        self.settings_file = settings_file
+        self._lock = threading.Lock()
+        self._values = self._load()
+
+    def _load(self):
+        """Read the settings file, ignoring it if missing or corrupted."""
+        return read_json(self.settings_file)
+
+    def get(self, key, default=None):
+        """Returns a setting, falling back to the built-in default."""
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+        if default is not None:
+            return default
+        return DEFAULT_SETTINGS.get(key)
+
+    def set(self, key, value):
+        """Updates a setting and writes the settings file."""
+        with self._lock:
+            self._values[key] = value
+            self._save()
+
+    def _save(self):
+        write_json(self.settings_file, self._values, indent=4)
+
+
+_settings = None
+_settings_lock = threading.Lock()
+
+
+def get_settings():
+    """Returns the process-wide Settings instance."""
+    global _settings
+    with _settings_lock:
+        if _settings is None:
+            _settings = Settings()
+        return _settings
@@ -0,0 +1,68 @@
+"""
+Single-flight execution: concurrent calls for the same key share one run.
+
+The first caller for a key (the leader) runs the work; callers arriving
+while it is in progress wait and receive the leader's result. If the
+leader fails, every waiting caller is released with the same exception
+instead of retrying the work on its own. A waiting caller can give up
+early through its cancel_check; the leader's run is not affected.
+"""
+import threading
+
+# How often a waiting caller checks whether it has been cancelled
+WAIT_POLL_SECONDS = 0.1
+
+
+class WaitCancelled(Exception):
+    """A waiting caller's cancel_check asked it to stop waiting."""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, cancel_check=None):
+        """
+        Runs fn() unless a call for key is already running, in which case
+        this waits for it. Returns fn's result or raises its exception.
+        While waiting, cancel_check is polled and WaitCancelled is raised
+        once it returns True.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            while not call.done.wait(WAIT_POLL_SECONDS if cancel_check is not None else None):
+                if cancel_check():
+                    raise WaitCancelled(f"Stopped waiting for {key!r}.")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Forget the key before waking waiters so the next caller starts a fresh run
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self, key):
+        """True while a call for key is running."""
+        with self._lock:
+            return key in self._calls
@@ -1,5 +1,17 @@
 import sys
 import os
+import shutil
+import tempfile
 
 # Add the repo root to sys.path so tests can import project modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Point APP_DATA_DIR (derived from LOCALAPPDATA when constants is first
+# imported) at a throwaway folder, so settings, caches, the DLL store and
+# the other process-wide singletons never touch the real user's data.
+_app_data_root = tempfile.mkdtemp(prefix="dxvk-manager-tests-")
+os.environ["LOCALAPPDATA"] = _app_data_root
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_app_data_root, ignore_errors=True)
@@ -0,0 +1,965 @@
+import unittest
+import datetime
+import io
+import hashlib
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch, MagicMock
+
+import requests
+
+import github_downloader
+from archive_cache import ArchiveCache
+from github_downloader import (
+    DOWNLOAD_CHUNK_SIZE, DownloadCancelled, GithubDownloader, GitlabDownloader, IncompleteDownloadError, IntegrityError,
+    DXVKDownloaderBase, MirrorDownloader, available_sources, get_downloader, register_source,
+)
+from mirror_server import create_mirror_server
+from http_session import create_session, get_session
+from segmented_download import download_segmented, plan_segments
+from settings import Settings
+from release_cache import ReleaseMetadataCache
+from release_index import ReleaseIndex, sync_sources
+from rate_limit import RateLimiter, RateLimitError
+
+
+def make_dxvk_targz(version="2.3", dll_size=1024, random_payload=False):
+    """Builds an in-memory tar.gz laid out like a DXVK release."""
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tf:
+        for subfolder in ("x32", "x64"):
+            for dll in ("d3d9.dll", "d3d10core.dll", "d3d11.dll", "dxgi.dll"):
+                header = f"{subfolder}/{dll}".encode()
+                if random_payload:
+                    # Incompressible content keeps the archive close to real DXVK sizes
+                    data = header + os.urandom(dll_size - len(header))
+                else:
+                    data = header.ljust(dll_size, b"\0")
+                info = tarfile.TarInfo(f"dxvk-{version}/{subfolder}/{dll}")
+                info.size = len(data)
+                tf.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def patch_http(downloader, **kwargs):
+    """Swaps the downloader's HTTP session for a mock; kwargs configure session.get."""
+    return patch.object(downloader, "session", MagicMock(get=MagicMock(**kwargs)))
+
+
+def fake_response(content, chunk_size=4096, status_code=200, headers=None, fail_after=None):
+    """
+    A stand-in for a streamed requests.Response. With fail_after, the body
+    raises a connection error once that many bytes have been delivered.
+    """
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = {"Content-Length": str(len(content))}
+    response.headers.update(headers or {})
+
+    def iter_content(chunk_size=chunk_size):
+        for i in range(0, len(content), chunk_size):
+            if fail_after is not None and i >= fail_after:
+                raise requests.ConnectionError("connection reset")
+            yield content[i:i + chunk_size]
+
+    response.iter_content.side_effect = iter_content
+    response.__enter__.return_value = response
+    return response
+
+
+class TestArchiveCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = ArchiveCache(os.path.join(self.temp_dir, "cache"), max_bytes=250)
+
+    def _put(self, tag, size):
+        src = os.path.join(self.temp_dir, f"{tag}.tmp")
+        with open(src, "wb") as f:
+            f.write(b"x" * size)
+        return self.cache.put("official", tag, f"dxvk-{tag}.tar.gz", src)
+
+    def test_put_and_get(self):
+        path = self._put("v2.3", 100)
+        self.assertEqual(self.cache.get("official", "v2.3", "dxvk-v2.3.tar.gz"), path)
+        self.assertIsNone(self.cache.get("official", "v2.2", "dxvk-v2.2.tar.gz"))
+
+    def test_lru_eviction(self):
+        self._put("v1", 100)
+        self._put("v2", 100)
+        # Touch v1 so v2 becomes the least recently used entry
+        self.cache.get("official", "v1", "dxvk-v1.tar.gz")
+        self._put("v3", 100)
+
+        self.assertIsNotNone(self.cache.get("official", "v1", "dxvk-v1.tar.gz"))
+        self.assertIsNone(self.cache.get("official", "v2", "dxvk-v2.tar.gz"))
+        self.assertIsNotNone(self.cache.get("official", "v3", "dxvk-v3.tar.gz"))
+        self.assertLessEqual(self.cache.total_size(), 250)
+
+    def test_eviction_skips_archives_that_cannot_be_deleted(self):
+        self._put("v1", 100)
+        self._put("v2", 100)
+        real_remove = os.remove
+
+        def remove(path):
+            if path.endswith("dxvk-v1.tar.gz"):
+                raise PermissionError("in use")
+            real_remove(path)
+
+        with patch("archive_cache.os.remove", side_effect=remove):
+            self._put("v3", 100)
+
+        # v1 stays tracked, so it is retried later; v2 is evicted instead
+        self.assertIsNotNone(self.cache.get("official", "v1", "dxvk-v1.tar.gz"))
+        self.assertIsNone(self.cache.get("official", "v2", "dxvk-v2.tar.gz"))
+        self.assertIsNotNone(self.cache.get("official", "v3", "dxvk-v3.tar.gz"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestDownloaderArchiveCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.downloader = GithubDownloader()
+        self.downloader.archive_cache = ArchiveCache(
+            os.path.join(self.temp_dir, "cache"), max_bytes=10 * 1024 * 1024
+        )
+        self.archive = make_dxvk_targz()
+
+    def _install(self, target):
+        os.makedirs(target, exist_ok=True)
+        self.downloader.download_and_extract_dxvk(
+            "https://example.invalid/dxvk-2.3.tar.gz", target, "64-bit", "Direct3D 11",
+            "tar.gz", tag_name="v2.3", download_filename="dxvk-2.3.tar.gz",
+        )
+
+    def test_cache_hit_skips_network(self):
+        with patch_http(self.downloader, return_value=fake_response(self.archive)) as session:
+            self._install(os.path.join(self.temp_dir, "game1"))
+            self._install(os.path.join(self.temp_dir, "game2"))
+
+        self.assertEqual(session.get.call_count, 1)
+        for game in ("game1", "game2"):
+            with open(os.path.join(self.temp_dir, game, "d3d11.dll"), "rb") as f:
+                self.assertTrue(f.read().startswith(b"x64/d3d11.dll"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestStreamingExtraction(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.target = os.path.join(self.temp_dir, "game")
+        os.makedirs(self.target)
+        self.downloader = GithubDownloader()
+        self.downloader.archive_cache = ArchiveCache(
+            os.path.join(self.temp_dir, "cache"), max_bytes=10 * 1024 * 1024
+        )
+        self.archive = make_dxvk_targz(dll_size=64 * 1024, random_payload=True)
+
+    def test_extraction_overlaps_download(self):
+        """DLLs are written before the final chunk of the archive has arrived."""
+        seen_before_last_chunk = []
+        chunk_size = 4096
+        chunks = [self.archive[i:i + chunk_size] for i in range(0, len(self.archive), chunk_size)]
+
+        def iter_content(chunk_size=None):
+            for i, chunk in enumerate(chunks):
+                if i == len(chunks) - 1:
+                    seen_before_last_chunk.extend(os.listdir(self.target))
+                yield chunk
+
+        response = fake_response(self.archive)
+        response.iter_content.side_effect = iter_content
+        with patch_http(self.downloader, return_value=response):
+            self.downloader.download_and_extract_dxvk(
+                "https://example.invalid/dxvk-2.3.tar.gz", self.target, "64-bit", "Direct3D 11",
+                "tar.gz", tag_name="v2.3", download_filename="dxvk-2.3.tar.gz",
+            )
+
+        self.assertIn("d3d11.dll", seen_before_last_chunk)
+        self.assertEqual(sorted(os.listdir(self.target)), ["d3d11.dll", "dxgi.dll"])
+
+        # The full archive still lands in the cache regardless of how much extraction consumed
+        cached = self.downloader.archive_cache.get("official", "v2.3", "dxvk-2.3.tar.gz")
+        with open(cached, "rb") as f:
+            self.assertEqual(f.read(), self.archive)
+
+    def test_single_pass_extracts_both_architectures(self):
+        with patch_http(self.downloader, return_value=fake_response(self.archive)) as session:
+            extracted = self.downloader.download_and_extract_all(
+                "https://example.invalid/dxvk-2.3.tar.gz", self.target, "tar.gz",
+                tag_name="v2.3", download_filename="dxvk-2.3.tar.gz",
+            )
+
+        self.assertEqual(session.get.call_count, 1)
+        dlls = ["d3d10core.dll", "d3d11.dll", "d3d9.dll", "dxgi.dll"]
+        self.assertEqual(extracted, {"x32": dlls, "x64": dlls})
+        with open(os.path.join(self.target, "x32", "d3d9.dll"), "rb") as f:
+            self.assertTrue(f.read().startswith(b"x32/d3d9.dll"))
+
+    def test_stops_reading_once_all_dlls_extracted(self):
+        chunk_size = 4096
+        chunks = [self.archive[i:i + chunk_size] for i in range(0, len(self.archive), chunk_size)]
+        delivered = []
+
+        def iter_content(chunk_size=None):
+            for chunk in chunks:
+                delivered.append(chunk)
+                yield chunk
+
+        response = fake_response(self.archive)
+        response.iter_content.side_effect = iter_content
+        with patch_http(self.downloader, return_value=response):
+            # x32 members come first, so the whole x64 half is never decompressed
+            self.downloader.download_and_extract_dxvk(
+                "https://example.invalid/dxvk-2.3.tar.gz", self.target, "32-bit", "Direct3D 9",
+            )
+
+        self.assertEqual(sorted(os.listdir(self.target)), ["d3d9.dll", "dxgi.dll"])
+        self.assertLess(len(delivered), len(chunks) * 0.6)
+
+    def test_uncached_download(self):
+        with patch_http(self.downloader, return_value=fake_response(self.archive)):
+            self.downloader.download_and_extract_dxvk(
+                "https://example.invalid/dxvk-2.3.tar.gz", self.target, "32-bit", "Direct3D 9",
+            )
+        self.assertEqual(sorted(os.listdir(self.target)), ["d3d9.dll", "dxgi.dll"])
+        self.assertEqual(self.downloader.archive_cache.entries(), [])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestResumableDownload(unittest.TestCase):
+    URL = "https://example.invalid/dxvk-2.3.tar.gz"
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.target = os.path.join(self.temp_dir, "game")
+        os.makedirs(self.target)
+        self.downloader = GithubDownloader()
+        self.downloader.archive_cache = ArchiveCache(
+            os.path.join(self.temp_dir, "cache"), max_bytes=10 * 1024 * 1024
+        )
+        self.archive = make_dxvk_targz(dll_size=64 * 1024, random_payload=True)
+        self.half = (len(self.archive) // 2) // 4096 * 4096
+
+    def _install(self):
+        self.downloader.download_and_extract_dxvk(
+            self.URL, self.target, "64-bit", "Direct3D 11",
+            "tar.gz", tag_name="v2.3", download_filename="dxvk-2.3.tar.gz",
+        )
+
+    def _interrupted_first_attempt(self, headers):
+        with patch_http(self.downloader, return_value=fake_response(
+                self.archive, headers=headers, fail_after=self.half)):
+            with self.assertRaises(requests.ConnectionError):
+                self._install()
+
+    def test_resumes_with_range_request(self):
+        self._interrupted_first_attempt({"Accept-Ranges": "bytes", "ETag": '"v1"'})
+        partial = self.downloader.archive_cache.partial_path("official", "v2.3", "dxvk-2.3.tar.gz")
+        self.assertEqual(os.path.getsize(partial), self.half)
+
+        rest = fake_response(self.archive[self.half:], status_code=206, headers={
+            "Content-Range": f"bytes {self.half}-{len(self.archive) - 1}/{len(self.archive)}",
+        })
+        with patch_http(self.downloader, return_value=rest) as session:
+            self._install()
+
+        headers = session.get.call_args.kwargs["headers"]
+        self.assertEqual(headers["Range"], f"bytes={self.half}-")
+        self.assertEqual(headers["If-Range"], '"v1"')
+        self.assertEqual(sorted(os.listdir(self.target)), ["d3d11.dll", "dxgi.dll"])
+        cached = self.downloader.archive_cache.get("official", "v2.3", "dxvk-2.3.tar.gz")
+        with open(cached, "rb") as f:
+            self.assertEqual(f.read(), self.archive)
+        self.assertFalse(os.path.exists(partial + ".json"))
+
+    def test_full_restart_without_accept_ranges(self):
+        self._interrupted_first_attempt({})
+        with patch_http(self.downloader, return_value=fake_response(self.archive)) as session:
+            self._install()
+        self.assertNotIn("Range", session.get.call_args.kwargs["headers"])
+        self.assertIsNotNone(self.downloader.archive_cache.get("official", "v2.3", "dxvk-2.3.tar.gz"))
+
+    def test_cancelled_download_keeps_partial(self):
+        reads = []
+
+        def cancel_check():
+            reads.append(1)
+            return len(reads) > 3
+
+        with patch_http(self.downloader, return_value=fake_response(self.archive)):
+            with self.assertRaises(DownloadCancelled):
+                self.downloader.download_and_extract_all(
+                    "https://example.invalid/dxvk-2.3.tar.gz", self.target, "tar.gz",
+                    tag_name="v2.3", download_filename="dxvk-2.3.tar.gz", cancel_check=cancel_check,
+                )
+        partial = self.downloader.archive_cache.partial_path("official", "v2.3", "dxvk-2.3.tar.gz")
+        # Three chunks arrived before the cancel; they stay on disk for a later resume
+        self.assertEqual(os.path.getsize(partial), 3 * DOWNLOAD_CHUNK_SIZE)
+
+    def test_short_body_rejected(self):
+        response = fake_response(self.archive, headers={"Content-Length": str(len(self.archive) + 10)})
+        with patch_http(self.downloader, return_value=response):
+            with self.assertRaises(IncompleteDownloadError):
+                self.downloader.fetch_archive(self.URL, "v2.3", "dxvk-2.3.tar.gz")
+        self.assertIsNone(self.downloader.archive_cache.get("official", "v2.3", "dxvk-2.3.tar.gz"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+def json_response(data, status_code=200, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.json.return_value = data
+    return response
+
+
+GITHUB_RELEASES = [
+    {
+        "tag_name": "v2.3",
+        "name": "Version 2.3",
+        "published_at": "2023-09-01T00:00:00Z",
+        "assets": [{"name": "dxvk-2.3.tar.gz", "browser_download_url": "https://example.invalid/dxvk-2.3.tar.gz"}],
+    },
+]
+
+
+class TestReleaseMetadataCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.downloader = GithubDownloader()
+        self.downloader.metadata_cache = ReleaseMetadataCache(
+            os.path.join(self.temp_dir, "release_metadata.json"), ttl=60
+        )
+
+    def test_fresh_entry_skips_network(self):
+        with patch_http(self.downloader, return_value=json_response(GITHUB_RELEASES)) as session:
+            first = self.downloader.get_releases(limit=10)
+            second = self.downloader.get_releases(limit=10)
+        self.assertEqual(first, second)
+        self.assertEqual(session.get.call_count, 1)
+
+    def test_stale_entry_revalidated_with_etag(self):
+        self.downloader.metadata_cache.ttl = 0
+        with patch_http(self.downloader) as session:
+            session.get.side_effect = [
+                json_response(GITHUB_RELEASES, headers={"ETag": '"abc"'}),
+                json_response(None, status_code=304),
+            ]
+            self.downloader.get_releases(limit=10)
+            releases = self.downloader.get_releases(limit=10)
+
+        self.assertEqual(releases[0]["tag_name"], "v2.3")
+        self.assertEqual(session.get.call_args.kwargs["headers"], {"If-None-Match": '"abc"'})
+
+    def test_pinned_tag_resolved_from_cache(self):
+        with patch_http(self.downloader, return_value=json_response(GITHUB_RELEASES)):
+            self.downloader.get_releases(limit=10)
+
+        with patch_http(self.downloader, side_effect=AssertionError("network used")):
+            info = self.downloader.get_release_info("v2.3")
+        self.assertEqual(info["download_url"], "https://example.invalid/dxvk-2.3.tar.gz")
+        self.assertEqual(info["download_format"], "tar.gz")
+
+    def test_entries_read_once_and_written_only_on_change(self):
+        cache = self.downloader.metadata_cache
+        cache.store("https://example.invalid/a", [1])
+        with patch("release_cache.read_json") as read_json, patch("release_cache.write_json") as write_json:
+            for _ in range(5):
+                self.assertEqual(cache.get("https://example.invalid/a")["data"], [1])
+            cache.seed({"https://example.invalid/a": [2]})
+        read_json.assert_not_called()
+        write_json.assert_not_called()
+
+    def test_changes_from_another_process_are_picked_up(self):
+        cache = self.downloader.metadata_cache
+        self.assertIsNone(cache.get("https://example.invalid/a"))
+        ReleaseMetadataCache(cache.cache_file, ttl=60).store("https://example.invalid/a", [1])
+        self.assertEqual(cache.get("https://example.invalid/a")["data"], [1])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestSharedDownloaders(unittest.TestCase):
+    def test_factory_returns_shared_instances(self):
+        self.assertIs(get_downloader("official"), get_downloader("official"))
+        self.assertIsInstance(get_downloader("gplasync"), GitlabDownloader)
+        self.assertIsNot(get_downloader("official"), get_downloader("gplasync"))
+
+    def test_registered_source_selectable(self):
+        @register_source
+        class LocalBuilds(DXVKDownloaderBase):
+            source_key = "local-test"
+            source_name = "Local builds"
+
+        self.addCleanup(github_downloader._sources.pop, "local-test")
+        self.addCleanup(github_downloader._downloaders.pop, "local-test", None)
+        self.assertIn(("local-test", "Local builds"), available_sources())
+        self.assertIsInstance(get_downloader("local-test"), LocalBuilds)
+        self.assertIsInstance(get_downloader("no-such-source"), GithubDownloader)
+
+    def test_downloaders_share_one_session(self):
+        session = get_session()
+        self.assertIs(get_downloader("official")._get_session(), session)
+        self.assertIs(get_downloader("gplasync")._get_session(), session)
+        self.assertEqual(session.get_adapter("https://api.github.com")._pool_maxsize, 16)
+
+
+class _RangeRequestHandler(BaseHTTPRequestHandler):
+    """Serves server.payload for any path, honouring Range when server.ranges is set."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def _respond(self, send_body):
+        data = self.server.payload
+        range_header = self.headers.get("Range")
+        if self.server.ranges and range_header and range_header.startswith("bytes="):
+            start, _, end = range_header[len("bytes="):].partition("-")
+            start = int(start)
+            end = int(end) if end else len(data) - 1
+            self.server.range_requests += 1
+            self.send_response(206)
+            if self.server.bad_ranges > 0:
+                # Answer with the wrong part of the file
+                self.server.bad_ranges -= 1
+                start, end = start + 1, min(end + 1, len(data) - 1)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+            body = data[start:end + 1]
+        else:
+            self.send_response(200)
+            body = data
+        if self.server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+def start_local_server(payload, ranges=True):
+    """Starts a throwaway HTTP server on localhost; returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeRequestHandler)
+    server.payload = payload
+    server.ranges = ranges
+    server.range_requests = 0
+    server.bad_ranges = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class TestSegmentedDownload(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.archive = make_dxvk_targz(dll_size=64 * 1024, random_payload=True)
+        self.session = create_session()
+
+    def test_plan_segments_covers_whole_file(self):
+        ranges = plan_segments(1000, 3, 100)
+        self.assertEqual(ranges, [(0, 333), (334, 666), (667, 999)])
+        self.assertEqual(plan_segments(1000, 8, 400), [(0, 499), (500, 999)])
+
+    def test_segments_stitched_in_order(self):
+        server, base_url = start_local_server(self.archive)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        target = os.path.join(self.temp_dir, "dxvk.tar.gz")
+
+        self.assertTrue(download_segmented(self.session, f"{base_url}/dxvk.tar.gz", target, 4, 16 * 1024))
+        with open(target, "rb") as f:
+            self.assertEqual(f.read(), self.archive)
+        self.assertEqual(server.range_requests, 4)
+
+    def test_falls_back_without_range_support(self):
+        server, base_url = start_local_server(self.archive, ranges=False)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        target = os.path.join(self.temp_dir, "dxvk.tar.gz")
+        self.assertFalse(download_segmented(self.session, f"{base_url}/dxvk.tar.gz", target, 4, 16 * 1024))
+
+    def test_failed_segment_retried(self):
+        server, base_url = start_local_server(self.archive)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        server.bad_ranges = 1
+        target = os.path.join(self.temp_dir, "dxvk.tar.gz")
+
+        self.assertTrue(download_segmented(self.session, f"{base_url}/dxvk.tar.gz", target, 4, 16 * 1024))
+        with open(target, "rb") as f:
+            self.assertEqual(f.read(), self.archive)
+        self.assertGreater(server.range_requests, 4)
+
+    def test_downloader_falls_back_to_single_stream_when_segments_keep_failing(self):
+        server, base_url = start_local_server(self.archive)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        server.bad_ranges = 1000
+        settings = Settings(os.path.join(self.temp_dir, "settings.json"))
+        settings.set("download_segments", 4)
+        settings.set("download_min_segment_mb", 0.01)
+
+        downloader = GithubDownloader()
+        downloader.session = self.session
+        downloader.archive_cache = ArchiveCache(os.path.join(self.temp_dir, "cache"), max_bytes=10 * 1024 * 1024)
+        target = os.path.join(self.temp_dir, "game")
+        os.makedirs(target)
+        with patch("github_downloader.get_settings", return_value=settings):
+            downloader.download_and_extract_dxvk(
+                f"{base_url}/dxvk-2.3.tar.gz", target, "64-bit", "Direct3D 11",
+                "tar.gz", tag_name="v2.3", download_filename="dxvk-2.3.tar.gz",
+            )
+
+        self.assertEqual(sorted(os.listdir(target)), ["d3d11.dll", "dxgi.dll"])
+        self.assertGreater(server.range_requests, 4)
+
+    def test_downloader_uses_segmented_mode(self):
+        server, base_url = start_local_server(self.archive)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        settings = Settings(os.path.join(self.temp_dir, "settings.json"))
+        settings.set("download_segments", 4)
+        settings.set("download_min_segment_mb", 0.01)
+
+        downloader = GithubDownloader()
+        downloader.session = self.session
+        downloader.archive_cache = ArchiveCache(os.path.join(self.temp_dir, "cache"), max_bytes=10 * 1024 * 1024)
+        target = os.path.join(self.temp_dir, "game")
+        os.makedirs(target)
+        with patch("github_downloader.get_settings", return_value=settings):
+            downloader.download_and_extract_dxvk(
+                f"{base_url}/dxvk-2.3.tar.gz", target, "64-bit", "Direct3D 11",
+                "tar.gz", tag_name="v2.3", download_filename="dxvk-2.3.tar.gz",
+            )
+
+        self.assertEqual(sorted(os.listdir(target)), ["d3d11.dll", "dxgi.dll"])
+        self.assertGreater(server.range_requests, 1)
+
+    def tearDown(self):
+        self.session.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+
+class TestArchiveIntegrity(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.target = os.path.join(self.temp_dir, "game")
+        os.makedirs(self.target)
+        self.downloader = GithubDownloader()
+        self.downloader.archive_cache = ArchiveCache(
+            os.path.join(self.temp_dir, "cache"), max_bytes=10 * 1024 * 1024
+        )
+        self.archive = make_dxvk_targz()
+        self.digest = hashlib.sha256(self.archive).hexdigest()
+
+    def _install(self, expected_digest, tag_name="v2.3"):
+        self.downloader.download_and_extract_dxvk(
+            "https://example.invalid/dxvk-2.3.tar.gz", self.target, "64-bit", "Direct3D 11",
+            "tar.gz", tag_name=tag_name, download_filename="dxvk-2.3.tar.gz",
+            expected_digest=expected_digest,
+        )
+
+    def test_matching_digest_recorded_in_cache(self):
+        with patch_http(self.downloader, return_value=fake_response(self.archive)):
+            self._install(f"sha256:{self.digest}")
+        cache = self.downloader.archive_cache
+        self.assertEqual(cache.recorded_digest("official", "v2.3", "dxvk-2.3.tar.gz"), self.digest)
+        self.assertTrue(cache.entries()[0]["verified"])
+
+    def test_mismatch_rejected_and_not_cached(self):
+        with patch_http(self.downloader, return_value=fake_response(self.archive)):
+            with self.assertRaises(IntegrityError):
+                self._install("sha256:" + "0" * 64)
+        cache = self.downloader.archive_cache
+        self.assertIsNone(cache.get("official", "v2.3", "dxvk-2.3.tar.gz"))
+        self.assertFalse(os.path.exists(cache.partial_path("official", "v2.3", "dxvk-2.3.tar.gz")))
+
+    def test_cache_hit_trusts_recorded_digest(self):
+        with patch_http(self.downloader, return_value=fake_response(self.archive)):
+            self._install(self.digest)
+        with patch_http(self.downloader, side_effect=AssertionError("network used")), \
+                patch("github_downloader.sha256_file", side_effect=AssertionError("archive re-hashed")):
+            self._install(self.digest)
+        self.assertIn("d3d11.dll", os.listdir(self.target))
+
+    def test_uncached_stream_read_to_end_for_verification(self):
+        with patch_http(self.downloader, return_value=fake_response(self.archive)):
+            with self.assertRaises(IntegrityError):
+                self._install("f" * 64, tag_name=None)
+
+    def test_gitlab_pinned_digest(self):
+        settings = Settings(os.path.join(self.temp_dir, "settings.json"))
+        settings.set("pinned_digests", {"gplasync/v2.3-1": f"SHA256:{self.digest.upper()}"})
+        with patch("github_downloader.get_settings", return_value=settings):
+            info = GitlabDownloader().get_release_info("v2.3-1")
+        self.assertEqual(info["download_digest"], self.digest)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+
+class TestMirrorSource(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.archive = make_dxvk_targz(dll_size=64 * 1024, random_payload=True)
+
+        # The mirror machine: an archive cache with one release in it
+        served_cache = ArchiveCache(os.path.join(self.temp_dir, "served"), max_bytes=10 * 1024 * 1024)
+        src = os.path.join(self.temp_dir, "dxvk-2.3.tar.gz")
+        with open(src, "wb") as f:
+            f.write(self.archive)
+        self.digest = hashlib.sha256(self.archive).hexdigest()
+        served_cache.put("official", "v2.3", "dxvk-2.3.tar.gz", src, sha256=self.digest)
+
+        self.server = create_mirror_server("127.0.0.1", 0, served_cache)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+        # The client machine
+        self.upstream = MagicMock(source_key="official", source_name="Official (doitsujin/dxvk)")
+        self.mirror = MirrorDownloader(self.upstream, base_url)
+        self.mirror.session = create_session()
+        self.mirror.archive_cache = ArchiveCache(os.path.join(self.temp_dir, "client"), max_bytes=10 * 1024 * 1024)
+        self.mirror.metadata_cache = ReleaseMetadataCache(os.path.join(self.temp_dir, "meta.json"), ttl=60)
+
+    def _upstream_release(self, tag_name):
+        return {
+            "tag_name": tag_name, "name": tag_name, "download_format": "tar.gz",
+            "download_url": f"https://example.invalid/dxvk-{tag_name[1:]}.tar.gz",
+            "download_filename": f"dxvk-{tag_name[1:]}.tar.gz",
+        }
+
+    def test_release_resolved_and_installed_from_mirror(self):
+        self.upstream.get_release_info.return_value = self._upstream_release("v2.3")
+        info = self.mirror.get_release_info(None)
+        self.upstream.get_release_info.assert_called_once_with(None)
+        self.assertTrue(info["download_url"].startswith(self.mirror.base_url))
+        self.assertEqual(info["download_digest"], self.digest)
+
+        target = os.path.join(self.temp_dir, "extract")
+        extracted = self.mirror.download_and_extract_all(
+            info["download_url"], target, info["download_format"], tag_name=info["tag_name"],
+            download_filename=info["download_filename"], expected_digest=info["download_digest"],
+        )
+        self.assertEqual(extracted["x64"], ["d3d10core.dll", "d3d11.dll", "d3d9.dll", "dxgi.dll"])
+        self.upstream._download_and_extract.assert_not_called()
+
+    def test_tampered_mirror_archive_rejected_against_upstream_digest(self):
+        published = hashlib.sha256(b"the archive GitHub actually published").hexdigest()
+        self.upstream.get_release_info.return_value = dict(
+            self._upstream_release("v2.3"), download_digest=published)
+        info = self.mirror.get_release_info("v2.3")
+        self.assertTrue(info["download_url"].startswith(self.mirror.base_url))
+        self.assertEqual(info["download_digest"], published)
+
+        with self.assertRaises(IntegrityError):
+            self.mirror.download_and_extract_all(
+                info["download_url"], os.path.join(self.temp_dir, "extract"), info["download_format"],
+                tag_name=info["tag_name"], download_filename=info["download_filename"],
+                expected_digest=info["download_digest"],
+            )
+        self.assertEqual(self.mirror.archive_cache.entries(), [])
+
+    def test_latest_and_release_list_come_from_upstream(self):
+        # The mirror only has v2.3, but upstream has moved on
+        self.upstream.get_release_info.return_value = self._upstream_release("v2.4")
+        self.upstream.get_releases.return_value = [{"tag_name": "v2.4"}, {"tag_name": "v2.3"}, {"tag_name": "v2.2"}]
+        self.assertEqual(self.mirror.get_release_info(None)["download_url"], "https://example.invalid/dxvk-2.4.tar.gz")
+        self.assertEqual([r["tag_name"] for r in self.mirror.get_releases()], ["v2.4", "v2.3", "v2.2"])
+
+    def test_mirror_releases_used_when_upstream_unreachable(self):
+        self.upstream.get_release_info.side_effect = requests.ConnectionError("offline")
+        self.upstream.get_releases.side_effect = requests.ConnectionError("offline")
+        self.assertEqual([r["tag_name"] for r in self.mirror.get_releases()], ["v2.3"])
+        info = self.mirror.get_release_info(None)
+        self.assertEqual(info["tag_name"], "v2.3")
+        self.assertTrue(info["download_url"].startswith(self.mirror.base_url))
+        with self.assertRaises(requests.ConnectionError):
+            self.mirror.get_release_info("v2.2")
+
+    def test_missing_tag_falls_back_to_upstream(self):
+        self.upstream.get_release_info.return_value = {"tag_name": "v2.2", "download_url": "https://example.invalid/"}
+        self.assertEqual(self.mirror.get_release_info("v2.2")["download_url"], "https://example.invalid/")
+
+    def test_evicted_archive_downloaded_from_upstream(self):
+        self.upstream.get_release_info.return_value = self._upstream_release("v2.3")
+        info = self.mirror.get_release_info("v2.3")
+        self.server.archive_cache.remove("official", "v2.3", "dxvk-2.3.tar.gz")
+        self.mirror.download_and_extract_all(
+            info["download_url"], os.path.join(self.temp_dir, "extract"), tag_name="v2.3",
+            download_filename=info["download_filename"],
+        )
+        self.assertEqual(self.upstream._download_and_extract.call_args.args[0],
+                         "https://example.invalid/dxvk-2.3.tar.gz")
+
+    def test_serves_byte_ranges(self):
+        url = f"{self.mirror.base_url}/official/v2.3/dxvk-2.3.tar.gz"
+        response = self.mirror.session.get(url, headers={"Range": "bytes=100-199"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, self.archive[100:200])
+        self.assertEqual(self.mirror.session.get(f"{self.mirror.base_url}/official/v2.3/index.json").status_code, 404)
+
+    def test_factory_wraps_source_when_mirror_configured(self):
+        settings = Settings(os.path.join(self.temp_dir, "settings.json"))
+        settings.set("mirror_url", self.mirror.base_url)
+        with patch("github_downloader.get_settings", return_value=settings):
+            downloader = get_downloader("gplasync")
+        self.assertIsInstance(downloader, MirrorDownloader)
+        self.assertIsInstance(downloader.upstream, GitlabDownloader)
+        self.assertEqual(downloader.source_key, "gplasync")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+
+def github_release(n):
+    """A GitHub API release entry for version 1.<n>, published on day n."""
+    return {
+        "tag_name": f"v1.{n}",
+        "name": f"Version 1.{n}",
+        "published_at": f"{datetime.date(2020, 1, 1) + datetime.timedelta(days=n)}T00:00:00Z",
+        "assets": [{
+            "name": f"dxvk-1.{n}.tar.gz", "size": 1000 + n, "digest": f"sha256:{n:064x}",
+            "browser_download_url": f"https://example.invalid/dxvk-1.{n}.tar.gz",
+        }],
+    }
+
+
+class TestReleaseIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index = ReleaseIndex(os.path.join(self.temp_dir, "releases.sqlite3"))
+        self.downloader = GithubDownloader()
+        self.downloader.metadata_cache = ReleaseMetadataCache(
+            os.path.join(self.temp_dir, "release_metadata.json"), ttl=0
+        )
+        # 25 releases on the server, newest first
+        self.server_releases = [github_release(n) for n in range(25, 0, -1)]
+
+    def _serve_pages(self, session, fail_from_page=None):
+        def get(url, **kwargs):
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+            per_page, page = int(query["per_page"][0]), int(query["page"][0])
+            if fail_from_page is not None and page >= fail_from_page:
+                raise requests.ConnectionError("offline")
+            return json_response(self.server_releases[(page - 1) * per_page:page * per_page])
+        session.get.side_effect = get
+
+    def test_sync_through_mirror_stores_upstream_history(self):
+        mirror = MirrorDownloader(self.downloader, "http://127.0.0.1:9")
+        with patch_http(self.downloader) as session:
+            self._serve_pages(session)
+            self.assertEqual(self.index.sync(mirror, per_page=10), 25)
+        self.assertEqual(self.index.count("official"), 25)
+        oldest = self.index.releases("official", limit=1, offset=24)[0]
+        self.assertEqual((oldest["tag_name"], oldest["name"]), ("v1.1", "Version 1.1"))
+        self.assertIsNotNone(oldest["published_at"])
+
+    def test_undated_entry_keeps_dated_row(self):
+        self.index.upsert("official", [{"tag_name": "v1.1", "name": "Version 1.1", "published_at": "2020-01-02"}])
+        self.index.upsert("official", [{"tag_name": "v1.1", "name": "v1.1", "published_at": None}])
+        row = self.index.get("official", "v1.1")
+        self.assertEqual((row["name"], row["published_at"]), ("Version 1.1", "2020-01-02"))
+
+    def test_sync_sources_concurrently(self):
+        # Each source waits for the other, so this only finishes if both run at once
+        barrier = threading.Barrier(2, timeout=5)
+
+        def source(key, published):
+            def get_release_page(page=1, per_page=50):
+                barrier.wait()
+                return [{"tag_name": f"{key}-1", "name": f"{key}-1", "published_at": published}]
+            return MagicMock(source_key=key, source_name=key.title(), get_release_page=get_release_page)
+
+        sources = {"official": source("official", "2024-01-01T00:00:00Z"),
+                   "gplasync": source("gplasync", "2024-02-01T00:00:00Z")}
+        with patch("github_downloader.get_downloader", side_effect=sources.get):
+            self.assertEqual(sync_sources(self.index, ["official", "gplasync"]), {"official": 1, "gplasync": 1})
+        self.assertEqual([(r["source_key"], r["tag_name"]) for r in self.index.releases()],
+                         [("gplasync", "gplasync-1"), ("official", "official-1")])
+
+    def test_sync_sources_reports_failed_source(self):
+        ok = MagicMock(source_key="official", source_name="Official")
+        ok.get_release_page.return_value = [{"tag_name": "v2.3", "name": "v2.3", "published_at": None}]
+        broken = MagicMock(source_key="gplasync", source_name="GPLAsync")
+        broken.get_release_page.side_effect = requests.ConnectionError("offline")
+        with patch("github_downloader.get_downloader", side_effect={"official": ok, "gplasync": broken}.get):
+            results = sync_sources(self.index, ["official", "gplasync"])
+        self.assertEqual(results["official"], 1)
+        self.assertIsInstance(results["gplasync"], requests.ConnectionError)
+        self.assertEqual(self.index.count(), 1)
+
+    def test_full_then_incremental_sync(self):
+        with patch_http(self.downloader) as session:
+            self._serve_pages(session)
+            self.assertEqual(self.index.sync(self.downloader, per_page=10), 25)
+            self.assertEqual(session.get.call_count, 3)
+
+            self.server_releases.insert(0, github_release(26))
+            self.assertEqual(self.index.sync(self.downloader, per_page=10), 1)
+            # Only the first page was needed to find the new tag
+            self.assertEqual(session.get.call_count, 4)
+
+        newest = self.index.releases("official", limit=1)[0]
+        self.assertEqual(newest["tag_name"], "v1.26")
+        self.assertEqual(newest["download_format"], "tar.gz")
+        self.assertEqual(newest["download_size"], 1026)
+        self.assertEqual(newest["download_digest"], f"{26:064x}")
+
+    def test_interrupted_first_sync_resumes_full_history(self):
+        with patch_http(self.downloader) as session:
+            self._serve_pages(session, fail_from_page=2)
+            with self.assertRaises(requests.ConnectionError):
+                self.index.sync(self.downloader, per_page=10)
+            self.assertEqual(self.index.count("official"), 10)
+
+            self._serve_pages(session)
+            self.index.sync(self.downloader, per_page=10)
+        self.assertEqual(self.index.count("official"), 25)
+
+    def test_paginated_queries(self):
+        self.index.upsert("official", [{"tag_name": "v1.1", "published_at": "2020-01-01"},
+                                       {"tag_name": "v1.2", "published_at": "2020-02-01"}])
+        self.index.upsert("gplasync", [{"tag_name": "v1.2-1", "published_at": "2020-03-01"},
+                                       {"tag_name": "v0.9-1", "published_at": None}])
+        self.assertEqual([r["tag_name"] for r in self.index.releases("official", limit=1, offset=1)], ["v1.1"])
+        self.assertEqual([r["tag_name"] for r in self.index.releases(limit=10)],
+                         ["v1.2-1", "v1.2", "v1.1", "v0.9-1"])
+
+        # Later partial data doesn't erase what is already known
+        self.index.upsert("official", [{"tag_name": "v1.1", "name": "Version 1.1"}])
+        self.assertEqual(self.index.get("official", "v1.1")["published_at"], "2020-01-01")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+
+class TestRateLimit(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.temp_dir, "rate_limit.json")
+        self.settings = Settings(os.path.join(self.temp_dir, "settings.json"))
+        settings_patch = patch("github_downloader.get_settings", return_value=self.settings)
+        settings_patch.start()
+        self.addCleanup(settings_patch.stop)
+
+        self.downloader = GithubDownloader()
+        self.downloader.rate_limiter = RateLimiter(self.state_file, reserve=2)
+        self.downloader.metadata_cache = ReleaseMetadataCache(
+            os.path.join(self.temp_dir, "release_metadata.json"), ttl=0
+        )
+
+    def _budget_headers(self, remaining, reset_in=600):
+        return {"X-RateLimit-Remaining": str(remaining), "X-RateLimit-Limit": "60",
+                "X-RateLimit-Reset": str(int(time.time()) + reset_in)}
+
+    def test_budget_shared_between_processes(self):
+        first, second = RateLimiter(self.state_file, reserve=2), RateLimiter(self.state_file, reserve=2)
+        first.update("github:anonymous", self._budget_headers(4))
+        self.assertEqual(first.acquire("github:anonymous"), 0)
+        self.assertEqual(second.acquire("github:anonymous"), 0)
+        # Two spent across both instances; the last two are held in reserve
+        self.assertGreater(first.acquire("github:anonymous"), 500)
+        self.assertEqual(second.budget("github:anonymous")["remaining"], 2)
+
+    def _hold_lock(self, pid, age=0):
+        lock_path = self.state_file + ".lock"
+        with open(lock_path, "w") as f:
+            f.write(f"{socket.gethostname()} {pid} test")
+        if age:
+            os.utime(lock_path, (time.time() - age, time.time() - age))
+        return lock_path
+
+    def test_live_lock_holder_not_broken(self):
+        limiter = RateLimiter(self.state_file, reserve=2)
+        limiter.update("github:anonymous", self._budget_headers(4))
+        lock_path = self._hold_lock(os.getpid())
+        with patch("rate_limit.LOCK_TIMEOUT_SECONDS", 0.05):
+            # Goes ahead without spending from (or rewriting) the shared budget
+            self.assertEqual(limiter.acquire("github:anonymous"), 0)
+        self.assertTrue(os.path.exists(lock_path))
+        self.assertEqual(limiter.budget("github:anonymous")["remaining"], 4)
+
+    def test_dead_or_stale_lock_holder_broken(self):
+        limiter = RateLimiter(self.state_file, reserve=2)
+        limiter.update("github:anonymous", self._budget_headers(4))
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+        for pid, age in ((exited.pid, 0), (os.getpid(), 60)):
+            self._hold_lock(pid, age)
+            with patch("rate_limit.LOCK_TIMEOUT_SECONDS", 5):
+                self.assertEqual(limiter.acquire("github:anonymous"), 0)
+        self.assertEqual(limiter.budget("github:anonymous")["remaining"], 2)
+
+    def test_exhausted_budget_serves_cache(self):
+        with patch_http(self.downloader, return_value=json_response(
+                GITHUB_RELEASES, headers=self._budget_headers(1))) as session:
+            self.downloader.get_releases(limit=10)
+            releases = self.downloader.get_releases(limit=10)
+        self.assertEqual(session.get.call_count, 1)
+        self.assertEqual(releases[0]["tag_name"], "v2.3")
+
+    def test_exhausted_budget_without_cache(self):
+        self.downloader.rate_limiter.update("github:anonymous", self._budget_headers(0, reset_in=3600))
+        with patch_http(self.downloader, side_effect=AssertionError("network used")):
+            with self.assertRaises(RateLimitError):
+                self.downloader.get_release_info("v2.3")
+
+        # A short wait is queued instead of failing
+        self.downloader.rate_limiter.update("github:anonymous", self._budget_headers(0, reset_in=30))
+        with patch_http(self.downloader, return_value=json_response(GITHUB_RELEASES[0])), \
+                patch("github_downloader.time.sleep") as sleep:
+            self.assertEqual(self.downloader.get_release_info("v2.3")["tag_name"], "v2.3")
+        self.assertTrue(25 <= sleep.call_args.args[0] <= 32)
+
+    def test_rejected_request_retried_after_reset(self):
+        limited = json_response(None, status_code=403, headers=self._budget_headers(0, reset_in=5))
+        with patch_http(self.downloader) as session, patch("github_downloader.time.sleep"):
+            session.get.side_effect = [limited, json_response(GITHUB_RELEASES[0], headers=self._budget_headers(59))]
+            self.assertEqual(self.downloader.get_release_info("v2.3")["tag_name"], "v2.3")
+        self.assertEqual(session.get.call_count, 2)
+
+    def test_token_sent_and_budgeted_separately(self):
+        self.settings.set("github_token", "secret")
+        with patch_http(self.downloader, return_value=json_response(
+                GITHUB_RELEASES, headers=self._budget_headers(4999))) as session:
+            self.downloader.get_releases(limit=10)
+        self.assertEqual(session.get.call_args.kwargs["headers"]["Authorization"], "Bearer secret")
+        self.assertIsNone(self.downloader.rate_limiter.budget("github:anonymous"))
+        bucket = self.downloader._rate_limit_bucket(self.downloader.api_base_url + "/releases")
+        self.assertEqual(self.downloader.rate_limiter.budget(bucket)["remaining"], 4999)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
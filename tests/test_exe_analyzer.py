@@ -0,0 +1,614 @@
+import unittest
+from unittest import mock
+import json
+import os
+import struct
+import tempfile
+import shutil
+
+import pefile
+
+import detection_cache
+import folder_scanner
+import library_index
+from library_index import LibraryIndex, parse_vdf
+from detection_cache import DetectionCache
+from exe_analyzer import (
+    analyze_exe, get_best_exe, get_exe_architecture, get_exe_imports, detect_directx_version, directx_for_install,
+    pick_clear_winner, rank_exes, _read_pe_header,
+)
+
+FILE_ALIGNMENT = 0x200
+SECTION_ALIGNMENT = 0x1000
+SECTION_RVA = 0x1000
+
+
+def _align(value, alignment):
+    return (value + alignment - 1) // alignment * alignment
+
+
+def make_pe(machine=0x8664, pe32_plus=None, subsystem=2, section_data=b"", data_directories=None):
+    """
+    Builds a minimal but well-formed PE image with a single section at
+    SECTION_RVA holding section_data. data_directories maps a directory
+    index to (rva, size).
+    """
+    if pe32_plus is None:
+        pe32_plus = machine != 0x14c
+    directories = [(0, 0)] * 16
+    for index, entry in (data_directories or {}).items():
+        directories[index] = entry
+
+    optional_size = 240 if pe32_plus else 224
+    headers_size = _align(0x80 + 4 + 20 + optional_size + 40, FILE_ALIGNMENT)
+    raw_size = _align(max(len(section_data), 1), FILE_ALIGNMENT)
+    image_size = _align(SECTION_RVA + raw_size, SECTION_ALIGNMENT)
+
+    dos_header = b"MZ" + b"\0" * 58 + struct.pack("<I", 0x80)
+    dos_header = dos_header.ljust(0x80, b"\0")
+    coff_header = struct.pack("<HHIIIHH", machine, 1, 0, 0, 0, optional_size, 0x0102)
+    if pe32_plus:
+        optional = struct.pack(
+            "<HBBIIIIIQIIHHHHHHIIIIHHQQQQII",
+            0x20b, 14, 0, raw_size, 0, 0, SECTION_RVA, SECTION_RVA, 0x140000000,
+            SECTION_ALIGNMENT, FILE_ALIGNMENT, 6, 0, 0, 0, 6, 0, 0, image_size, headers_size, 0,
+            subsystem, 0x8160, 0x100000, 0x1000, 0x100000, 0x1000, 0, 16,
+        )
+    else:
+        optional = struct.pack(
+            "<HBBIIIIIIIIIHHHHHHIIIIHHIIIIII",
+            0x10b, 14, 0, raw_size, 0, 0, SECTION_RVA, SECTION_RVA, SECTION_RVA, 0x400000,
+            SECTION_ALIGNMENT, FILE_ALIGNMENT, 6, 0, 0, 0, 6, 0, 0, image_size, headers_size, 0,
+            subsystem, 0x8140, 0x100000, 0x1000, 0x100000, 0x1000, 0, 16,
+        )
+    optional += b"".join(struct.pack("<II", rva, size) for rva, size in directories)
+    section = struct.pack(
+        "<8sIIIIIIHHI", b".rdata", max(len(section_data), 1), SECTION_RVA, raw_size, headers_size,
+        0, 0, 0, 0, 0x40000040,
+    )
+    headers = (dos_header + b"PE\0\0" + coff_header + optional + section).ljust(headers_size, b"\0")
+    return headers + section_data.ljust(raw_size, b"\0")
+
+
+def import_section(dlls=(), delay_dlls=(), pe32_plus=True, old_style_delay=False, image_base=0x140000000):
+    """
+    Builds section data holding import and delay-import descriptor tables
+    for the given DLL names, each importing ordinal 1. Returns
+    (section_data, data_directories) for make_pe.
+    """
+    all_dlls = list(dlls) + list(delay_dlls)
+    thunk_format, ordinal_flag = ("<QQ", 1 << 63) if pe32_plus else ("<II", 1 << 31)
+    thunk_size = struct.calcsize(thunk_format)
+    import_table_size = 20 * (len(dlls) + 1)
+    delay_table_size = 32 * (len(delay_dlls) + 1)
+    thunks_offset = import_table_size + delay_table_size
+    names_offset = thunks_offset + thunk_size * len(all_dlls)
+
+    thunks = b""
+    names = b""
+    thunk_rvas, name_rvas = [], []
+    for dll in all_dlls:
+        thunk_rvas.append(SECTION_RVA + thunks_offset + len(thunks))
+        thunks += struct.pack(thunk_format, ordinal_flag | 1, 0)
+        name_rvas.append(SECTION_RVA + names_offset + len(names))
+        names += dll.encode() + b"\0"
+
+    imports = b"".join(
+        struct.pack("<IIIII", thunk, 0, 0, name, thunk)
+        for thunk, name in zip(thunk_rvas[:len(dlls)], name_rvas[:len(dlls)])
+    ) + b"\0" * 20
+    delay = b""
+    for thunk, name in zip(thunk_rvas[len(dlls):], name_rvas[len(dlls):]):
+        if old_style_delay:
+            thunk, name = (thunk + image_base) & 0xffffffff, (name + image_base) & 0xffffffff
+            delay += struct.pack("<IIIIIIII", 0, name, 0, thunk, thunk, 0, 0, 0)
+        else:
+            delay += struct.pack("<IIIIIIII", 1, name, 0, thunk, thunk, 0, 0, 0)
+    delay += b"\0" * 32
+
+    directories = {}
+    if dlls:
+        directories[1] = (SECTION_RVA, import_table_size)
+    if delay_dlls:
+        directories[13] = (SECTION_RVA + import_table_size, delay_table_size)
+    return imports + delay + thunks + names, directories
+
+
+class TestFastPEReader(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def _write(self, name, data):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_agrees_with_pefile(self):
+        fixtures = {
+            "x64.exe": make_pe(0x8664),
+            "x86.exe": make_pe(0x14c),
+            "arm64.exe": make_pe(0xaa64),
+            # Machine and optional header kind disagree; the machine field decides
+            "x86_pe32plus.exe": make_pe(0x14c, pe32_plus=True),
+        }
+        for name, data in fixtures.items():
+            with self.subTest(name):
+                path = self._write(name, data)
+                pe = pefile.PE(path)
+                machine, magic = _read_pe_header(path)
+                self.assertEqual(machine, pe.FILE_HEADER.Machine)
+                self.assertEqual(magic, pe.OPTIONAL_HEADER.Magic)
+                pe.close()
+
+        self.assertEqual(get_exe_architecture(os.path.join(self.temp_dir, "x64.exe")), "64-bit")
+        self.assertEqual(get_exe_architecture(os.path.join(self.temp_dir, "x86.exe")), "32-bit")
+        self.assertEqual(get_exe_architecture(os.path.join(self.temp_dir, "arm64.exe")), "Unknown")
+
+    def test_malformed_files_fall_back_to_pefile(self):
+        valid = make_pe(0x8664)
+        fixtures = {
+            "empty.exe": b"",
+            "text.exe": b"not an executable at all" * 10,
+            "bad_signature.exe": valid[:0x80] + b"NE\0\0" + valid[0x84:],
+            "truncated.exe": valid[:0x90],
+            "lfanew_past_end.exe": valid[:0x3c] + struct.pack("<I", 0x7fffffff) + valid[0x40:],
+        }
+        for name, data in fixtures.items():
+            with self.subTest(name):
+                path = self._write(name, data)
+                self.assertEqual(get_exe_architecture(path), "Not a valid PE file")
+
+    def test_reads_headers_only(self):
+        # A large body after the headers must not be read through pefile
+        path = self._write("big.exe", make_pe(0x14c, section_data=b"\xcc" * (4 * 1024 * 1024)))
+        with mock.patch("exe_analyzer.pefile.PE", side_effect=AssertionError("full parse")):
+            self.assertEqual(get_exe_architecture(path), "32-bit")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestImportDetection(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def _write_pe(self, name, machine=0x8664, **imports):
+        data, directories = import_section(pe32_plus=machine != 0x14c, **imports)
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "wb") as f:
+            f.write(make_pe(machine, section_data=data, data_directories=directories))
+        return path
+
+    def test_imports_agree_with_pefile(self):
+        cases = {
+            "x64.exe": dict(machine=0x8664, dlls=["KERNEL32.dll", "d3d11.dll"], delay_dlls=["XINPUT1_3.dll"]),
+            "x86.exe": dict(machine=0x14c, dlls=["kernel32.dll", "d3d9.dll"]),
+            "x86_old_delay.exe": dict(machine=0x14c, dlls=["kernel32.dll"], delay_dlls=["d3d10.dll"],
+                                      old_style_delay=True, image_base=0x400000),
+        }
+        for name, options in cases.items():
+            with self.subTest(name):
+                machine = options.pop("machine")
+                path = self._write_pe(name, machine, **options)
+                pe = pefile.PE(path)
+                expected = [entry.dll.decode().lower() for entry in getattr(pe, "DIRECTORY_ENTRY_IMPORT", [])]
+                expected += [entry.dll.decode().lower() for entry in getattr(pe, "DIRECTORY_ENTRY_DELAY_IMPORT", [])]
+                pe.close()
+                self.assertEqual(get_exe_imports(path), expected)
+
+    def test_detects_directx_from_exe_imports(self):
+        exe = self._write_pe("game.exe", dlls=["kernel32.dll", "D3D11.dll", "dxgi.dll"])
+        self.assertEqual(detect_directx_version(self.temp_dir, exe), ["Direct3D 11"])
+
+        exe = self._write_pe("game.exe", dlls=["kernel32.dll"], delay_dlls=["d3d9.dll"])
+        self.assertEqual(detect_directx_version(self.temp_dir, exe), ["Direct3D 9"])
+
+    def test_falls_back_to_sibling_dll_imports(self):
+        exe = self._write_pe("game.exe", dlls=["kernel32.dll", "UnityPlayer.dll"])
+        self._write_pe("UnityPlayer.dll", dlls=["kernel32.dll", "d3d11.dll"])
+        self.assertEqual(detect_directx_version(self.temp_dir, exe), ["Direct3D 11"])
+        self.assertEqual(detect_directx_version(self.temp_dir, exe, scan_siblings=False), ["Unknown"])
+
+    def test_sibling_dlls_only_checked_for_the_chosen_exe(self):
+        game = self._write_pe("game.exe", dlls=["kernel32.dll", "UnityPlayer.dll"])
+        helper = self._write_pe("UnityCrashHandler64.exe", dlls=["kernel32.dll"])
+        self._write_pe("UnityPlayer.dll", dlls=["kernel32.dll", "d3d11.dll"])
+        cache = DetectionCache(os.path.join(self.temp_dir, "detection.json"))
+
+        ranked = rank_exes([game, helper], self.temp_dir, cache)
+        for result in ranked:
+            self.assertEqual(result["directx"], ["Unknown"])
+            self.assertFalse(any(r.startswith("uses") for r in result["reasons"]))
+        self.assertEqual(analyze_exe(game, self.temp_dir, cache)["directx"], ["Direct3D 11"])
+        # The cached analysis only holds what the exe itself imports
+        self.assertEqual(cache.get(game)["imported_directx"], [])
+
+    def test_several_versions_install_every_dll(self):
+        self.assertEqual(directx_for_install(["Direct3D 11"]), "Direct3D 11")
+        self.assertEqual(directx_for_install(["Direct3D 9", "Direct3D 11"]), "Unknown")
+        self.assertEqual(directx_for_install(["Unknown"]), "Unknown")
+
+    def test_dxgi_alone_and_unparseable_files_are_unknown(self):
+        exe = self._write_pe("game.exe", dlls=["dxgi.dll", "d3d12.dll"])
+        self.assertEqual(detect_directx_version(self.temp_dir, exe), ["Unknown"])
+
+        broken = os.path.join(self.temp_dir, "broken.exe")
+        with open(broken, "wb") as f:
+            f.write(b"MZ" + b"\0" * 10)
+        self.assertEqual(get_exe_imports(broken), [])
+
+    def test_shipped_dlls_still_count(self):
+        exe = self._write_pe("game.exe", dlls=["kernel32.dll", "d3d9.dll"])
+        with open(os.path.join(self.temp_dir, "d3d11.dll"), "wb") as f:
+            f.write(b"fake")
+        self.assertEqual(detect_directx_version(self.temp_dir, exe), ["Direct3D 9", "Direct3D 11"])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestDetectionCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = DetectionCache(os.path.join(self.temp_dir, "detection.json"))
+        self.game_dir = os.path.join(self.temp_dir, "game")
+        os.makedirs(self.game_dir)
+        self.exe = os.path.join(self.game_dir, "game.exe")
+        self._write_exe(["kernel32.dll", "d3d9.dll"])
+
+    def _write_exe(self, dlls):
+        data, directories = import_section(dlls=dlls)
+        with open(self.exe, "wb") as f:
+            f.write(make_pe(0x8664, section_data=data, data_directories=directories))
+
+    def test_hit_skips_parsing(self):
+        first = analyze_exe(self.exe, cache=self.cache)
+        self.assertEqual((first["architecture"], first["directx"], first["cached"]), ("64-bit", ["Direct3D 9"], False))
+
+        with mock.patch("exe_analyzer.get_exe_architecture", side_effect=AssertionError("parsed")), \
+             mock.patch("exe_analyzer.get_exe_imports", side_effect=AssertionError("parsed")):
+            second = analyze_exe(self.exe, cache=self.cache)
+        self.assertEqual((second["architecture"], second["directx"], second["cached"]), ("64-bit", ["Direct3D 9"], True))
+
+        # The cache survives a restart
+        reloaded = DetectionCache(self.cache.cache_file)
+        self.assertTrue(analyze_exe(self.exe, cache=reloaded)["cached"])
+
+    def test_put_many_writes_once(self):
+        other = os.path.join(self.game_dir, "launcher.exe")
+        shutil.copy(self.exe, other)
+        with mock.patch.object(self.cache, "_write", wraps=self.cache._write) as write:
+            self.cache.put_many([(self.exe, {"n": 1}, None), (other, {"n": 2}, None)])
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual((self.cache.get(self.exe), self.cache.get(other)), ({"n": 1}, {"n": 2}))
+
+    def test_changed_exe_is_reanalysed(self):
+        analyze_exe(self.exe, cache=self.cache)
+        st = os.stat(self.exe)
+        self._write_exe(["kernel32.dll", "d3d11.dll"])
+        os.utime(self.exe, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        result = analyze_exe(self.exe, cache=self.cache)
+        self.assertFalse(result["cached"])
+        self.assertEqual(result["directx"], ["Direct3D 11"])
+
+        # Same size but a new modification time also counts as a change
+        self.cache.put(self.exe, {"architecture": "32-bit", "imported_directx": []})
+        os.utime(self.exe, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000))
+        self.assertIsNone(self.cache.get(self.exe))
+
+    def test_stale_format_version_is_ignored(self):
+        analyze_exe(self.exe, cache=self.cache)
+        with mock.patch.object(detection_cache, "ANALYSIS_VERSION", detection_cache.ANALYSIS_VERSION + 1):
+            self.assertIsNone(self.cache.get(self.exe))
+
+    def test_shipped_dlls_are_checked_on_every_call(self):
+        analyze_exe(self.exe, cache=self.cache)
+        with open(os.path.join(self.game_dir, "d3d11.dll"), "wb") as f:
+            f.write(b"fake")
+        result = analyze_exe(self.exe, cache=self.cache)
+        self.assertTrue(result["cached"])
+        self.assertEqual(result["directx"], ["Direct3D 9", "Direct3D 11"])
+
+    def test_missing_exe_is_not_cached(self):
+        missing = os.path.join(self.game_dir, "missing.exe")
+        self.assertEqual(analyze_exe(missing, cache=self.cache)["architecture"], "File not found")
+        self.assertIsNone(self.cache.get(missing))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestExeRanking(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = DetectionCache(os.path.join(self.temp_dir, "detection.json"))
+        self.game_dir = os.path.join(self.temp_dir, "Hollow Knight")
+        os.makedirs(self.game_dir)
+
+    def _write_pe(self, name, dlls=("kernel32.dll",), subsystem=2, padding=0):
+        data, directories = import_section(dlls=list(dlls))
+        path = os.path.join(self.game_dir, name)
+        with open(path, "wb") as f:
+            f.write(make_pe(0x8664, subsystem=subsystem, section_data=data + b"\0" * padding,
+                            data_directories=directories))
+        return path
+
+    def test_game_beats_helpers(self):
+        game = self._write_pe("hollow_knight.exe", dlls=["kernel32.dll", "d3d11.dll"])
+        # Bigger than the game, but only a crash reporter and an installer
+        crash = self._write_pe("UnityCrashHandler64.exe", padding=8 * 1024 * 1024)
+        redist = self._write_pe("vc_redist.x64.exe", padding=8 * 1024 * 1024)
+        tool = self._write_pe("tool.exe", subsystem=3)
+
+        ranked = rank_exes([crash, redist, tool, game], self.game_dir, cache=self.cache)
+        self.assertEqual([r["path"] for r in ranked][0], game)
+        self.assertEqual(pick_clear_winner(ranked), game)
+        self.assertIn("uses Direct3D 11", ranked[0]["reasons"])
+        self.assertIn("named after the game folder", ranked[0]["reasons"])
+        self.assertIn("helper program", next(r for r in ranked if r["path"] == crash)["reasons"])
+        self.assertIn("console program", next(r for r in ranked if r["path"] == tool)["reasons"])
+        self.assertEqual(get_best_exe(self.game_dir, cache=self.cache), game)
+
+    def test_helper_words_only_match_helper_names(self):
+        for name, helper in [("CrashBandicoot.exe", False), ("Resetup Arena.exe", False),
+                             ("CrashReporter.exe", True), ("crash_handler.exe", True),
+                             ("Setup.exe", True), ("GameSetup.exe", True)]:
+            with self.subTest(name):
+                ranked = rank_exes([self._write_pe(name)], self.game_dir, cache=self.cache)
+                self.assertEqual("helper program" in ranked[0]["reasons"], helper)
+
+    def test_close_scores_are_left_to_the_user(self):
+        first = self._write_pe("alpha.exe", dlls=["kernel32.dll", "d3d11.dll"])
+        second = self._write_pe("beta.exe", dlls=["kernel32.dll", "d3d11.dll"])
+        ranked = rank_exes([first, second], self.game_dir, cache=self.cache)
+        self.assertIsNone(pick_clear_winner(ranked))
+        self.assertEqual(sorted(r["path"] for r in ranked), [first, second])
+
+    def test_results_are_cached_with_scores(self):
+        paths = [self._write_pe(f"game{i}.exe") for i in range(3)]
+        with mock.patch("exe_analyzer.PARALLEL_PARSE_MIN_FILES", 2):
+            ranked = rank_exes(paths, self.game_dir, cache=self.cache, max_workers=2)
+        self.assertFalse(any(r["cached"] for r in ranked))
+        self.assertIsNotNone(self.cache.get(paths[0])["score"])
+
+        with mock.patch("exe_analyzer.ProcessPoolExecutor", side_effect=AssertionError("re-parsed")):
+            again = rank_exes(paths, self.game_dir, cache=self.cache)
+        self.assertTrue(all(r["cached"] for r in again))
+        self.assertEqual([r["score"] for r in again], [r["score"] for r in ranked])
+
+    def test_falls_back_when_the_pool_is_unavailable(self):
+        paths = [self._write_pe("game.exe"), self._write_pe("setup.exe")]
+        with mock.patch("exe_analyzer.ProcessPoolExecutor", side_effect=OSError("no processes")), \
+                mock.patch("exe_analyzer.PARALLEL_PARSE_MIN_FILES", 2):
+            ranked = rank_exes(paths, self.game_dir, cache=self.cache)
+        self.assertEqual(ranked[0]["path"], paths[0])
+
+    def test_few_candidates_parsed_without_a_pool(self):
+        paths = [self._write_pe(f"game{i}.exe") for i in range(3)]
+        with mock.patch("exe_analyzer.ProcessPoolExecutor", side_effect=AssertionError("pool started")):
+            ranked = rank_exes(paths, self.game_dir, cache=self.cache, max_workers=4)
+        self.assertEqual(len(ranked), 3)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestFolderScanner(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def _touch(self, *parts, data=b"MZ"):
+        path = os.path.join(self.temp_dir, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def _names(self, **kwargs):
+        kwargs.setdefault("patterns", folder_scanner.DEFAULT_IGNORE_PATTERNS)
+        return [e.name for e in folder_scanner.iter_exe_files(self.temp_dir, **kwargs)]
+
+    def test_bounded_depth_root_first(self):
+        self._touch("bin", "x64", "deep", "too_deep.exe")
+        self._touch("bin", "x64", "Game-Win64.exe")
+        self._touch("bin", "tool.exe")
+        game = self._touch("Game.exe", data=b"MZ" * 100)
+        self._touch("readme.txt")
+
+        names = self._names()
+        self.assertEqual(names[0], "Game.exe")
+        self.assertEqual(sorted(names), ["Game-Win64.exe", "Game.exe", "tool.exe"])
+        self.assertEqual(self._names(max_depth=0), ["Game.exe"])
+
+        entry = folder_scanner.scan_exe_files(self.temp_dir, max_depth=0, patterns=[])[0]
+        st = os.stat(game)
+        self.assertEqual((entry.path, entry.size, entry.mtime_ns, entry.depth), (game, 200, st.st_mtime_ns, 0))
+
+    def test_ignore_patterns(self):
+        self._touch("_CommonRedist", "vcredist", "2019", "VC_redist.x64.exe")
+        self._touch("__Installer", "setup.exe")
+        self._touch("vcredist_x86.exe")
+        self._touch("UnityCrashHandler64.exe")
+        self._touch("Game.exe")
+        self._touch("Tools", "editor.exe")
+        self.assertEqual(sorted(self._names()), ["Game.exe", "editor.exe"])
+
+        settings = mock.Mock()
+        settings.get.return_value = ["tools"]
+        with mock.patch.object(folder_scanner, "get_settings", return_value=settings):
+            self.assertEqual(self._names(patterns=None), ["Game.exe"])
+
+    def test_streams_and_stops_when_cancelled(self):
+        for i in range(5):
+            self._touch(f"game{i}.exe")
+        seen = []
+        for entry in folder_scanner.iter_exe_files(self.temp_dir, patterns=[], cancel_check=lambda: len(seen) >= 2):
+            seen.append(entry)
+        self.assertEqual(len(seen), 2)
+
+    def test_unreadable_root_raises(self):
+        with self.assertRaises(OSError):
+            folder_scanner.scan_exe_files(os.path.join(self.temp_dir, "missing"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestLibraryIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index = LibraryIndex(os.path.join(self.temp_dir, "library.json"))
+        self.cache = DetectionCache(os.path.join(self.temp_dir, "detection.json"))
+        cache_patch = mock.patch("detection_cache.get_detection_cache", return_value=self.cache)
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+        self.steam = os.path.join(self.temp_dir, "Steam")
+        self.steam_library = os.path.join(self.temp_dir, "SteamLibrary")
+        self.gog = os.path.join(self.temp_dir, "GOG Games")
+        self.epic_manifests = os.path.join(self.temp_dir, "Epic", "Manifests")
+        self.user_root = os.path.join(self.temp_dir, "Games")
+        self.roots = {
+            "steam": [self.steam],
+            "gog": [self.gog],
+            "epic": [self.epic_manifests],
+            "user": [self.user_root],
+        }
+
+        self._write(self.steam, "steamapps", "libraryfolders.vdf", text=(
+            '"libraryfolders"\n{\n'
+            '\t"0"\n\t{\n\t\t"path"\t\t"%s"\n\t}\n'
+            '\t"1"\n\t{\n\t\t"path"\t\t"%s"\n\t\t"apps" { "570" "123" }\n\t}\n}\n'
+        ) % (self.steam.replace("\\", "\\\\"), self.steam_library.replace("\\", "\\\\")))
+        self._steam_game(self.steam_library, "570", "Dota 2", "dota 2 beta", dlls=["d3d11.dll"])
+        self._steam_game(self.steam, "220", "Half-Life 2", "Half-Life 2", dlls=["d3d9.dll"], machine=0x14c)
+
+        self._pe(self.gog, "Witcher 3", "bin", "x64", "witcher3.exe", dlls=["d3d11.dll"])
+        self._pe(self.gog, "Witcher 3", "bin", "x64", "other.exe")
+        self._write(self.gog, "Witcher 3", "goggame-1207664663.info", text=json.dumps({
+            "gameId": "1207664663", "name": "The Witcher 3",
+            "playTasks": [{"isPrimary": True, "path": "bin\\x64\\witcher3.exe"}],
+        }))
+        # A DLC's .info in the same folder is not a separate game
+        self._write(self.gog, "Witcher 3", "goggame-1640424747.info", text=json.dumps({
+            "gameId": "1640424747", "rootGameId": "1207664663", "name": "Hearts of Stone",
+        }))
+
+        epic_game = os.path.join(self.temp_dir, "Epic Games", "Fortnite")
+        self._pe(epic_game, "Launcher.exe")
+        self._pe(epic_game, "FortniteClient-Win64-Shipping.exe", dlls=["d3d11.dll"])
+        self._write(self.epic_manifests, "ABC.item", text=json.dumps({
+            "AppName": "Fortnite", "DisplayName": "Fortnite", "InstallLocation": epic_game,
+            "LaunchExecutable": "FortniteClient-Win64-Shipping.exe",
+        }))
+
+        self._pe(self.user_root, "Indie Game", "IndieGame.exe", dlls=["d3d9.dll"], machine=0x14c)
+        self._pe(self.user_root, "Indie Game", "UnityCrashHandler32.exe")
+
+    def _write(self, *parts, text=None, data=None):
+        path = os.path.join(*parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data if data is not None else text.encode())
+        return path
+
+    def _pe(self, *parts, dlls=(), machine=0x8664):
+        section, directories = import_section(dlls=["kernel32.dll"] + list(dlls), pe32_plus=machine != 0x14c)
+        return self._write(*parts, data=make_pe(machine, section_data=section, data_directories=directories))
+
+    def _steam_game(self, library, appid, name, installdir, **pe):
+        self._write(library, "steamapps", f"appmanifest_{appid}.acf", text=(
+            '"AppState"\n{\n\t"appid"\t\t"%s"\n\t"name"\t\t"%s"\n\t"installdir"\t\t"%s"\n}\n'
+        ) % (appid, name, installdir))
+        exe_name = installdir.split()[0].replace("-", "") + ".exe"
+        return self._pe(library, "steamapps", "common", installdir, exe_name, **pe)
+
+    def test_parse_vdf(self):
+        data = parse_vdf('// comment\n"AppState" { "AppID" "570" "Path" "C:\\\\Games" "Nested" { "a" "b" } }')
+        self.assertEqual(data, {"appstate": {"appid": "570", "path": "C:\\Games", "nested": {"a": "b"}}})
+
+    def test_discovers_every_source(self):
+        with mock.patch("exe_analyzer.PARALLEL_PARSE_MIN_FILES", 1):
+            counts = self.index.refresh(self.roots, max_workers=2)
+        self.assertEqual(counts, {"added": 5, "updated": 0, "removed": 0, "unchanged": 0})
+        games = {g["key"]: g for g in self.index.games()}
+        self.assertEqual(
+            sorted(games),
+            ["epic:Fortnite", "gog:1207664663", "steam:220", "steam:570",
+             "user:" + os.path.normcase(os.path.abspath(os.path.join(self.user_root, "Indie Game")))],
+        )
+        self.assertEqual(games["steam:570"]["name"], "Dota 2")
+        self.assertEqual((games["steam:570"]["architecture"], games["steam:570"]["directx"]), ("64-bit", ["Direct3D 11"]))
+        self.assertEqual((games["steam:220"]["architecture"], games["steam:220"]["directx"]), ("32-bit", ["Direct3D 9"]))
+        self.assertEqual(os.path.basename(games["gog:1207664663"]["exe"]), "witcher3.exe")
+        self.assertEqual(os.path.basename(games["epic:Fortnite"]["exe"]), "FortniteClient-Win64-Shipping.exe")
+        indie = next(g for g in games.values() if g["source"] == "user")
+        self.assertEqual(os.path.basename(indie["exe"]), "IndieGame.exe")
+        self.assertTrue(indie["confident"])
+
+    def test_refresh_is_incremental(self):
+        self.index.refresh(self.roots, max_workers=1)
+        with mock.patch.object(library_index, "_analyze_game", side_effect=AssertionError("re-analysed")):
+            counts = self.index.refresh(self.roots, max_workers=1)
+        self.assertEqual(counts, {"added": 0, "updated": 0, "removed": 0, "unchanged": 5})
+
+        # A game update touches its exe; only that game is analysed again
+        exe = self.index.get("steam:570")["exe"]
+        st = os.stat(exe)
+        os.utime(exe, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        analysed = []
+        real = library_index._analyze_game
+        with mock.patch.object(library_index, "_analyze_game",
+                               side_effect=lambda *args: analysed.append(args[0]) or real(*args)):
+            counts = self.index.refresh(self.roots, max_workers=1)
+        self.assertEqual(counts, {"added": 0, "updated": 1, "removed": 0, "unchanged": 4})
+        self.assertEqual(analysed, [self.index.get("steam:570")["install_dir"]])
+
+        # Uninstalled games drop out
+        os.remove(os.path.join(self.epic_manifests, "ABC.item"))
+        counts = self.index.refresh(self.roots, max_workers=1)
+        self.assertEqual(counts["removed"], 1)
+        self.assertIsNone(self.index.get("epic:Fortnite"))
+
+    def test_refresh_uses_detection_cache(self):
+        self.index.refresh(self.roots, max_workers=1)
+        self.assertIsNotNone(self.cache.get(self.index.get("steam:570")["exe"]))
+
+        # A rebuilt index finds every exe already analysed
+        rebuilt = LibraryIndex(os.path.join(self.temp_dir, "rebuilt.json"))
+        with mock.patch("exe_analyzer.parse_exe", side_effect=AssertionError("re-parsed")):
+            counts = rebuilt.refresh(self.roots, max_workers=1)
+        self.assertEqual(counts["added"], 5)
+        self.assertEqual(rebuilt.get("steam:570")["exe"], self.index.get("steam:570")["exe"])
+
+    def test_failing_game_does_not_abort_refresh(self):
+        real = library_index._analyze_game
+
+        def analyze(install_dir, *args):
+            if "dota" in install_dir:
+                raise RuntimeError("corrupt install")
+            return real(install_dir, *args)
+
+        with mock.patch.object(library_index, "_analyze_game", side_effect=analyze):
+            counts = self.index.refresh(self.roots, max_workers=1)
+        self.assertEqual(counts["added"], 5)
+        self.assertEqual(self.index.get("steam:570")["error"], "corrupt install")
+        self.assertEqual(self.index.get("steam:220")["architecture"], "32-bit")
+
+        # Failed games are retried on the next refresh
+        counts = self.index.refresh(self.roots, max_workers=1)
+        self.assertEqual((counts["updated"], counts["unchanged"]), (1, 4))
+        self.assertNotIn("error", self.index.get("steam:570"))
+
+    def test_same_folder_is_listed_once(self):
+        # The Steam library is also configured as a user root
+        self.roots["user"].append(os.path.join(self.steam_library, "steamapps", "common"))
+        self.index.refresh(self.roots, max_workers=1)
+        self.assertEqual([g["source"] for g in self.index.games() if g["name"] in ("Dota 2", "dota 2 beta")], ["steam"])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -47,18 +47,21 @@ def test_integration():
         manager = DXVKManager()
 
         with patch.object(manager.downloader, 'get_latest_release_info') as mock_release_info, \
-             patch.object(manager.downloader, 'download_and_extract_dxvk') as mock_download:
+             patch.object(manager.downloader, 'download_and_extract_all') as mock_download:
 
             mock_release_info.return_value = {
                 'tag_name': 'v2.3',
                 'zipball_url': 'https://fake-url.com/dxvk.zip'
             }
 
-            def mock_extract(download_url, extract_path, arch, directx_version, file_format='tar.gz'):
-                for dll in ['d3d11.dll', 'dxgi.dll']:
-                    with open(os.path.join(extract_path, dll), "w") as f:
-                        f.write(f"fake DXVK {dll} content")
+            def mock_extract(download_url, extract_path, file_format='tar.gz', **kwargs):
+                for subfolder in ['x32', 'x64']:
+                    os.makedirs(os.path.join(extract_path, subfolder), exist_ok=True)
+                    for dll in ['d3d11.dll', 'dxgi.dll']:
+                        with open(os.path.join(extract_path, subfolder, dll), "w") as f:
+                            f.write(f"fake DXVK {dll} content")
                 print(f"Mocked extraction of DXVK DLLs to {extract_path}")
+                return {'x32': ['d3d11.dll', 'dxgi.dll'], 'x64': ['d3d11.dll', 'dxgi.dll']}
 
             mock_download.side_effect = mock_extract
 
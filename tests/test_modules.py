@@ -1,11 +1,27 @@
 import unittest
 import os
+import shutil
 import tempfile
 import json
+import threading
+import time
 from unittest.mock import patch, MagicMock
 
 from logger import Logger
-from file_manager import FileManager
+from file_manager import FileManager, MANIFEST_FILE, manifest_has_backup, place_file, read_manifest
+from dll_store import DLLStore
+from dxvk_manager import DXVKManager
+from github_downloader import DownloadCancelled
+from singleflight import SingleFlight, WaitCancelled
+from io_scheduler import IOScheduler, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+from json_store import read_json, write_json
+
+
+def write_fake_dlls(folder, names, tag="v2.3"):
+    os.makedirs(folder, exist_ok=True)
+    for name in names:
+        with open(os.path.join(folder, name), "w") as f:
+            f.write(f"DXVK {tag} {os.path.basename(folder)} {name}")
 
 class TestLogger(unittest.TestCase):
     def setUp(self):
@@ -31,6 +47,41 @@ class TestLogger(unittest.TestCase):
         if os.path.exists(self.log_file):
             os.remove(self.log_file)
 
+class TestJsonStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "state.json")
+
+    def test_missing_or_corrupted_file_reads_empty(self):
+        self.assertEqual(read_json(self.path), {})
+        with open(self.path, "w") as f:
+            f.write("{not json")
+        self.assertEqual(read_json(self.path), {})
+
+    def test_concurrent_writers_never_share_a_temp_file(self):
+        errors = []
+
+        def writer(n):
+            try:
+                for i in range(50):
+                    write_json(self.path, {"writer": n, "i": i})
+            except OSError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(read_json(self.path)["i"], 49)
+        self.assertEqual(os.listdir(self.temp_dir), ["state.json"])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
 class TestFileManager(unittest.TestCase):
     def setUp(self):
         self.temp_dir = tempfile.mkdtemp()
@@ -50,10 +101,531 @@ class TestFileManager(unittest.TestCase):
         self.assertTrue(os.path.exists(backup_file))
         self.assertIn("d3d11.dll", backed_up)
 
+    def _store_and_game(self):
+        store = os.path.join(self.temp_dir, "store")
+        game = os.path.join(self.temp_dir, "game")
+        os.makedirs(store)
+        os.makedirs(game)
+        for dll in ("d3d11.dll", "dxgi.dll"):
+            with open(os.path.join(store, dll), "w") as f:
+                f.write(f"dxvk {dll}")
+        with open(os.path.join(game, "dxgi.dll"), "w") as f:
+            f.write("original dxgi")
+        return store, game
+
+    def test_link_install_and_restore(self):
+        store, game = self._store_and_game()
+        self.file_manager.backup_dlls(game, ["d3d11.dll", "dxgi.dll"])
+        self.file_manager.copy_dlls(store, game, ["d3d11.dll", "dxgi.dll"], link_mode="link")
+
+        manifest = os.path.join(game, "dxvk_backup", MANIFEST_FILE)
+        modes = dict(read_manifest(manifest))
+        self.assertEqual(set(modes), {"d3d11.dll", "dxgi.dll"})
+        self.assertTrue(all(mode in ("reflink", "hardlink") for mode in modes.values()))
+        with open(os.path.join(game, "dxgi.dll")) as f:
+            self.assertEqual(f.read(), "dxvk dxgi.dll")
+        if modes["d3d11.dll"] == "hardlink":
+            self.assertTrue(os.path.samefile(os.path.join(store, "d3d11.dll"), os.path.join(game, "d3d11.dll")))
+
+        self.file_manager.restore_dlls(game)
+        self.assertFalse(os.path.exists(os.path.join(game, "d3d11.dll")))
+        with open(os.path.join(game, "dxgi.dll")) as f:
+            self.assertEqual(f.read(), "original dxgi")
+        # Restoring must never write through a link into the store
+        with open(os.path.join(store, "dxgi.dll")) as f:
+            self.assertEqual(f.read(), "dxvk dxgi.dll")
+        self.assertTrue(os.path.exists(os.path.join(store, "d3d11.dll")))
+
+    def test_overwriting_a_link_leaves_the_store_alone(self):
+        store, game = self._store_and_game()
+        target = os.path.join(game, "d3d11.dll")
+        os.link(os.path.join(store, "d3d11.dll"), target)
+        other = os.path.join(self.temp_dir, "other.dll")
+        with open(other, "w") as f:
+            f.write("another version")
+        self.assertEqual(place_file(other, target), "copy")
+        with open(os.path.join(store, "d3d11.dll")) as f:
+            self.assertEqual(f.read(), "dxvk d3d11.dll")
+
+    def test_link_mode_falls_back_to_copy(self):
+        store, game = self._store_and_game()
+        with patch("file_manager._reflink", side_effect=OSError("unsupported")), \
+             patch("file_manager.os.link", side_effect=OSError("cross-device link")):
+            self.assertEqual(place_file(os.path.join(store, "d3d11.dll"), os.path.join(game, "d3d11.dll"), "link"), "copy")
+        self.assertFalse(os.path.samefile(os.path.join(store, "d3d11.dll"), os.path.join(game, "d3d11.dll")))
+
+    def test_failed_replace_keeps_original(self):
+        store, game = self._store_and_game()
+        with patch("file_manager.shutil.copy2", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                place_file(os.path.join(store, "dxgi.dll"), os.path.join(game, "dxgi.dll"))
+        with open(os.path.join(game, "dxgi.dll")) as f:
+            self.assertEqual(f.read(), "original dxgi")
+        self.assertEqual(os.listdir(game), ["dxgi.dll"])
+
+    def test_shared_target_attributes_left_alone(self):
+        store, game = self._store_and_game()
+        os.remove(os.path.join(game, "dxgi.dll"))
+        os.link(os.path.join(store, "dxgi.dll"), os.path.join(game, "dxgi.dll"))
+        with patch("file_manager._clear_readonly") as clear_readonly:
+            self.file_manager.copy_dlls(store, game, ["d3d11.dll", "dxgi.dll"], link_mode="copy")
+            self.file_manager.restore_dlls(game)
+        self.assertNotIn(os.path.join(game, "dxgi.dll"), [c.args[0] for c in clear_readonly.call_args_list])
+
+    def test_modes_recorded_without_backup(self):
+        store, game = self._store_and_game()
+        self.file_manager.copy_dlls(store, game, ["d3d11.dll", "dxgi.dll"], link_mode="link")
+        manifest = os.path.join(game, "dxvk_backup", MANIFEST_FILE)
+        modes = dict(read_manifest(manifest))
+        self.assertEqual(set(modes), {"d3d11.dll", "dxgi.dll"})
+        self.assertTrue(all(mode in ("reflink", "hardlink") for mode in modes.values()))
+        # Nothing was backed up, so uninstall leaves the game as it is
+        self.assertFalse(self.file_manager.restore_dlls(game))
+        self.assertTrue(os.path.exists(os.path.join(game, "dxgi.dll")))
+
+    def test_copy_without_backup_leaves_no_backup_folder(self):
+        store, game = self._store_and_game()
+        self.file_manager.copy_dlls(store, game, ["d3d11.dll", "dxgi.dll"], link_mode="copy")
+        self.assertFalse(os.path.exists(os.path.join(game, "dxvk_backup")))
+
+    def test_every_placed_dll_recorded_in_existing_manifest(self):
+        store, game = self._store_and_game()
+        self.file_manager.backup_dlls(game, ["d3d11.dll"])
+        self.file_manager.copy_dlls(store, game, ["d3d11.dll", "dxgi.dll"], link_mode="link")
+        manifest = os.path.join(game, "dxvk_backup", MANIFEST_FILE)
+        self.assertEqual([dll for dll, _ in read_manifest(manifest)], ["d3d11.dll", "dxgi.dll"])
+        self.assertTrue(manifest_has_backup(manifest))
+
+    def test_copy_mode_keeps_old_manifest_format(self):
+        store, game = self._store_and_game()
+        self.file_manager.backup_dlls(game, ["d3d11.dll", "dxgi.dll"])
+        self.file_manager.copy_dlls(store, game, ["d3d11.dll", "dxgi.dll"], link_mode="copy")
+        with open(os.path.join(game, "dxvk_backup", MANIFEST_FILE)) as f:
+            self.assertEqual(f.read(), "d3d11.dll\ndxgi.dll\n")
+        self.assertEqual(read_manifest(os.path.join(game, "dxvk_backup", MANIFEST_FILE)),
+                         [("d3d11.dll", "copy"), ("dxgi.dll", "copy")])
+
     def tearDown(self):
         import shutil
         if os.path.exists(self.temp_dir):
             shutil.rmtree(self.temp_dir)
 
+class TestDLLStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = DLLStore(os.path.join(self.temp_dir, "store"))
+        self.src = os.path.join(self.temp_dir, "x64")
+        write_fake_dlls(self.src, ["d3d11.dll", "dxgi.dll"])
+
+    def test_add_and_lookup(self):
+        set_dir = self.store.add("official", "v2.3", "x64", self.src)
+        self.assertEqual(self.store.lookup("official", "v2.3", "x64", ["d3d11.dll"]), set_dir)
+        self.assertIsNone(self.store.lookup("official", "v2.3", "x32"))
+        self.assertEqual(sorted(os.listdir(set_dir)), ["d3d11.dll", "dxgi.dll"])
+
+    def test_tampered_set_is_discarded(self):
+        set_dir = self.store.add("official", "v2.3", "x64", self.src)
+        with open(os.path.join(set_dir, "dxgi.dll"), "w") as f:
+            f.write("corrupted")
+        self.assertIsNone(self.store.lookup("official", "v2.3", "x64"))
+        self.assertFalse(os.path.exists(set_dir))
+
+    def test_prune_by_version(self):
+        self.store.add("official", "v2.3", "x64", self.src)
+        other = os.path.join(self.temp_dir, "other")
+        write_fake_dlls(other, ["d3d11.dll"], tag="v2.2")
+        old_dir = self.store.add("official", "v2.2", "x64", other)
+
+        self.assertEqual(self.store.prune("official", keep_tags=["v2.3"]), 1)
+        self.assertIsNone(self.store.lookup("official", "v2.2", "x64"))
+        self.assertFalse(os.path.exists(old_dir))
+        self.assertIsNotNone(self.store.lookup("official", "v2.3", "x64"))
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestInstallFromStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.manager = DXVKManager()
+        self.manager.dll_store = DLLStore(os.path.join(self.temp_dir, "store"))
+        self.manager.logger = Logger(os.path.join(self.temp_dir, "log.json"))
+
+        self.downloader = MagicMock(source_key="official", source_name="Official")
+        self.downloader.get_release_info.return_value = {
+            "tag_name": "v2.3",
+            "download_url": "https://example.invalid/dxvk-2.3.tar.gz",
+            "download_filename": "dxvk-2.3.tar.gz",
+            "download_format": "tar.gz",
+        }
+
+        def extract_all(download_url, extract_path, file_format, **kwargs):
+            for subfolder in ("x32", "x64"):
+                write_fake_dlls(os.path.join(extract_path, subfolder),
+                                ["d3d9.dll", "d3d10core.dll", "d3d11.dll", "dxgi.dll"])
+            return {subfolder: ["d3d10core.dll", "d3d11.dll", "d3d9.dll", "dxgi.dll"] for subfolder in ("x32", "x64")}
+
+        self.downloader.download_and_extract_all.side_effect = extract_all
+
+    def _install(self, game, directx_version, architecture="64-bit"):
+        game_dir = os.path.join(self.temp_dir, game)
+        os.makedirs(game_dir, exist_ok=True)
+        with patch("dxvk_manager.get_downloader", return_value=self.downloader):
+            return self.manager.install_dxvk(game_dir, architecture, directx_version, True)
+
+    def test_second_install_skips_extraction(self):
+        self.assertTrue(self._install("game1", "Direct3D 11"))
+        self.assertTrue(self._install("game2", "Direct3D 9"))
+        self.assertTrue(self._install("game3", "Direct3D 9", architecture="32-bit"))
+
+        self.assertEqual(self.downloader.download_and_extract_all.call_count, 1)
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, "game2", "d3d9.dll")))
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, "game2", "d3d11.dll")))
+        with open(os.path.join(self.temp_dir, "game3", "d3d9.dll")) as f:
+            self.assertIn("x32", f.read())
+
+    def test_concurrent_installs_share_one_download(self):
+        self.manager.flights = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        extract_all = self.downloader.download_and_extract_all.side_effect
+
+        def slow_extract_all(*args, **kwargs):
+            started.set()
+            release.wait(5)
+            return extract_all(*args, **kwargs)
+
+        self.downloader.download_and_extract_all.side_effect = slow_extract_all
+        results = {}
+
+        def install(game):
+            results[game] = self._install(game, "Direct3D 11")
+
+        threads = [threading.Thread(target=install, args=(f"game{i}",)) for i in range(3)]
+        threads[0].start()
+        started.wait(5)
+        for t in threads[1:]:
+            t.start()
+        # Give the followers time to join the running flight before it completes
+        time.sleep(0.2)
+        release.set()
+        for t in threads:
+            t.join(5)
+
+        self.assertEqual(results, {"game0": True, "game1": True, "game2": True})
+        self.assertEqual(self.downloader.download_and_extract_all.call_count, 1)
+
+    def test_prefetch_fills_store_for_install(self):
+        with patch("dxvk_manager.get_downloader", return_value=self.downloader):
+            self.assertEqual(self.manager.prefetch("official"), "v2.3")
+            self.assertEqual(self.manager.prefetch("official"), "v2.3")
+        self.assertTrue(self._install("game1", "Direct3D 9", architecture="32-bit"))
+        self.assertEqual(self.downloader.download_and_extract_all.call_count, 1)
+
+    def test_install_retries_after_cancelled_prefetch(self):
+        self.manager.flights = SingleFlight()
+        started = threading.Event()
+        cancel = threading.Event()
+        extract_all = self.downloader.download_and_extract_all.side_effect
+
+        def cancellable_extract_all(*args, cancel_check=None, **kwargs):
+            if cancel_check is not None:
+                started.set()
+                cancel.wait(5)
+                raise DownloadCancelled("Download cancelled.")
+            return extract_all(*args, **kwargs)
+
+        self.downloader.download_and_extract_all.side_effect = cancellable_extract_all
+        errors = []
+
+        def prefetch():
+            try:
+                with patch("dxvk_manager.get_downloader", return_value=self.downloader):
+                    self.manager.prefetch("official", cancel_check=cancel.is_set)
+            except DownloadCancelled:
+                errors.append("cancelled")
+
+        prefetch_thread = threading.Thread(target=prefetch)
+        prefetch_thread.start()
+        started.wait(5)
+        install_result = []
+        install_thread = threading.Thread(target=lambda: install_result.append(self._install("game1", "Direct3D 11")))
+        install_thread.start()
+        time.sleep(0.2)
+        cancel.set()
+        prefetch_thread.join(5)
+        install_thread.join(5)
+
+        self.assertEqual(errors, ["cancelled"])
+        self.assertEqual(install_result, [True])
+        self.assertEqual(self.downloader.download_and_extract_all.call_count, 2)
+
+    def test_cancelled_prefetch_stops_waiting_on_install_download(self):
+        self.manager.flights = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        extract_all = self.downloader.download_and_extract_all.side_effect
+
+        def slow_extract_all(*args, **kwargs):
+            started.set()
+            release.wait(5)
+            return extract_all(*args, **kwargs)
+
+        self.downloader.download_and_extract_all.side_effect = slow_extract_all
+        install_result = []
+        install_thread = threading.Thread(target=lambda: install_result.append(self._install("game1", "Direct3D 11")))
+        install_thread.start()
+        started.wait(5)
+
+        cancel = threading.Event()
+        cancel.set()
+        with patch("dxvk_manager.get_downloader", return_value=self.downloader):
+            with self.assertRaises(DownloadCancelled):
+                self.manager.prefetch("official", cancel_check=cancel.is_set)
+        # The install's download was not affected
+        release.set()
+        install_thread.join(5)
+        self.assertEqual(install_result, [True])
+        self.assertEqual(self.downloader.download_and_extract_all.call_count, 1)
+
+    def test_install_many_resolves_each_release_once(self):
+        def release_info(version):
+            if version == "v0.0":
+                raise ValueError("No such release")
+            return {
+                "tag_name": version or "v2.3",
+                "download_url": f"https://example.invalid/dxvk-{version or '2.3'}.tar.gz",
+                "download_format": "tar.gz",
+            }
+
+        self.downloader.get_release_info.side_effect = release_info
+        targets = []
+        for i in range(6):
+            game_dir = os.path.join(self.temp_dir, f"game{i}")
+            os.makedirs(game_dir)
+            targets.append({
+                "game_folder": game_dir,
+                "architecture": "32-bit" if i % 2 else "64-bit",
+                "directx_version": "Direct3D 9" if i % 3 == 0 else "Direct3D 11",
+                "version": "v2.2" if i >= 4 else None,
+            })
+        targets.append({"game_folder": os.path.join(self.temp_dir, "missing"),
+                        "architecture": "64-bit", "directx_version": "Direct3D 11"})
+        targets.append({"game_folder": os.path.join(self.temp_dir, "game0"),
+                        "architecture": "64-bit", "directx_version": "Direct3D 11", "version": "v0.0"})
+
+        with patch("dxvk_manager.get_downloader", return_value=self.downloader):
+            results = self.manager.install_many(targets, max_workers=4)
+
+        self.assertEqual([r["success"] for r in results], [True] * 6 + [False, False])
+        self.assertEqual([r["version"] for r in results[:6]], ["v2.3"] * 4 + ["v2.2"] * 2)
+        self.assertIn("does not exist", results[6]["error"])
+        self.assertIn("No such release", results[7]["error"])
+        # One lookup per distinct source/version, one extraction per real release
+        self.assertEqual(self.downloader.get_release_info.call_count, 3)
+        self.assertEqual(self.downloader.download_and_extract_all.call_count, 2)
+        self.assertEqual(results[3]["installed"], ["d3d9.dll", "dxgi.dll"])
+        with open(os.path.join(self.temp_dir, "game3", "d3d9.dll")) as f:
+            self.assertIn("x32", f.read())
+        self.assertTrue(all(r["install_seconds"] >= 0 and r["resolve_seconds"] >= 0 for r in results))
+        self.assertEqual(len(self.manager.logger.get_logs()), 6)
+
+    def test_install_many_validates_before_downloading(self):
+        targets = [
+            {"game_folder": os.path.join(self.temp_dir, "missing"), "architecture": "64-bit"},
+            # No architecture key at all
+            {"game_folder": self.temp_dir, "directx_version": "Direct3D 11"},
+        ]
+        with patch("dxvk_manager.get_downloader", return_value=self.downloader):
+            results = self.manager.install_many(targets)
+        self.downloader.get_release_info.assert_not_called()
+        self.assertEqual([r["success"] for r in results], [False, False])
+        self.assertIn("does not exist", results[0]["error"])
+        self.assertIn("Invalid architecture", results[1]["error"])
+
+    def test_install_many_keeps_default_downloader(self):
+        downloader = self.manager.downloader
+        game_dir = os.path.join(self.temp_dir, "game")
+        os.makedirs(game_dir)
+        with patch("dxvk_manager.get_downloader", return_value=self.downloader):
+            self.manager.install_many([{"game_folder": game_dir, "architecture": "64-bit",
+                                        "directx_version": "Direct3D 11", "source": "gplasync"}])
+            self.manager.install_dxvk(game_dir, "64-bit", "Direct3D 11", True, source="gplasync")
+        self.assertIs(self.manager.downloader, downloader)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_followers_receive_leader_result(self):
+        flights = SingleFlight()
+        entered = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def work():
+            calls.append(1)
+            entered.set()
+            release.wait(5)
+            return "done"
+
+        leader = threading.Thread(target=lambda: results.append(flights.do("v2.3", work)))
+        leader.start()
+        entered.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flights.do("v2.3", work))) for _ in range(2)]
+        for t in followers:
+            t.start()
+        time.sleep(0.2)
+        release.set()
+        for t in [leader] + followers:
+            t.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["done"] * 3)
+        self.assertFalse(flights.in_flight("v2.3"))
+
+    def test_followers_released_with_leader_error(self):
+        flights = SingleFlight()
+        entered = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def failing_work():
+            entered.set()
+            release.wait(5)
+            raise IOError("download failed")
+
+        def run():
+            try:
+                flights.do("v2.3", failing_work)
+            except IOError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=run)]
+        threads[0].start()
+        entered.wait(5)
+        threads.append(threading.Thread(target=run))
+        threads[1].start()
+        release.set()
+        for t in threads:
+            t.join(5)
+
+        self.assertEqual(errors, ["download failed"] * 2)
+        # A failed flight is not remembered; the next call runs the work again
+        self.assertEqual(flights.do("v2.3", lambda: "retried"), "retried")
+
+    def test_follower_stops_waiting_when_cancelled(self):
+        flights = SingleFlight()
+        entered = threading.Event()
+        release = threading.Event()
+        cancel = threading.Event()
+        results = []
+
+        def work():
+            entered.set()
+            release.wait(5)
+            return "done"
+
+        leader = threading.Thread(target=lambda: results.append(flights.do("v2.3", work)))
+        leader.start()
+        entered.wait(5)
+        cancel.set()
+        with self.assertRaises(WaitCancelled):
+            flights.do("v2.3", work, cancel_check=cancel.is_set)
+        self.assertTrue(flights.in_flight("v2.3"))
+
+        release.set()
+        leader.join(5)
+        self.assertEqual(results, ["done"])
+
+
+class TestIOScheduler(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def test_limits_jobs_per_volume(self):
+        scheduler = IOScheduler(default_limit=2)
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def job():
+            with scheduler.slot(self.temp_dir, PRIORITY_BATCH):
+                with lock:
+                    running.append(1)
+                    peak.append(len(running))
+                time.sleep(0.02)
+                with lock:
+                    running.pop()
+
+        threads = [threading.Thread(target=job) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(scheduler.queued(self.temp_dir), (0, 0))
+
+    def test_interactive_jobs_go_first(self):
+        scheduler = IOScheduler(default_limit=1, volume_limits={})
+        order = []
+        holder = scheduler.acquire(self.temp_dir)
+
+        def job(name, priority):
+            with scheduler.slot(self.temp_dir, priority):
+                order.append(name)
+
+        threads = []
+        for name, priority in [("batch1", PRIORITY_BATCH), ("batch2", PRIORITY_BATCH), ("gui", PRIORITY_INTERACTIVE)]:
+            threads.append(threading.Thread(target=job, args=(name, priority)))
+            threads[-1].start()
+            # Queue them in a known order
+            while scheduler.queued(self.temp_dir)[1] < len(threads):
+                time.sleep(0.005)
+        scheduler.release(holder)
+        for t in threads:
+            t.join(5)
+        self.assertEqual(order, ["gui", "batch1", "batch2"])
+
+    def test_volumes_are_independent(self):
+        scheduler = IOScheduler(default_limit=1, volume_limits={self.temp_dir: 3})
+        self.assertEqual(scheduler.limit_for(os.path.join(self.temp_dir, "missing", "game")), 3)
+        with patch("io_scheduler.volume_id", side_effect=lambda path: path):
+            scheduler = IOScheduler(default_limit=1)
+            with scheduler.slot("disk-a"):
+                # A full volume doesn't hold up another one
+                tokens = []
+                thread = threading.Thread(target=lambda: tokens.append(scheduler.acquire("disk-b")))
+                thread.start()
+                thread.join(5)
+                self.assertEqual(tokens, ["disk-b"])
+
+    def test_file_manager_uses_scheduler(self):
+        fm = FileManager()
+        fm.io_scheduler = MagicMock(wraps=IOScheduler(default_limit=1))
+        src = os.path.join(self.temp_dir, "src")
+        game = os.path.join(self.temp_dir, "game")
+        os.makedirs(src)
+        os.makedirs(game)
+        with open(os.path.join(src, "d3d11.dll"), "w") as f:
+            f.write("dxvk")
+        fm.backup_dlls(game, ["d3d11.dll"], PRIORITY_BATCH)
+        fm.copy_dlls(src, game, ["d3d11.dll"], PRIORITY_BATCH)
+        fm.restore_dlls(game)
+        self.assertEqual(
+            [c.args for c in fm.io_scheduler.slot.call_args_list],
+            [(game, PRIORITY_BATCH), (game, PRIORITY_BATCH), (game, PRIORITY_INTERACTIVE)],
+        )
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
 if __name__ == "__main__":
     unittest.main()